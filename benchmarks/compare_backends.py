@@ -0,0 +1,105 @@
+"""
+Compara os backends de inferência do classificador zero-shot (precisão vs. velocidade).
+
+Cada backend corre num processo próprio, para que a memória residente medida
+seja só a desse backend. Para cada um regista: tempo de carregamento, RSS
+máximo, débito (textos/s), precisão sobre a amostra etiquetada e concordância
+com o backend "transformers" (referência).
+
+Uso:
+    python benchmarks/compare_backends.py [--sample benchmarks/data/sentiment_sample.csv]
+                                          [--backends transformers,onnx,onnx-int8]
+                                          [--batch-size 8] [--output resultados.json]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import resource
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "web-app"))
+
+MODEL_NAME = "facebook/bart-large-mnli"
+CANDIDATE_LABELS = ["negative", "neutral", "positive"]
+
+
+def _load_sample(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [r["text"] for r in rows], [r["label"].strip().lower() for r in rows]
+
+
+def _run_backend(backend: str, texts: list, batch_size: int, queue):
+    from inference_backends import build_classifier
+    from sentiment_engine import BatchedSentimentClassifier, configure_torch_threads
+
+    if backend == "transformers":
+        configure_torch_threads()
+    start = time.perf_counter()
+    engine = BatchedSentimentClassifier(build_classifier(MODEL_NAME, backend), CANDIDATE_LABELS,
+                                        batch_size=batch_size, uses_torch=(backend == "transformers"))
+    load_seconds = time.perf_counter() - start
+
+    engine.classify(texts[:batch_size])  # aquecimento
+    start = time.perf_counter()
+    results = engine.classify(texts)
+    infer_seconds = time.perf_counter() - start
+
+    queue.put({
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "infer_seconds": round(infer_seconds, 3),
+        "texts_per_second": round(len(texts) / infer_seconds, 2),
+        # ru_maxrss vem em KB no Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "predictions": [r["sentimento"].lower() for r in results],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", default=os.path.join(ROOT, "benchmarks", "data", "sentiment_sample.csv"))
+    parser.add_argument("--backends", default="transformers,onnx,onnx-int8")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    texts, labels = _load_sample(args.sample)
+    ctx = multiprocessing.get_context("spawn")
+    reports = []
+    for backend in args.backends.split(","):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, texts, args.batch_size, queue))
+        proc.start()
+        report = queue.get()
+        proc.join()
+        preds = report.pop("predictions")
+        report["accuracy"] = round(sum(p == l for p, l in zip(preds, labels)) / len(labels), 3)
+        report["_predictions"] = preds
+        reports.append(report)
+
+    reference = next((r["_predictions"] for r in reports if r["backend"] == "transformers"), None)
+    for r in reports:
+        preds = r.pop("_predictions")
+        if reference is not None:
+            r["agreement_with_transformers"] = round(
+                sum(p == q for p, q in zip(preds, reference)) / len(reference), 3
+            )
+
+    print(f"{'backend':<14}{'load(s)':>9}{'texts/s':>10}{'RSS(MB)':>10}{'accuracy':>10}{'agree':>8}")
+    for r in reports:
+        print(f"{r['backend']:<14}{r['load_seconds']:>9}{r['texts_per_second']:>10}"
+              f"{r['peak_rss_mb']:>10}{r['accuracy']:>10}{r.get('agreement_with_transformers', '-'):>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": MODEL_NAME, "samples": len(texts), "batch_size": args.batch_size,
+                       "results": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
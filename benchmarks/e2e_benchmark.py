@@ -0,0 +1,284 @@
+"""
+Benchmark ponta a ponta, sem serviços externos.
+
+O Reddit, o Translator, a Azure Function (para a web-app) e o Blob Storage
+são substituídos por um servidor HTTP local e o Cosmos DB por um container
+em memória (ver fake_services.py); o modelo de sentimento usa o backend
+"stub" (STUB_LATENCY_MS de CPU por texto). Cenários:
+
+  - search_ingest:  SearchFunction.main com max_age=0 (Reddit -> Translator -> Cosmos);
+  - search_cached:  SearchFunction.main servido pelo caminho de leitura do Cosmos;
+  - busca_reddit:   reddit_api.busca_reddit com gravação no Cosmos;
+  - flask:          /search, /detail_all (até o job terminar), /gerar_relatorio e
+                    /listar_ficheiros da web-app, pelo test client do Flask.
+
+Cada cenário corre num processo próprio (o RSS máximo é só o desse cenário)
+e faz `--requests` pedidos com `--concurrency` threads. Regista p50/p95/máx.
+da latência (por rota no cenário flask), débito e RSS máximo num JSON com o
+commit atual, para comparar entre versões.
+
+Uso:
+    python benchmarks/e2e_benchmark.py [--scenarios search_ingest,search_cached,busca_reddit,flask]
+                                       [--posts 50] [--requests 20] [--concurrency 4]
+                                       [--subreddits 4] [--latency-ms 0] [--stub-latency-ms 5]
+                                       [--report-format csv] [--output resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, "benchmarks")
+FUNCTION_APP = os.path.join(ROOT, "redditIngestFunc")
+WEB_APP = os.path.join(ROOT, "web-app")
+
+SCENARIOS = ("search_ingest", "search_cached", "busca_reddit", "flask")
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _latency_summary(latencies: list) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+def _measure(op, requests: int, concurrency: int) -> dict:
+    """Corre op(i) para i em range(requests) com `concurrency` threads."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            op(i)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - start
+    return dict(_latency_summary(latencies),
+                errors=len(errors), first_errors=errors[:3],
+                wall_seconds=round(wall, 3),
+                requests_per_second=round(len(latencies) / wall, 2) if wall else 0.0)
+
+
+def _function_env(base: str):
+    os.environ.update(
+        CLIENT_ID="bench", SECRET="bench", REDDIT_USER="bench", REDDIT_PASSWORD="bench",
+        REDDIT_AUTH_URL=f"{base}/api/v1/access_token", REDDIT_API_BASE=base,
+        TRANSLATOR_ENDPOINT=base, TRANSLATOR_KEY="bench",
+        COSMOS_ENDPOINT="https://cosmos.invalid", COSMOS_KEY="bench",
+    )
+    sys.path.insert(0, FUNCTION_APP)
+
+
+def _install_fake_cosmos(latency_ms: float) -> dict:
+    """Regista containers em memória no registo do shared_code, em vez de ligar ao Cosmos."""
+    from fake_services import FakeContainer
+    from shared_code import cosmos
+    from shared_code.ingest_state import COSMOS_METADATA_CONTAINER
+
+    containers = {name: FakeContainer(latency_ms) for name in (cosmos.COSMOS_CONTAINER, COSMOS_METADATA_CONTAINER)}
+    cosmos._containers.update(containers)
+    return containers
+
+
+def _search_scenario(scenario: str, args: dict) -> dict:
+    import azure.functions as func
+    import SearchFunction
+
+    def search(i, max_age):
+        req = func.HttpRequest("GET", "/api/SearchFunction", body=b"", params={
+            "subreddit": f"bench{i % args['subreddits']}", "sort": "hot",
+            "limit": str(args["posts"]), "max_age": str(max_age),
+        })
+        res = SearchFunction.main(req)
+        if res.status_code != 200:
+            raise RuntimeError(f"HTTP {res.status_code}: {res.get_body()[:200]!r}")
+
+    if scenario == "search_ingest":
+        return _measure(lambda i: search(i, 0), args["requests"], args["concurrency"])
+    # search_cached: uma ingestão por subreddit (fora da medição) e depois só leituras
+    for i in range(args["subreddits"]):
+        search(i, 0)
+    return _measure(lambda i: search(i, 3600), args["requests"], args["concurrency"])
+
+
+def _busca_reddit_scenario(args: dict) -> dict:
+    sys.path.insert(0, ROOT)
+    import reddit_api
+
+    def busca(i):
+        posts = reddit_api.busca_reddit(f"bench{i % args['subreddits']}", "hot", args["posts"], save_to_db=True)
+        if len(posts) != min(args["posts"], args["listing_size"]):
+            raise RuntimeError(f"{len(posts)} posts em vez de {args['posts']}")
+
+    return _measure(busca, args["requests"], args["concurrency"])
+
+
+def _flask_scenario(base: str, args: dict) -> dict:
+    from fake_services import BLOB_CONTAINER
+
+    workdir = tempfile.mkdtemp(prefix="e2e-flask-")
+    os.environ.update(
+        FUNCTION_URL=f"{base}/api/SearchFunction",
+        CONTAINER_ENDPOINT_SAS=f"{base}/{BLOB_CONTAINER}?sv=2021-08-06&sig=YmVuY2g%3D",
+        SENTIMENT_BACKEND="stub", STUB_LATENCY_MS=str(args["stub_latency_ms"]), MODEL_WARMUP="preload",
+        SENTIMENT_CACHE_PATH=os.path.join(workdir, "sentiment.sqlite3"),
+        CHART_DIR=os.path.join(workdir, "static", "charts"),
+        REPORT_FORMAT=args["report_format"],
+    )
+    # Os gráficos e o cache ficam no diretório temporário, não na árvore do repositório
+    os.chdir(workdir)
+    sys.path.insert(0, WEB_APP)
+    from app import app
+
+    routes = {name: [] for name in ("search", "detail_all", "analysis_job", "gerar_relatorio", "listar_ficheiros")}
+    lock = threading.Lock()
+
+    def timed(name, call):
+        start = time.perf_counter()
+        res = call()
+        with lock:
+            routes[name].append(time.perf_counter() - start)
+        return res
+
+    def flow(i):
+        client = app.test_client()
+        res = timed("search", lambda: client.get("/search", query_string={
+            "subreddit": f"bench{i % args['subreddits']}", "sort": "hot", "limit": args["posts"]}))
+        if res.status_code != 200:
+            raise RuntimeError(f"/search: HTTP {res.status_code}")
+        res = timed("detail_all", lambda: client.post("/detail_all"))
+        job_id = res.headers["Location"].rstrip("/").rsplit("/", 1)[-1]
+
+        def wait_job():
+            while True:
+                state = client.get(f"/analise/{job_id}/estado").get_json()["state"]
+                if state in ("done", "failed"):
+                    return state
+                time.sleep(0.02)
+
+        if timed("analysis_job", wait_job) != "done":
+            raise RuntimeError(f"job {job_id} falhou")
+        timed("gerar_relatorio", lambda: client.post("/gerar_relatorio", data={"formato": args["report_format"]}))
+        with client.session_transaction() as session:
+            failed = [m for category, m in session.get("_flashes", []) if category == "danger"]
+        if failed:
+            raise RuntimeError(failed[0])
+        res = timed("listar_ficheiros", lambda: client.get("/listar_ficheiros"))
+        if res.status_code != 200:
+            raise RuntimeError(f"/listar_ficheiros: HTTP {res.status_code}")
+
+    result = _measure(flow, args["requests"], args["concurrency"])
+    result["routes"] = {name: _latency_summary(values) for name, values in routes.items()}
+    return result
+
+
+def _run_scenario(scenario: str, base: str, args: dict, queue):
+    # Sem logs INFO dos módulos (cada pedido escreveria várias linhas)
+    logging.basicConfig(level=logging.WARNING)
+    sys.path.insert(0, BENCHMARKS)
+    try:
+        if scenario == "flask":
+            result = _flask_scenario(base, args)
+        else:
+            _function_env(base)
+            containers = _install_fake_cosmos(args["latency_ms"])
+            if scenario == "busca_reddit":
+                result = _busca_reddit_scenario(args)
+            else:
+                result = _search_scenario(scenario, args)
+            result["cosmos_operations"] = {name: c.stats for name, c in containers.items()}
+        # ru_maxrss vem em KB no Linux
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        queue.put(dict(result, scenario=scenario))
+    except Exception as e:
+        queue.put({"scenario": scenario, "error": f"{type(e).__name__}: {e}"})
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--subreddits", type=int, default=4)
+    parser.add_argument("--listing-size", type=int, default=500,
+                        help="posts disponíveis em cada listagem do Reddit falso")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latência artificial de cada pedido aos serviços falsos e ao Cosmos")
+    parser.add_argument("--stub-latency-ms", type=float, default=5)
+    parser.add_argument("--report-format", default="csv")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    sys.path.insert(0, BENCHMARKS)
+    import fake_services
+
+    server, base = fake_services.start(args.latency_ms, args.listing_size)
+    config = dict(vars(args), scenarios=scenarios)
+    ctx = multiprocessing.get_context("spawn")
+    reports = []
+    for scenario in scenarios:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_scenario, args=(scenario, base, config, queue))
+        proc.start()
+        reports.append(queue.get())
+        proc.join()
+    server.shutdown()
+
+    print(f"{'cenário':<15}{'pedidos':>8}{'erros':>7}{'p50(ms)':>10}{'p95(ms)':>10}{'pedidos/s':>11}{'RSS(MB)':>9}")
+    for r in reports:
+        if "error" in r:
+            print(f"{r['scenario']:<15} falhou: {r['error']}")
+            continue
+        print(f"{r['scenario']:<15}{r['count']:>8}{r['errors']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+              f"{r['requests_per_second']:>11}{r['peak_rss_mb']:>9}")
+        for name, route in r.get("routes", {}).items():
+            print(f"  {name:<20}p50 {route['p50_ms']:>8} ms   p95 {route['p95_ms']:>8} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": _git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "config": config, "results": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
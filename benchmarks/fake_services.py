@@ -0,0 +1,367 @@
+"""
+Substitutos locais dos serviços externos, para os benchmarks correrem offline.
+
+- `FakeServicesHandler`: um servidor HTTP que responde como
+    - o Reddit (POST /api/v1/access_token e GET /r/<subreddit>/<sort>, com
+      paginação por `after`);
+    - o Azure Translator (POST /detect e /translate);
+    - a Azure Function de pesquisa (GET /api/SearchFunction);
+    - um container do Azure Blob Storage (/<BLOB_CONTAINER>/...: upload simples
+      e em blocos, download, listagem e ETag/If-Match/If-None-Match).
+- `FakeContainer`: container do Cosmos DB em memória com os métodos e as
+  queries usados pelo shared_code e pela web-app.
+
+Todos os pedidos (HTTP e Cosmos) podem ter uma latência artificial, para
+simular a ida e volta à rede.
+"""
+import re
+import copy
+import json
+import time
+import uuid
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+
+BLOB_CONTAINER = "bench-reports"
+
+TOPICS = ["cloud computing", "python packaging", "serverless functions", "container images",
+          "database indexes", "message queues", "latency budgets", "observability"]
+# Títulos em português (com acentos, para o /detect falso os reconhecer)
+PT_TITLES = ["Opinião sobre {}: vale a pena?", "Porque é que {} ainda é tão difícil?",
+             "Experiência péssima com {} em produção"]
+EN_TITLES = ["I love how {} turned out", "Is {} worth it in 2025?", "Terrible experience with {}",
+             "{} finally works as expected"]
+
+
+def fake_post(subreddit: str, n: int, batch: str = "") -> dict:
+    """`data` de um post do Reddit, determinista em (subreddit, n, batch)."""
+    topic = TOPICS[n % len(TOPICS)]
+    if n % 3 == 0:
+        title = PT_TITLES[n % len(PT_TITLES)].format(topic)
+    else:
+        title = EN_TITLES[n % len(EN_TITLES)].format(topic)
+    if batch:
+        title = f"{title} [{batch}]"
+    # Um terço sem corpo, os restantes com corpos de tamanhos variados (alguns longos)
+    words = (n % 3) * 40 + (n % 7 == 0) * 600
+    selftext = " ".join(f"{topic} detail {i}" for i in range(words // 3))
+    post_id = f"{batch}{n:05d}"
+    return {"id": post_id, "name": f"t3_{post_id}", "title": title, "selftext": selftext,
+            "url": f"https://example.com/{subreddit}/{post_id}", "score": (n * 37) % 500,
+            "created_utc": 1_700_000_000 + 3600 * 24 * 30 - n * 600}
+
+
+def detect_language(text: str) -> str:
+    return "pt" if re.search(r"[ãçéêõá]", text) else "en"
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    """Ver a docstring do módulo. Configuração em atributos de classe (ver `start`)."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    listing_size = 100
+    blobs = {}
+    blocks = {}
+    blob_lock = threading.Lock()
+
+    # --- utilitários ---
+    def _send(self, code: int, body: bytes = b"", content_type: str = "application/json", headers: dict = None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-ms-request-id", uuid.uuid4().hex)
+        self.send_header("x-ms-version", "2021-08-06")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, payload, code: int = 200):
+        self._send(code, json.dumps(payload).encode("utf-8"))
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _route(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        return url, {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    def log_message(self, *args):
+        pass
+
+    # --- Reddit ---
+    def _listing(self, subreddit: str, qs: dict):
+        limit = int(qs.get("limit", "25"))
+        start = int(qs["after"].split("_")[-1]) + 1 if qs.get("after") else 0
+        end = min(start + limit, self.listing_size)
+        children = [{"kind": "t3", "data": fake_post(subreddit, n)} for n in range(start, end)]
+        after = children[-1]["data"]["name"] if children and end < self.listing_size else None
+        self._json({"kind": "Listing", "data": {"children": children, "after": after}})
+
+    # --- Translator ---
+    def _translator(self, path: str):
+        texts = [item["text"] for item in json.loads(self._body())]
+        if path == "/detect":
+            self._json([{"language": detect_language(t), "score": 1.0} for t in texts])
+        else:
+            self._json([{"translations": [{"text": f"(en) {t}", "to": "en"}]} for t in texts])
+
+    # --- Azure Function ---
+    def _search_function(self, qs: dict):
+        subreddit = qs.get("subreddit", "bench")
+        limit = int(qs.get("limit", "10"))
+        # Títulos únicos por pedido, para não haver hits no cache de sentimento
+        batch = uuid.uuid4().hex[:8]
+        posts = []
+        for n in range(limit):
+            d = fake_post(subreddit, n, batch)
+            english = detect_language(d["title"]) == "en"
+            posts.append({"id": f"{subreddit}_{d['id']}", "subreddit": subreddit, "title": d["title"],
+                          "title_eng": d["title"] if english else f"(en) {d['title']}",
+                          "selftext": d["selftext"][:1500], "selftext_eng": d["selftext"][:1500],
+                          "url": d["url"], "score": d["score"]})
+        self._json({"posts": posts, "stats": {"source": "fake"}})
+
+    # --- Blob Storage ---
+    def _blob_error(self, code: int, error: str):
+        body = (f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{error}</Code>'
+                f'<Message>{error}</Message></Error>').encode("utf-8")
+        self._send(code, body, "application/xml", {"x-ms-error-code": error})
+
+    def _blob_headers(self, etag: str) -> dict:
+        return {"ETag": etag, "Last-Modified": formatdate(usegmt=True)}
+
+    def _blob_put(self, name: str, qs: dict):
+        body = self._body()
+        comp = qs.get("comp")
+        error = etag = None
+        with self.blob_lock:
+            if comp == "block":
+                self.blocks[(name, qs["blockid"])] = body
+            else:
+                current = self.blobs.get(name)
+                if self.headers.get("If-None-Match") == "*" and current is not None:
+                    error = (409, "BlobAlreadyExists")
+                elif self.headers.get("If-Match") and (current is None or current[1] != self.headers["If-Match"]):
+                    error = (412, "ConditionNotMet")
+                else:
+                    if comp == "blocklist":
+                        ids = re.findall(rb"<(?:Latest|Uncommitted|Committed)>(.*?)</", body)
+                        data = b"".join(self.blocks.pop((name, i.decode()), b"") for i in ids)
+                    else:
+                        data = body
+                    etag = '"0x%s"' % hashlib.md5(data + uuid.uuid4().bytes).hexdigest()[:16].upper()
+                    self.blobs[name] = (data, etag)
+        if error:
+            return self._blob_error(*error)
+        headers = self._blob_headers(etag) if etag else {}
+        headers["x-ms-request-server-encrypted"] = "true"
+        self._send(201, headers=headers)
+
+    def _blob_get(self, name: str, qs: dict):
+        if qs.get("comp") == "list":
+            with self.blob_lock:
+                items = sorted((n, len(d)) for n, (d, _) in self.blobs.items())
+            blobs = "".join(
+                f"<Blob><Name>{n}</Name><Properties><Last-Modified>{formatdate(usegmt=True)}</Last-Modified>"
+                f"<Content-Length>{size}</Content-Length><BlobType>BlockBlob</BlobType></Properties></Blob>"
+                for n, size in items
+            )
+            body = (f'<?xml version="1.0" encoding="utf-8"?><EnumerationResults ContainerName="{BLOB_CONTAINER}">'
+                    f"<Blobs>{blobs}</Blobs><NextMarker /></EnumerationResults>").encode("utf-8")
+            return self._send(200, body, "application/xml")
+        with self.blob_lock:
+            current = self.blobs.get(name)
+        if current is None:
+            return self._blob_error(404, "BlobNotFound")
+        data, etag = current
+        headers = dict(self._blob_headers(etag), **{"x-ms-blob-type": "BlockBlob"})
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("x-ms-range") or self.headers.get("Range") or "")
+        if match and data:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return self._send(206, data[start:end + 1], "application/octet-stream", headers)
+        self._send(200, data, "application/octet-stream", headers)
+
+    # --- despacho ---
+    def do_POST(self):
+        url, qs = self._route()
+        if url.path == "/api/v1/access_token":
+            self._body()
+            return self._json({"access_token": "bench-token", "token_type": "bearer", "expires_in": 3600})
+        if url.path in ("/detect", "/translate"):
+            return self._translator(url.path)
+        self._send(404)
+
+    def do_GET(self):
+        url, qs = self._route()
+        parts = unquote(url.path).strip("/").split("/", 1)
+        if parts[0] == BLOB_CONTAINER:
+            return self._blob_get(parts[1] if len(parts) > 1 else "", qs)
+        if parts[0] == "r":
+            return self._listing(parts[1].split("/")[0], qs)
+        if url.path == "/api/SearchFunction":
+            return self._search_function(qs)
+        self._send(404)
+
+    def do_PUT(self):
+        url, qs = self._route()
+        parts = unquote(url.path).strip("/").split("/", 1)
+        if parts[0] == BLOB_CONTAINER and len(parts) > 1:
+            return self._blob_put(parts[1], qs)
+        self._send(404)
+
+
+def start(latency_ms: float = 0, listing_size: int = 100):
+    """Arranca o servidor numa thread; devolve (servidor, URL base)."""
+    handler = type("Handler", (FakeServicesHandler,), {
+        "latency": latency_ms / 1000, "listing_size": listing_size,
+        "blobs": {}, "blocks": {}, "blob_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Cosmos DB ---
+
+class _Pager:
+    def __init__(self, items: list, page_size: int, continuation: str):
+        self._items = items
+        self._page_size = page_size or len(items) or 1
+        self._offset = int(continuation or 0)
+        self.continuation_token = continuation
+
+    def __iter__(self):
+        while self._offset < len(self._items):
+            page = self._items[self._offset:self._offset + self._page_size]
+            self._offset += len(page)
+            self.continuation_token = str(self._offset) if self._offset < len(self._items) else None
+            yield iter(page)
+
+
+class _QueryResult:
+    def __init__(self, items: list, page_size: int = None):
+        self._items = items
+        self._page_size = page_size
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def by_page(self, continuation: str = None):
+        return _Pager(self._items, self._page_size, continuation)
+
+
+class FakeContainer:
+    """
+    Container do Cosmos DB em memória, particionado por /subreddit. Entende
+    as queries do repositório: filtros por partição, `ARRAY_CONTAINS(@ids, c.id)`,
+    igualdades `c.<campo> = @param`/`'literal'`, `c.bucket >= @since` e
+    `ORDER BY c._ts DESC` / `ORDER BY c.bucket`.
+    """
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self._items = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self.stats = {"reads": 0, "queries": 0, "writes": 0}
+
+    def _wait(self, kind: str):
+        if self.latency:
+            time.sleep(self.latency)
+        self.stats[kind] += 1
+
+    def _store(self, body: dict) -> dict:
+        self._version += 1
+        doc = copy.deepcopy(body)
+        doc["_etag"] = f'"{self._version:08x}"'
+        doc["_ts"] = self._version
+        self._items[(doc.get("subreddit"), doc["id"])] = doc
+        return copy.deepcopy(doc)
+
+    def query_items(self, query: str, parameters: list = None, partition_key=None, max_item_count: int = None,
+                    **kwargs):
+        self._wait("queries")
+        params = {p["name"]: p["value"] for p in parameters or []}
+        with self._lock:
+            items = [copy.deepcopy(d) for (pk, _), d in self._items.items()
+                     if partition_key is None or pk == partition_key]
+        if "ARRAY_CONTAINS(@ids, c.id)" in query:
+            ids = set(params["@ids"])
+            items = [d for d in items if d["id"] in ids]
+        for field, value in re.findall(r"c\.(\w+) = (@\w+|'[^']*')", query):
+            expected = params[value] if value.startswith("@") else value.strip("'")
+            items = [d for d in items if d.get(field) == expected]
+        since = re.search(r"c\.(\w+) >= (@\w+)", query)
+        if since:
+            items = [d for d in items if d.get(since.group(1), "") >= params[since.group(2)]]
+        order = re.search(r"ORDER BY c\.(\w+)( DESC)?", query)
+        if order:
+            items.sort(key=lambda d: d.get(order.group(1)) or 0, reverse=bool(order.group(2)))
+        return _QueryResult(items, max_item_count)
+
+    def read_item(self, item: str, partition_key: str, **kwargs) -> dict:
+        self._wait("reads")
+        with self._lock:
+            doc = self._items.get((partition_key, item))
+            if doc is None:
+                raise exceptions.CosmosResourceNotFoundError(message=f"{item} não existe")
+            return copy.deepcopy(doc)
+
+    def create_item(self, body: dict, **kwargs) -> dict:
+        self._wait("writes")
+        with self._lock:
+            if (body.get("subreddit"), body["id"]) in self._items:
+                raise exceptions.CosmosResourceExistsError(message=f"{body['id']} já existe")
+            return self._store(body)
+
+    def upsert_item(self, body: dict, **kwargs) -> dict:
+        self._wait("writes")
+        with self._lock:
+            return self._store(body)
+
+    def replace_item(self, item: str, body: dict, etag: str = None, match_condition=None, **kwargs) -> dict:
+        self._wait("writes")
+        with self._lock:
+            current = self._items.get((body.get("subreddit"), item))
+            if current is None:
+                raise exceptions.CosmosResourceNotFoundError(message=f"{item} não existe")
+            if match_condition == MatchConditions.IfNotModified and current["_etag"] != etag:
+                raise exceptions.CosmosAccessConditionFailedError(message=f"{item} foi alterado")
+            return self._store(body)
+
+    def patch_item(self, item: str, partition_key: str, patch_operations: list, etag: str = None,
+                   match_condition=None, **kwargs) -> dict:
+        self._wait("writes")
+        with self._lock:
+            doc = self._items.get((partition_key, item))
+            if doc is None:
+                raise exceptions.CosmosResourceNotFoundError(message=f"{item} não existe")
+            if match_condition == MatchConditions.IfNotModified and doc["_etag"] != etag:
+                raise exceptions.CosmosAccessConditionFailedError(message=f"{item} foi alterado")
+            doc = copy.deepcopy(doc)
+            for op in patch_operations:
+                doc[op["path"].lstrip("/")] = op["value"]
+            return self._store(doc)
+
+    def execute_item_batch(self, batch_operations: list, partition_key: str, **kwargs) -> list:
+        self._wait("writes")
+        with self._lock:
+            results = []
+            for operation, args in batch_operations:
+                if operation not in ("upsert", "create"):
+                    raise ValueError(f"Operação não suportada no FakeContainer: {operation}")
+                results.append(self._store(args[0]))
+            return results
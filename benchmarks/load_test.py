@@ -0,0 +1,210 @@
+"""
+Teste de carga do web-app: servidor de desenvolvimento vs. gunicorn.
+
+O modelo é substituído pelo backend "stub" (ocupa STUB_LATENCY_MS de CPU por
+texto, sem descarregar pesos) e a Azure Function por um servidor HTTP local
+que devolve posts com títulos únicos (para não haver hits no cache de
+sentimento). Em cada modo:
+
+  - `--analyses` clientes fazem /search, POST /detail_all e consultam o
+    estado do job até a análise terminar;
+  - em simultâneo, `--probes` clientes pedem GET / em ciclo, para medir a
+    latência das rotas leves enquanto há inferência a decorrer.
+
+Regista o tempo total das análises, análises/s e p50/p95/máx. da latência
+das rotas leves.
+
+Uso:
+    python benchmarks/load_test.py [--modes dev,gunicorn] [--analyses 8] [--posts 20]
+                                   [--probes 4] [--latency-ms 20] [--output resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEB_APP = os.path.join(ROOT, "web-app")
+
+
+class FakeFunctionHandler(BaseHTTPRequestHandler):
+    """Imita o SearchFunction: devolve `limit` posts com títulos nunca repetidos."""
+
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        subreddit = qs.get("subreddit", ["loadtest"])[0]
+        limit = int(qs.get("limit", ["10"])[0])
+        batch = uuid.uuid4().hex[:8]
+        posts = [{"id": f"{subreddit}_{batch}{i}", "subreddit": subreddit,
+                  "title": f"Post {batch} {i} about cloud computing and sentiment",
+                  "url": "https://example.com", "score": i} for i in range(limit)]
+        body = json.dumps({"posts": posts}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _start_server(mode: str, port: int, env: dict) -> subprocess.Popen:
+    if mode == "dev":
+        cmd = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port)]
+    elif mode == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+        env = dict(env, PORT=str(port))
+    else:
+        raise ValueError(f"Modo desconhecido: {mode}")
+    return subprocess.Popen(cmd, cwd=WEB_APP, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(base: str, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base}/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"O servidor em {base} não ficou pronto em {timeout:.0f}s")
+
+
+def _run_analysis(base: str, posts: int, durations: list, errors: list):
+    s = requests.Session()
+    start = time.perf_counter()
+    try:
+        s.get(f"{base}/search", params={"subreddit": "loadtest", "sort": "hot", "limit": posts},
+              timeout=60).raise_for_status()
+        res = s.post(f"{base}/detail_all", allow_redirects=False, timeout=60)
+        job_id = res.headers["Location"].rstrip("/").rsplit("/", 1)[-1]
+        while True:
+            state = s.get(f"{base}/analise/{job_id}/estado", timeout=60).json()["state"]
+            if state in ("done", "failed"):
+                break
+            time.sleep(0.2)
+        if state == "failed":
+            raise RuntimeError(f"job {job_id} falhou")
+        durations.append(time.perf_counter() - start)
+    except Exception as e:
+        errors.append(str(e))
+
+
+def _run_probe(base: str, stop: threading.Event, latencies: list):
+    s = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            s.get(f"{base}/", timeout=60)
+            latencies.append(time.perf_counter() - start)
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+
+
+def run_mode(mode: str, args, function_url: str) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix=f"loadtest-{mode}-")
+    env = dict(os.environ,
+               SENTIMENT_BACKEND="stub",
+               STUB_LATENCY_MS=str(args.latency_ms),
+               FUNCTION_URL=function_url,
+               MODEL_WARMUP=os.environ.get("MODEL_WARMUP", "preload"),
+               SENTIMENT_CACHE_PATH=os.path.join(workdir, "sentiment.sqlite3"),
+               JOB_STORE_PATH=os.path.join(workdir, "jobs.sqlite3") if mode == "gunicorn" else "",
+               RESULT_STORE_PATH=os.path.join(workdir, "results.sqlite3") if mode == "gunicorn" else "")
+    proc = _start_server(mode, port, env)
+    try:
+        _wait_ready(base)
+        durations, errors, latencies = [], [], []
+        stop = threading.Event()
+        probes = [threading.Thread(target=_run_probe, args=(base, stop, latencies)) for _ in range(args.probes)]
+        clients = [threading.Thread(target=_run_analysis, args=(base, args.posts, durations, errors))
+                   for _ in range(args.analyses)]
+        for t in probes:
+            t.start()
+        start = time.perf_counter()
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        wall = time.perf_counter() - start
+        stop.set()
+        for t in probes:
+            t.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    return {
+        "mode": mode,
+        "analyses": len(durations),
+        "errors": errors,
+        "wall_seconds": round(wall, 2),
+        "analyses_per_second": round(len(durations) / wall, 3) if wall else 0.0,
+        "analysis_p50_s": round(_percentile(durations, 50), 2),
+        "analysis_p95_s": round(_percentile(durations, 95), 2),
+        "light_requests": len(latencies),
+        "light_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "light_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "light_max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="dev,gunicorn")
+    parser.add_argument("--analyses", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    function = ThreadingHTTPServer(("127.0.0.1", 0), FakeFunctionHandler)
+    threading.Thread(target=function.serve_forever, daemon=True).start()
+    function_url = f"http://127.0.0.1:{function.server_address[1]}/api/SearchFunction"
+
+    reports = [run_mode(mode, args, function_url) for mode in args.modes.split(",")]
+    function.shutdown()
+
+    print(f"{'modo':<10}{'análises':>9}{'total(s)':>10}{'análises/s':>12}{'p95 análise(s)':>16}"
+          f"{'p50 leve(ms)':>14}{'p95 leve(ms)':>14}{'erros':>7}")
+    for r in reports:
+        print(f"{r['mode']:<10}{r['analyses']:>9}{r['wall_seconds']:>10}{r['analyses_per_second']:>12}"
+              f"{r['analysis_p95_s']:>16}{r['light_p50_ms']:>14}{r['light_p95_ms']:>14}{len(r['errors']):>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"posts_per_analysis": args.posts, "stub_latency_ms": args.latency_ms,
+                       "results": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,83 @@
 import logging
 import azure.functions as func
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+
+from shared_code import sentiment
+from shared_code.cosmos import get_container, COSMOS_CONTAINER
+from shared_code.sentiment_rollups import is_current, update_rollups
+
+# Únicos campos escritos pelo trigger; o resto do documento pertence à ingestão
+SENTIMENT_FIELDS = ("sentiment", "scores", "sentiment_key", "rollup")
+
+
+def _clean(doc: dict) -> dict:
+    """Remove as propriedades de sistema (_rid, _etag, _lsn, ...)."""
+    return {k: v for k, v in doc.items() if not k.startswith("_")}
+
+
+def _patch_sentiment(container, d: dict, etag: str) -> bool:
+    """
+    Grava só os campos de sentimento, condicionado ao _etag lido do change
+    feed. Se a ingestão tiver gravado uma versão mais recente entretanto, a
+    escrita é recusada (False): essa versão chega ao trigger num novo evento,
+    e não se repõem valores antigos de `score`/`title_eng`.
+    """
+    operations = [{"op": "set", "path": f"/{f}", "value": d[f]} for f in SENTIMENT_FIELDS if f in d]
+    try:
+        container.patch_item(item=d["id"], partition_key=d["subreddit"], patch_operations=operations,
+                             etag=etag, match_condition=MatchConditions.IfNotModified)
+        return True
+    except (exceptions.CosmosAccessConditionFailedError, exceptions.CosmosResourceNotFoundError):
+        return False
+
 
 def main(docs: func.DocumentList) -> None:
-    if docs:
-        logging.info(f"Recebidos {len(docs)} documentos novos/alterados.")
-        for doc in docs:
-            logging.info(f"Processando documento id={doc.get('id')}: {doc}")
-            # Exemplo: chame aqui um serviço de análise de sentimento
-            # sentiment = analyze_sentiment(doc.get("text"))
-            # depois, talvez grave o resultado de volta no Cosmos ou envie para outro sistema
+    if not docs:
+        return
+    logging.info(f"Recebidos {len(docs)} documentos novos/alterados.")
+
+    etags = {}
+    pending = []
+    # Já pontuados (p.ex. pela web-app) mas com a contribuição nos agregados em falta ou desatualizada (score)
+    unaggregated = []
+    skipped = 0
+    for doc in docs:
+        raw = doc.to_dict()
+        d = _clean(raw)
+        etags[d["id"]] = raw.get("_etag")
+        text = sentiment.text_for(d)
+        if not text:
+            skipped += 1
+            continue
+        key = sentiment.sentiment_key(text)
+        # Já pontuado com este texto/modelo (inclui a nossa própria escrita): evita ciclos no trigger
+        if d.get("sentiment_key") == key:
+            if is_current(d):
+                skipped += 1
+            else:
+                unaggregated.append(d)
+            continue
+        pending.append((d, text, key))
+
+    if not pending and not unaggregated:
+        logging.info(f"Nada para pontuar ({skipped} documentos ignorados).")
+        return
+
+    results = sentiment.score_texts([text for _, text, _ in pending])
+
+    updated = []
+    for (d, _, key), (label, scores) in zip(pending, results):
+        d["sentiment"] = label
+        d["scores"] = scores
+        d["sentiment_key"] = key
+        updated.append(d)
+    updated.extend(unaggregated)
+
+    # Agregados por hora/dia; cada documento fica com a sua contribuição no campo `rollup`
+    buckets = update_rollups(updated)
+
+    container = get_container(COSMOS_CONTAINER)
+    stale = sum(not _patch_sentiment(container, d, etags[d["id"]]) for d in updated)
+    logging.info(f"Sentimento gravado em {len(pending)} documentos, {len(updated)} agregados "
+                 f"em {buckets} buckets ({skipped} ignorados, {stale} alterados entretanto).")
@@ -1,50 +1,15 @@
 import os
 import logging
 import json
-import requests
-from requests.auth import HTTPBasicAuth
 import azure.functions as func
-from azure.cosmos import CosmosClient
-
-# --- Azure Translator Config ---
-TRANSLATOR_KEY = os.environ.get("TRANSLATOR_KEY")
-TRANSLATOR_ENDPOINT = os.environ.get("TRANSLATOR_ENDPOINT")
-TRANSLATOR_REGION = os.environ.get("TRANSLATOR_REGION", "francecentral")
-
-# --- Funções de Tradução ---
-def detect_language(text: str) -> str:
-    """Detecta o idioma de um texto usando Azure Translator."""
-    path = '/detect'
-    url = TRANSLATOR_ENDPOINT + path
-    params = {'api-version': '3.0'}
-    headers = {
-        'Ocp-Apim-Subscription-Key': TRANSLATOR_KEY,
-        'Ocp-Apim-Subscription-Region': TRANSLATOR_REGION,
-        'Content-Type': 'application/json'
-    }
-    body = [{'text': text}]
-    resp = requests.post(url, params=params, headers=headers, json=body)
-    resp.raise_for_status()
-    return resp.json()[0]['language']
-
-
-def translate_to_english(text: str, from_lang: str = None) -> str:
-    """Traduz texto para inglês usando Azure Translator."""
-    path = '/translate'
-    url = TRANSLATOR_ENDPOINT + path
-    params = {'api-version': '3.0', 'to': ['en']}
-    if from_lang:
-        params['from'] = from_lang
-    headers = {
-        'Ocp-Apim-Subscription-Key': TRANSLATOR_KEY,
-        'Ocp-Apim-Subscription-Region': TRANSLATOR_REGION,
-        'Content-Type': 'application/json'
-    }
-    body = [{'text': text}]
-    resp = requests.post(url, params=params, headers=headers, json=body)
-    resp.raise_for_status()
-    result = resp.json()
-    return result[0]['translations'][0]['text']
+
+from shared_code.reddit_listing import iter_pages
+from shared_code.translator import TRANSLATOR_KEY, TRANSLATOR_ENDPOINT
+from shared_code.ingest_pipeline import IngestPipeline
+from shared_code.cosmos import get_container
+from shared_code.ingest_state import load_high_water_mark, save_high_water_mark, save_listing, post_position
+from shared_code.post_reader import SEARCH_MAX_AGE, fresh_listing, remember
+from shared_code.async_ingest import run_ingest_many
 
 # --- Configurações e credenciais ---
 logging.basicConfig(level=logging.INFO)
@@ -77,9 +42,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     logger.info("HTTP trigger recebido para buscar Reddit e gravar no Cosmos")
 
     subreddit = req.params.get("subreddit")
-    if not subreddit:
+    # Modo fan-out: subreddits=a,b,c ingeridos em paralelo
+    subreddits = [s.strip() for s in req.params.get("subreddits", "").split(",") if s.strip()]
+    if not subreddit and not subreddits:
         return func.HttpResponse(
-            json.dumps({"error": "Falta parâmetro 'subreddit'."}, ensure_ascii=False),
+            json.dumps({"error": "Falta parâmetro 'subreddit' ou 'subreddits'."}, ensure_ascii=False),
             status_code=400, mimetype="application/json"
         )
 
@@ -91,7 +58,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400, mimetype="application/json"
         )
 
+    # Idade máxima (s) de uma ingestão anterior para ser servida do Cosmos; 0 força nova ingestão
+    try:
+        max_age = int(req.params.get("max_age", str(SEARCH_MAX_AGE)))
+    except ValueError:
+        return func.HttpResponse(
+            json.dumps({"error": "Parâmetro 'max_age' deve ser inteiro."}, ensure_ascii=False),
+            status_code=400, mimetype="application/json"
+        )
+
     sort = req.params.get("sort", "hot")
+    # Modo incremental: só posts mais recentes do que a última ingestão (apenas sort=new)
+    incremental = req.params.get("incremental", "false").lower() in ("1", "true", "yes")
+    if incremental and sort != "new":
+        return func.HttpResponse(
+            json.dumps({"error": "O modo 'incremental' só é suportado com sort=new."}, ensure_ascii=False),
+            status_code=400, mimetype="application/json"
+        )
 
     if not all([CLIENT_ID, CLIENT_SECRET, REDDIT_USER, REDDIT_PASSWORD]):
         missing = [k for k,v in {
@@ -105,8 +88,19 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             status_code=500, mimetype="application/json"
         )
 
+    if subreddits:
+        if incremental:
+            return func.HttpResponse(
+                json.dumps({"error": "O modo 'incremental' não é suportado com 'subreddits'."}, ensure_ascii=False),
+                status_code=400, mimetype="application/json"
+            )
+        return _fan_out(subreddits, sort, limit)
+
     try:
-        posts = _fetch_and_store(subreddit, sort, limit)
+        if incremental:
+            posts, stats = _fetch_incremental(subreddit, limit)
+        else:
+            posts, stats = _search(subreddit, sort, limit, max_age)
     except Exception as e:
         logger.error(f"Erro interno na ingestão: {e}", exc_info=e)
         return func.HttpResponse(
@@ -114,6 +108,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             status_code=500, mimetype="application/json"
         )
 
+    body = json.dumps({"posts": _sanitize(posts), "stats": stats}, ensure_ascii=False)
+    return func.HttpResponse(body, status_code=200, mimetype="application/json")
+
+
+def _sanitize(posts: list) -> list:
     sanitized = []
     for p in posts:
         sanitized.append({
@@ -121,77 +120,121 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "subreddit": p.get("subreddit"),
             "title": p.get("title"),
             "title_eng": p.get("title_eng"),
+            "selftext": p.get("selftext"),
+            "selftext_eng": p.get("selftext_eng"),
             "url": p.get("url"),
-            "score": p.get("score")
+            "score": p.get("score"),
+            # Preenchidos pelo CosmosTriggerFunction quando o post já foi pontuado
+            "sentiment": p.get("sentiment"),
+            "scores": p.get("scores"),
+            # Texto/modelo com que foi pontuado; a web-app ignora scores de outro texto
+            "sentiment_key": p.get("sentiment_key")
         })
+    return sanitized
 
-    body = json.dumps({"posts": sanitized}, ensure_ascii=False)
-    return func.HttpResponse(body, status_code=200, mimetype="application/json")
+
+def _fan_out(subreddits: list, sort: str, limit: int) -> func.HttpResponse:
+    """Ingere vários subreddits em paralelo; um erro num não impede os outros."""
+    try:
+        results = run_ingest_many(subreddits, sort, limit)
+    except Exception as e:
+        logger.error(f"Erro interno na ingestão fan-out: {e}", exc_info=e)
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}, ensure_ascii=False),
+            status_code=500, mimetype="application/json"
+        )
+
+    body = {}
+    for sub, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"Erro na ingestão de r/{sub}: {result}", exc_info=result)
+            body[sub] = {"error": str(result)}
+        else:
+            body[sub] = {"posts": _sanitize(result)}
+    return func.HttpResponse(json.dumps({"subreddits": body}, ensure_ascii=False),
+                             status_code=200, mimetype="application/json")
+
+
+def _search(subreddit: str, sort: str, limit: int, max_age: int):
+    """Serve a listagem do Cosmos se a última ingestão for recente; senão ingere-a de novo."""
+    if max_age > 0:
+        try:
+            posts = fresh_listing(get_container(COSMOS_CONTAINER), subreddit, sort, limit, max_age)
+        except Exception as e:
+            logger.warning(f"Leitura de r/{subreddit} do Cosmos falhou, a ingerir: {e}")
+            posts = None
+        if posts is not None:
+            logger.info(f"r/{subreddit}/{sort}: {len(posts)} posts servidos do Cosmos (ingestão recente)")
+            return posts, {"source": "cosmos"}
+
+    posts, stats = _fetch_and_store(subreddit, sort, limit)
+    try:
+        save_listing(subreddit, sort, [p["id"] for p in posts])
+    except Exception as e:
+        logger.warning(f"Falha ao registar a listagem de r/{subreddit}/{sort}: {e}")
+    remember(subreddit, sort, limit, posts)
+    return posts, dict(stats, source="ingest")
 
 
 def _fetch_and_store(subreddit: str, sort: str, limit: int):
-    # Autenticação OAuth2 no Reddit
-    auth = HTTPBasicAuth(CLIENT_ID, CLIENT_SECRET)
-    token_res = requests.post(
-        "https://www.reddit.com/api/v1/access_token",
-        auth=auth,
-        data={
-            "grant_type": "password",
-            "username": REDDIT_USER,
-            "password": REDDIT_PASSWORD
-        },
-        headers={"User-Agent": f"{REDDIT_USER}/0.1"}
-    )
-    token_res.raise_for_status()
-    token = token_res.json().get("access_token")
-    if not token:
-        raise RuntimeError("Não obteve access_token do Reddit.")
-
-    # Fetch de posts
-    res = requests.get(
-        f"https://oauth.reddit.com/r/{subreddit}/{sort}",
-        headers={
-            "Authorization": f"bearer {token}",
-            "User-Agent": f"{REDDIT_USER}/0.1"
-        },
-        params={"limit": limit}
-    )
-    res.raise_for_status()
-    children = res.json().get("data", {}).get("children", [])
-    if not isinstance(children, list):
-        raise RuntimeError("Resposta inesperada da API do Reddit.")
-
-    client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
-    db     = client.create_database_if_not_exists(COSMOS_DATABASE)
-    cont   = db.create_container_if_not_exists(
-        id=COSMOS_CONTAINER,
-        partition_key={"path": "/subreddit"}
-    )
-
-    posts = []
-    for c in children:
-        d = c.get("data", {})
-        rid = d.get("id")
-        if not rid:
-            continue
-        title = d.get("title", "")
-        # 1) Detecta idioma e traduz apenas se necessário
-        lang = detect_language(title)
-        if lang.lower().startswith('en'):
-            title_eng = title
-        else:
-            title_eng = translate_to_english(title, from_lang=lang)
-
-        item = {
-            "id":        f"{subreddit}_{rid}",
-            "subreddit": subreddit,
-            "title":     title,
-            "title_eng": title_eng,
-            "url":       d.get("url", ""),
-            "score":     d.get("score", 0)
-        }
-        cont.upsert_item(item)
-        logger.info(f"Upserted item: {item['id']}")
-        posts.append(item)
-
-    return posts
+    # Cliente e container reutilizados entre invocações
+    cont = get_container(COSMOS_CONTAINER)
+
+    # Reddit, Translator e Cosmos em estágios sobrepostos; com sort=new a
+    # paginação pára na primeira página com posts já ingeridos
+    pipeline = IngestPipeline(cont, subreddit, stop_at_known=(sort == "new"))
+    posts = pipeline.run(iter_pages(subreddit, sort, limit))
+    return posts, pipeline.report()
+
+
+def _fetch_incremental(subreddit: str, limit: int):
+    """
+    Ingere apenas os posts de r/<subreddit>/new posteriores à high-water mark.
+
+    Se o cursor `before` não devolver nada (sem novidades, ou o post da marca
+    foi apagado e o Reddit deixa de o reconhecer), repete com a listagem /new
+    normal, do mais recente para o mais antigo, até chegar a um post que não
+    seja posterior à marca.
+    """
+    cont = get_container(COSMOS_CONTAINER)
+    mark = load_high_water_mark(subreddit)
+    before = mark["newest_fullname"] if mark else None
+    mark_position = post_position(mark["newest_created_utc"], before) if mark else None
+    newest = {"utc": mark["newest_created_utc"] if mark else 0, "name": before}
+
+    def newer(d: dict) -> bool:
+        return mark is None or post_position(d.get("created_utc", 0), d["id"]) > mark_position
+
+    def track(entries: list):
+        for d in entries:
+            name = d.get("name") or f"t3_{d['id']}"
+            if newest["name"] is None or \
+                    post_position(d.get("created_utc", 0), name) > post_position(newest["utc"], newest["name"]):
+                newest["utc"], newest["name"] = d.get("created_utc", 0), name
+
+    def new_pages():
+        received = False
+        for entries in iter_pages(subreddit, "new", limit, before=before):
+            received = True
+            # Salvaguarda caso o Reddit devolva posts já cobertos pela marca
+            entries = [d for d in entries if newer(d)]
+            track(entries)
+            if entries:
+                yield entries
+        if received or not before:
+            return
+        for entries in iter_pages(subreddit, "new", limit):
+            fresh = [d for d in entries if newer(d)]
+            track(fresh)
+            if fresh:
+                yield fresh
+            if len(fresh) < len(entries):
+                return
+
+    pipeline = IngestPipeline(cont, subreddit)
+    posts = pipeline.run(new_pages())
+
+    if newest["name"] and newest["name"] != before:
+        save_high_water_mark(subreddit, newest["name"], newest["utc"])
+    logger.info(f"r/{subreddit}: ingestão incremental com {len(posts)} posts novos")
+    return posts, pipeline.report()
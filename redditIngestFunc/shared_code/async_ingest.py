@@ -0,0 +1,281 @@
+"""
+Ingestão concorrente de vários subreddits (modo fan-out do SearchFunction).
+
+Usa uma única sessão aiohttp para o Reddit e o Translator e o cliente
+assíncrono do Cosmos, de forma a que os pedidos de vários subreddits
+decorram em paralelo. Como no registo síncrono (cosmos.py), a sessão e o
+cliente são criados uma vez por processo: vivem num event loop próprio,
+numa thread dedicada, que todas as invocações reutilizam (`run_ingest_many`).
+Cada serviço tem o seu próprio limite de concorrência (semáforo), para não
+disparar as quotas do Reddit/Translator nem o throttling do Cosmos; os 429
+do Cosmos são repetidos com o mesmo backoff do pipeline síncrono. A lógica
+de negócio (cache de traduções, deteção de inalterados, formato dos
+documentos, listagem e high-water mark gravadas) é a mesma do caminho
+síncrono.
+"""
+import os
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+import aiohttp
+from azure.core.exceptions import HttpResponseError
+from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
+
+from shared_code import cosmos, ingest_state, ingest_writer, reddit_listing, term_index, translator
+from shared_code.ingest_pipeline import COSMOS_MAX_THROTTLE_RETRIES, throttle_delay
+from shared_code.post_reader import remember
+from shared_code.reddit_auth import REDDIT_API_BASE, get_token_provider
+
+logger = logging.getLogger(__name__)
+
+REDDIT_CONCURRENCY = int(os.environ.get("REDDIT_CONCURRENCY", "4"))
+TRANSLATOR_CONCURRENCY = int(os.environ.get("TRANSLATOR_CONCURRENCY", "4"))
+COSMOS_CONCURRENCY = int(os.environ.get("COSMOS_CONCURRENCY", "8"))
+
+_loop = None
+_loop_lock = threading.Lock()
+# Só acedidos a partir de `_loop`
+_session = None
+_client = None
+_container = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop do processo (numa thread daemon), criado na primeira utilização."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-ingest", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+async def _shared_clients():
+    """Sessão aiohttp e container assíncrono do Cosmos, criados uma vez no loop do processo."""
+    global _session, _client, _container
+    if _container is None:
+        # Garante (uma vez por processo) que a base de dados e o container existem
+        await asyncio.to_thread(cosmos.get_container, cosmos.COSMOS_CONTAINER)
+        # Nova verificação: outra execução pode tê-los criado durante o await
+        if _container is None:
+            _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+            _client = AsyncCosmosClient(cosmos.COSMOS_ENDPOINT, cosmos.COSMOS_KEY)
+            _container = _client.get_database_client(cosmos.COSMOS_DATABASE) \
+                                .get_container_client(cosmos.COSMOS_CONTAINER)
+            logger.info("Sessão HTTP e cliente Cosmos assíncronos inicializados")
+    return _session, _container
+
+
+class AsyncIngestor:
+    """Estado partilhado por uma execução fan-out: sessão HTTP, cliente Cosmos e semáforos."""
+
+    def __init__(self, session: aiohttp.ClientSession, container):
+        self.session = session
+        self.container = container
+        self.provider = get_token_provider()
+        self.reddit_slots = asyncio.Semaphore(REDDIT_CONCURRENCY)
+        self.translator_slots = asyncio.Semaphore(TRANSLATOR_CONCURRENCY)
+        self.cosmos_slots = asyncio.Semaphore(COSMOS_CONCURRENCY)
+        self.throttled = 0
+
+    # --- Reddit ---
+    async def _reddit_get(self, path: str, params: dict) -> dict:
+        for attempt in range(reddit_listing.MAX_RETRIES + 1):
+            # O primeiro pedido de token é síncrono; depois vem sempre da cache
+            token = await asyncio.to_thread(self.provider.get_token)
+            async with self.reddit_slots:
+                async with self.session.get(
+                    REDDIT_API_BASE + path,
+                    params={k: str(v) for k, v in params.items()},
+                    headers={"Authorization": f"bearer {token}", "User-Agent": self.provider.user_agent},
+                ) as res:
+                    if res.status == 401 and attempt == 0:
+                        self.provider.invalidate(token)
+                        continue
+                    if res.status == 429 and attempt < reddit_listing.MAX_RETRIES:
+                        delay = reddit_listing.retry_delay(res.headers, attempt)
+                    else:
+                        res.raise_for_status()
+                        data = (await res.json()).get("data", {})
+                        delay = reddit_listing.rate_limit_delay(res.headers)
+                        if delay:
+                            await asyncio.sleep(delay)
+                        return data
+            logger.warning(f"Reddit respondeu 429; nova tentativa em {delay:.0f}s")
+            await asyncio.sleep(delay)
+        raise RuntimeError(f"Reddit indisponível para {path}")
+
+    async def iter_pages(self, subreddit: str, sort: str, limit: int):
+        after = None
+        fetched = 0
+        while fetched < limit:
+            params = {"limit": min(reddit_listing.PAGE_SIZE, limit - fetched)}
+            if after:
+                params.update(after=after, count=fetched)
+            data = await self._reddit_get(f"/r/{subreddit}/{sort}", params)
+            children = data.get("children", [])
+            if not isinstance(children, list):
+                raise RuntimeError("Resposta inesperada da API do Reddit.")
+            page = [c.get("data", {}) for c in children]
+            page = [d for d in page if d.get("id")][:limit - fetched]
+            if page:
+                fetched += len(page)
+                yield page
+            after = data.get("after")
+            if not after or not children:
+                return
+
+    # --- Translator ---
+    async def _translator_post(self, path: str, params: dict, texts: list) -> list:
+        results = [None] * len(texts)
+        chunks = list(translator.chunks(texts))
+
+        async def send(idx):
+            async with self.translator_slots:
+                async with self.session.post(
+                    translator.TRANSLATOR_ENDPOINT + path,
+                    params=params,
+                    headers=translator.request_headers(),
+                    json=[{"text": texts[i]} for i in idx],
+                    timeout=aiohttp.ClientTimeout(total=translator.TRANSLATOR_TIMEOUT),
+                ) as resp:
+                    resp.raise_for_status()
+                    for i, r in zip(idx, await resp.json()):
+                        results[i] = r
+
+        await asyncio.gather(*(send(idx) for idx in chunks))
+        return results
+
+    async def to_english(self, texts: list, known: list = None) -> list:
+        english, candidates, hits = translator.lookup_cached(texts, known)
+        foreign = []
+        if candidates:
+            detected = await self._translator_post(
+                "/detect", {"api-version": "3.0"}, [texts[i] for i in candidates]
+            )
+            foreign = [i for i, r in zip(candidates, detected) if not r["language"].lower().startswith("en")]
+            if foreign:
+                translated = await self._translator_post(
+                    "/translate", [("api-version", "3.0"), ("to", "en")], [texts[i] for i in foreign]
+                )
+                for i, r in zip(foreign, translated):
+                    english[i] = r["translations"][0]["text"]
+        translator.store_results(texts, english, candidates, len(foreign), hits)
+        return english
+
+    # --- Cosmos ---
+    async def _cosmos(self, call):
+        """Executa `call()` (uma corrotina) repetindo-a nos 429, como o IngestPipeline._write."""
+        for attempt in range(COSMOS_MAX_THROTTLE_RETRIES + 1):
+            try:
+                async with self.cosmos_slots:
+                    return await call()
+            except HttpResponseError as e:
+                if e.status_code != 429 or attempt == COSMOS_MAX_THROTTLE_RETRIES:
+                    raise
+                self.throttled += 1
+                delay = throttle_delay(e, attempt)
+                logger.warning(f"Cosmos respondeu 429; nova tentativa em {delay:.1f}s")
+                # Fora do semáforo, para não reter a vaga durante a espera
+                await asyncio.sleep(delay)
+
+    async def load_existing(self, subreddit: str, ids: list) -> dict:
+        if not ids:
+            return {}
+
+        async def query():
+            items = self.container.query_items(
+                query=ingest_writer.EXISTING_QUERY,
+                parameters=[{"name": "@ids", "value": ids}],
+                partition_key=subreddit
+            )
+            return {item["id"]: item async for item in items}
+
+        return await self._cosmos(query)
+
+    async def write_posts(self, subreddit: str, posts: list, existing: dict):
+        to_write = ingest_writer.prepare_writes(posts, existing)
+
+        async def send(operations):
+            await self._cosmos(lambda: self.container.execute_item_batch(batch_operations=operations,
+                                                                         partition_key=subreddit))
+
+        await asyncio.gather(*(send(ops) for ops in ingest_writer.batches(to_write)))
+        logger.info(f"Cosmos ({subreddit}): {len(to_write)} gravados, "
+                    f"{len(posts) - len(to_write)} inalterados")
+
+    # --- Orquestração ---
+    async def ingest(self, subreddit: str, sort: str, limit: int) -> list:
+        posts = []
+        terms, new_posts = Counter(), 0
+        mark = await asyncio.to_thread(ingest_state.load_high_water_mark, subreddit) if sort == "new" else None
+        mark_position = ingest_state.post_position(mark["newest_created_utc"], mark["newest_fullname"]) \
+            if mark else None
+        newest, reached_mark = None, mark is None
+        async for entries in self.iter_pages(subreddit, sort, limit):
+            existing = await self.load_existing(subreddit, [f"{subreddit}_{d['id']}" for d in entries])
+            texts, known = ingest_writer.english_inputs(subreddit, entries, existing)
+            english = await self.to_english(texts, known)
+            page_posts = [ingest_writer.make_post(subreddit, d, t, s)
+                          for d, t, s in zip(entries, english[:len(entries)], english[len(entries):])]
+            await self.write_posts(subreddit, page_posts, existing)
+            posts.extend(page_posts)
+            delta, added = term_index.term_delta(page_posts, existing)
+            terms.update(delta)
+            new_posts += added
+            if sort == "new":
+                for d in entries:
+                    name = d.get("name") or f"t3_{d['id']}"
+                    position = ingest_state.post_position(d.get("created_utc", 0), name)
+                    if newest is None or position > newest[0]:
+                        newest = (position, name)
+                    reached_mark = reached_mark or position <= mark_position
+                # As páginas seguintes a um post já ingerido também já o estão
+                if existing:
+                    break
+        await asyncio.to_thread(term_index.update_index_delta, subreddit, terms, new_posts)
+        advance = newest is not None and reached_mark and (mark is None or newest[0] > mark_position)
+        await asyncio.to_thread(self._save_state, subreddit, sort, limit, posts, newest if advance else None)
+        return posts
+
+    @staticmethod
+    def _save_state(subreddit: str, sort: str, limit: int, posts: list, newest: tuple):
+        """
+        Listagem ingerida e cache de leitura, como o SearchFunction._search. Com
+        sort=new, a high-water mark avança só se a listagem chegou à marca
+        anterior (senão ficariam posts por ingerir entre as duas).
+        """
+        try:
+            ingest_state.save_listing(subreddit, sort, [p["id"] for p in posts])
+            if newest is not None:
+                (created_utc, _), name = newest
+                ingest_state.save_high_water_mark(subreddit, name, created_utc)
+        except Exception as e:
+            logger.warning(f"Falha ao registar o estado da ingestão de r/{subreddit}/{sort}: {e}")
+        remember(subreddit, sort, limit, posts)
+
+
+async def ingest_many(subreddits: list, sort: str, limit: int) -> dict:
+    """
+    Ingere todos os subreddits em paralelo. Devolve {subreddit: posts} ou
+    {subreddit: Exception} para os que falharam, sem afetar os restantes.
+    Tem de correr no loop do processo (ver `run_ingest_many`).
+    """
+    session, container = await _shared_clients()
+    ingestor = AsyncIngestor(session, container)
+    results = await asyncio.gather(
+        *(ingestor.ingest(sub, sort, limit) for sub in subreddits),
+        return_exceptions=True
+    )
+    if ingestor.throttled:
+        logger.info(f"Fan-out: {ingestor.throttled} pedidos ao Cosmos repetidos após 429")
+    return dict(zip(subreddits, results))
+
+
+def run_ingest_many(subreddits: list, sort: str, limit: int) -> dict:
+    """`ingest_many` executado (e aguardado) no event loop partilhado pelo processo."""
+    return asyncio.run_coroutine_threadsafe(ingest_many(subreddits, sort, limit), _event_loop()).result()
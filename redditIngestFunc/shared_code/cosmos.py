@@ -0,0 +1,67 @@
+"""
+Registo de clientes Cosmos DB partilhado pelo processo.
+
+O CosmosClient (e o seu pool de ligações HTTP) é criado uma única vez e os
+containers são resolvidos na primeira utilização: as chamadas de control
+plane `create_*_if_not_exists`, lentas e com throttling próprio, passam a
+acontecer uma vez por processo em vez de uma vez por pedido.
+"""
+import os
+import logging
+import threading
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.cosmos import CosmosClient
+
+logger = logging.getLogger(__name__)
+
+COSMOS_ENDPOINT = os.environ.get("COSMOS_ENDPOINT")
+COSMOS_KEY = os.environ.get("COSMOS_KEY")
+COSMOS_DATABASE = os.environ.get("COSMOS_DATABASE", "RedditApp")
+COSMOS_CONTAINER = os.environ.get("COSMOS_CONTAINER", "posts")
+# Ligações HTTP mantidas abertas por host
+COSMOS_POOL_SIZE = int(os.environ.get("COSMOS_POOL_SIZE", "20"))
+
+_client = None
+_database = None
+_containers = {}
+_lock = threading.Lock()
+
+
+def get_client() -> CosmosClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if not COSMOS_ENDPOINT or not COSMOS_KEY:
+                    raise RuntimeError("COSMOS_ENDPOINT e COSMOS_KEY não definidas")
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=COSMOS_POOL_SIZE,
+                                                        pool_maxsize=COSMOS_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _client = CosmosClient(
+                    COSMOS_ENDPOINT, COSMOS_KEY,
+                    transport=RequestsTransport(session=session, session_owner=False)
+                )
+    return _client
+
+
+def get_container(name: str = COSMOS_CONTAINER, partition_path: str = "/subreddit"):
+    """Container `name`, criado (se preciso) apenas na primeira chamada do processo."""
+    global _database
+    container = _containers.get(name)
+    if container is not None:
+        return container
+    client = get_client()
+    with _lock:
+        if name not in _containers:
+            if _database is None:
+                _database = client.create_database_if_not_exists(COSMOS_DATABASE)
+            _containers[name] = _database.create_container_if_not_exists(
+                id=name,
+                partition_key={"path": partition_path}
+            )
+            logger.info(f"Container Cosmos '{name}' inicializado")
+    return _containers[name]
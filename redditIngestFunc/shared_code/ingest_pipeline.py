@@ -0,0 +1,204 @@
+"""
+Pipeline de ingestão em três estágios sobrepostos.
+
+    Reddit (páginas) --fila--> tradução --fila--> escrita no Cosmos
+
+Cada estágio corre na sua thread e comunica por filas limitadas: enquanto o
+Cosmos grava a página N, o Translator já trata a N+1 e o Reddit devolve a
+N+2. Quando o Cosmos responde 429, o escritor aguarda e repete; as filas
+enchem e os estágios anteriores bloqueiam (backpressure) em vez de
+acumularem páginas em memória. No fim são registados os tempos de cada
+estágio e a profundidade máxima das filas.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from collections import Counter
+
+from azure.core.exceptions import HttpResponseError
+
+from shared_code.translator import to_english
+from shared_code.ingest_writer import load_existing, write_posts, make_post, english_inputs
+from shared_code.term_index import term_delta, update_index_delta
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "2"))
+COSMOS_MAX_THROTTLE_RETRIES = int(os.environ.get("COSMOS_MAX_THROTTLE_RETRIES", "5"))
+# Intervalo (s) com que o fetch volta a verificar `stop_fetching` enquanto a fila está cheia
+PUT_POLL_SECONDS = 0.5
+
+_DONE = object()
+
+
+def throttle_delay(error: HttpResponseError, attempt: int) -> float:
+    """Espera antes de repetir um pedido ao Cosmos que recebeu 429 (x-ms-retry-after-ms ou backoff)."""
+    headers = getattr(error, "headers", None) or (error.response.headers if error.response is not None else {})
+    retry_ms = headers.get("x-ms-retry-after-ms")
+    return float(retry_ms) / 1000 if retry_ms else 2 ** attempt
+
+
+class StageStats:
+    def __init__(self):
+        self.busy_seconds = 0.0
+        self.items = 0
+        self.max_queue_depth = 0
+
+    def as_dict(self) -> dict:
+        return {"busy_seconds": round(self.busy_seconds, 3), "items": self.items,
+                "max_queue_depth": self.max_queue_depth}
+
+
+class IngestPipeline:
+    """Executa fetch -> tradução -> escrita para as páginas de um subreddit."""
+
+    def __init__(self, container, subreddit: str, stop_at_known: bool = False):
+        self.container = container
+        self.subreddit = subreddit
+        # Com sort=new, parar de pedir páginas ao encontrar posts já ingeridos
+        self.stop_at_known = stop_at_known
+        self.fetched = queue.Queue(maxsize=QUEUE_SIZE)
+        self.translated = queue.Queue(maxsize=QUEUE_SIZE)
+        self.stop_fetching = threading.Event()
+        self.errors = []
+        self.stats = {"fetch": StageStats(), "translate": StageStats(), "write": StageStats()}
+        self.throttled = 0
+        # Variação do índice de termos, aplicada uma vez no fim da ingestão
+        self.terms = Counter()
+        self.new_posts = 0
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        # Bloqueia enquanto a fila estiver cheia (backpressure); os consumidores
+        # drenam sempre as filas até _DONE, mesmo após um erro
+        q.put(item)
+        stats.max_queue_depth = max(stats.max_queue_depth, q.qsize())
+
+    def _offer(self, q: queue.Queue, item, stats: StageStats) -> bool:
+        """Como `_put`, mas desiste (devolve False) se a paginação for interrompida."""
+        while not self.stop_fetching.is_set():
+            try:
+                q.put(item, timeout=PUT_POLL_SECONDS)
+            except queue.Full:
+                continue
+            stats.max_queue_depth = max(stats.max_queue_depth, q.qsize())
+            return True
+        return False
+
+    def _fail(self, e: Exception):
+        self.errors.append(e)
+        self.stop_fetching.set()
+
+    def _fetch_stage(self, pages):
+        stats = self.stats["fetch"]
+        try:
+            it = iter(pages)
+            while not self.stop_fetching.is_set():
+                start = time.perf_counter()
+                page = next(it, None)
+                stats.busy_seconds += time.perf_counter() - start
+                if page is None:
+                    break
+                stats.items += len(page)
+                if not self._offer(self.fetched, page, stats):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(self.fetched, _DONE, stats)
+
+    def _translate_stage(self):
+        stats = self.stats["translate"]
+        try:
+            while True:
+                entries = self.fetched.get()
+                if entries is _DONE:
+                    break
+                if self.errors:
+                    continue
+                try:
+                    posts, existing = self._translate(entries, stats)
+                except Exception as e:
+                    # Continua a drenar a fila até _DONE, para o fetch nunca ficar bloqueado
+                    self._fail(e)
+                    continue
+                self._put(self.translated, (posts, existing), stats)
+        finally:
+            self._put(self.translated, _DONE, stats)
+
+    def _translate(self, entries: list, stats: StageStats):
+        start = time.perf_counter()
+        ids = [f"{self.subreddit}_{d['id']}" for d in entries]
+        existing = load_existing(self.container, self.subreddit, ids)
+        texts, known = english_inputs(self.subreddit, entries, existing)
+        english = to_english(texts, known=known)
+        posts = [make_post(self.subreddit, d, t, s)
+                 for d, t, s in zip(entries, english[:len(entries)], english[len(entries):])]
+        stats.busy_seconds += time.perf_counter() - start
+        stats.items += len(posts)
+        if self.stop_at_known and existing:
+            logger.info(f"r/{self.subreddit}: alcançados posts já ingeridos, paginação terminada")
+            self.stop_fetching.set()
+        return posts, existing
+
+    def _write(self, posts: list, existing: dict):
+        for attempt in range(COSMOS_MAX_THROTTLE_RETRIES + 1):
+            try:
+                return write_posts(self.container, self.subreddit, posts, existing=existing)
+            except HttpResponseError as e:
+                if e.status_code != 429 or attempt == COSMOS_MAX_THROTTLE_RETRIES:
+                    raise
+                self.throttled += 1
+                delay = throttle_delay(e, attempt)
+                logger.warning(f"Cosmos respondeu 429; escrita suspensa durante {delay:.1f}s")
+                time.sleep(delay)
+
+    def run(self, pages) -> list:
+        """Consome `pages` (iterável de listas de posts do Reddit) e devolve os documentos gravados."""
+        started = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._fetch_stage, args=(pages,), daemon=True),
+            threading.Thread(target=self._translate_stage, daemon=True),
+        ]
+        for w in workers:
+            w.start()
+
+        posts = []
+        stats = self.stats["write"]
+        while True:
+            item = self.translated.get()
+            if item is _DONE:
+                break
+            if self.errors:
+                continue
+            page_posts, existing = item
+            start = time.perf_counter()
+            try:
+                self._write(page_posts, existing)
+            except Exception as e:
+                self._fail(e)
+                continue
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items += len(page_posts)
+            posts.extend(page_posts)
+            delta, new_posts = term_delta(page_posts, existing)
+            self.terms.update(delta)
+            self.new_posts += new_posts
+
+        for w in workers:
+            w.join()
+        if self.errors:
+            raise self.errors[0]
+        update_index_delta(self.subreddit, self.terms, self.new_posts)
+
+        report = {name: s.as_dict() for name, s in self.stats.items()}
+        logger.info(f"r/{self.subreddit}: pipeline concluído em {time.perf_counter() - started:.2f}s "
+                    f"(throttles Cosmos={self.throttled}) {report}")
+        return posts
+
+    def report(self) -> dict:
+        return {
+            "stages": {name: s.as_dict() for name, s in self.stats.items()},
+            "cosmos_throttled": self.throttled,
+        }
@@ -0,0 +1,76 @@
+"""
+Estado da ingestão por subreddit.
+
+Guarda, num container de metadados particionado por /subreddit (separado do
+container de posts para não gerar eventos no change feed):
+  - a "high-water mark" da ingestão incremental (fullname e created_utc do
+    post mais recente já ingerido);
+  - a última listagem ingerida de cada sort (ids pela ordem do Reddit e
+    instante da ingestão), usada para servir pesquisas recentes do Cosmos.
+"""
+import os
+import time
+import logging
+
+from azure.cosmos import exceptions
+
+from shared_code.cosmos import get_container
+
+logger = logging.getLogger(__name__)
+
+COSMOS_METADATA_CONTAINER = os.environ.get("COSMOS_METADATA_CONTAINER", "metadata")
+
+
+def post_position(created_utc: float, fullname: str) -> tuple:
+    """Ordem de um post na listagem /new: (created_utc, id base36), para desempatar no mesmo segundo."""
+    return created_utc or 0, int(fullname.rsplit("_", 1)[-1], 36)
+
+
+def _state_id(subreddit: str) -> str:
+    return f"hwm_{subreddit}"
+
+
+def load_high_water_mark(subreddit: str) -> dict:
+    """Documento com `newest_fullname`/`newest_created_utc`, ou None se ainda não existir."""
+    try:
+        return get_container(COSMOS_METADATA_CONTAINER).read_item(
+            item=_state_id(subreddit), partition_key=subreddit
+        )
+    except exceptions.CosmosResourceNotFoundError:
+        return None
+
+
+def save_high_water_mark(subreddit: str, fullname: str, created_utc: float):
+    get_container(COSMOS_METADATA_CONTAINER).upsert_item({
+        "id": _state_id(subreddit),
+        "subreddit": subreddit,
+        "doc_type": "ingest_state",
+        "newest_fullname": fullname,
+        "newest_created_utc": created_utc,
+    })
+    logger.info(f"r/{subreddit}: high-water mark atualizada para {fullname}")
+
+
+def _listing_id(subreddit: str, sort: str) -> str:
+    return f"listing_{sort}_{subreddit}"
+
+
+def load_listing(subreddit: str, sort: str) -> dict:
+    """Documento com `ids`/`ingested_at` da última ingestão de r/<subreddit>/<sort>, ou None."""
+    try:
+        return get_container(COSMOS_METADATA_CONTAINER).read_item(
+            item=_listing_id(subreddit, sort), partition_key=subreddit
+        )
+    except exceptions.CosmosResourceNotFoundError:
+        return None
+
+
+def save_listing(subreddit: str, sort: str, ids: list):
+    get_container(COSMOS_METADATA_CONTAINER).upsert_item({
+        "id": _listing_id(subreddit, sort),
+        "subreddit": subreddit,
+        "doc_type": "listing",
+        "sort": sort,
+        "ids": ids,
+        "ingested_at": time.time(),
+    })
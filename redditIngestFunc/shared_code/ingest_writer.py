@@ -0,0 +1,146 @@
+"""
+Escrita em lote dos posts ingeridos no Cosmos DB.
+
+Todos os posts de uma ingestão partilham a partition key (/subreddit), por
+isso são gravados com transactional batches (até 100 operações por pedido)
+em vez de um upsert síncrono por documento. Documentos cujo conteúdo não
+mudou (mesmo `content_hash`) não são regravados, o que poupa RUs e evita
+eventos desnecessários no change feed do CosmosTriggerFunction. Nos que são
+regravados, o sentimento anterior só é mantido se o texto classificado for
+o mesmo (mesma `sentiment_key`); uma alteração só do score não o invalida.
+"""
+import os
+import json
+import hashlib
+import logging
+
+from shared_code.sentiment import sentiment_key, text_for
+
+logger = logging.getLogger(__name__)
+
+# Campos que definem o conteúdo de um post; o resto é metadado
+CONTENT_FIELDS = ("subreddit", "title", "title_eng", "selftext", "selftext_eng", "url", "score")
+# Campos calculados pelo change feed que um upsert não deve apagar
+PRESERVED_FIELDS = ("sentiment", "scores", "sentiment_key", "rollup")
+# Campos que deixam de valer quando o texto classificado muda (o `rollup` fica:
+# o change feed precisa dele para retirar a contribuição antiga dos agregados)
+SCORED_FIELDS = ("sentiment", "scores", "sentiment_key")
+# Limite de operações por transactional batch
+MAX_BATCH_OPERATIONS = 100
+# Caracteres do selftext guardados (e traduzidos): o modelo só usa o início do
+# texto (ver sentiment.SENTIMENT_MAX_TOKENS) e o Translator cobra por caráter
+SELFTEXT_MAX_CHARS = int(os.environ.get("SELFTEXT_MAX_CHARS", "1500"))
+
+
+def source_text(data: dict, field: str) -> str:
+    """Texto original de `field` ("title" ou "selftext") tal como é gravado."""
+    text = data.get(field) or ""
+    return text[:SELFTEXT_MAX_CHARS] if field == "selftext" else text
+
+
+def make_post(subreddit: str, data: dict, title_eng: str, selftext_eng: str = None) -> dict:
+    """Documento do Cosmos para um post da listagem do Reddit."""
+    return {
+        "id":        f"{subreddit}_{data['id']}",
+        "subreddit": subreddit,
+        "title":     source_text(data, "title"),
+        "title_eng": title_eng,
+        "selftext":  source_text(data, "selftext"),
+        "selftext_eng": selftext_eng,
+        "url":       data.get("url", ""),
+        "score":     data.get("score", 0),
+        "created_utc": data.get("created_utc")
+    }
+
+
+def known_translations(subreddit: str, entries: list, existing: dict, field: str = "title") -> list:
+    """`<field>_eng` já gravado para cada entrada cujo `field` não mudou (ou None)."""
+    known = []
+    for d in entries:
+        doc = existing.get(f"{subreddit}_{d['id']}")
+        known.append(doc.get(f"{field}_eng") if doc and doc.get(field) == source_text(d, field) else None)
+    return known
+
+
+def english_inputs(subreddit: str, entries: list, existing: dict):
+    """
+    Títulos seguidos dos selftexts de `entries` e as traduções já conhecidas
+    de cada um, para um único `to_english` (um só /detect para ambos; textos
+    vazios e já em inglês não são traduzidos).
+    """
+    texts = [source_text(d, "title") for d in entries] + [source_text(d, "selftext") for d in entries]
+    known = known_translations(subreddit, entries, existing, "title") + \
+        known_translations(subreddit, entries, existing, "selftext")
+    return texts, known
+
+
+def content_hash(item: dict) -> str:
+    payload = json.dumps({k: item.get(k) for k in CONTENT_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Query dos documentos já gravados, usada para reutilizar traduções e detetar inalterados
+EXISTING_QUERY = "SELECT {} FROM c WHERE ARRAY_CONTAINS(@ids, c.id)".format(
+    ", ".join(f"c.{f}" for f in ("id", "title", "title_eng", "selftext", "selftext_eng", "content_hash")
+              + PRESERVED_FIELDS)
+)
+
+
+def load_existing(container, partition_key: str, ids: list) -> dict:
+    """Documentos já gravados (id -> doc) de entre `ids`, numa só query na partição."""
+    if not ids:
+        return {}
+    items = container.query_items(
+        query=EXISTING_QUERY,
+        parameters=[{"name": "@ids", "value": ids}],
+        partition_key=partition_key
+    )
+    return {item["id"]: item for item in items}
+
+
+def prepare_writes(items: list, existing: dict) -> list:
+    """
+    Calcula o `content_hash` de cada item, repõe os campos de sentimento já
+    gravados (os de SCORED_FIELDS só se o texto classificado não mudou) e
+    devolve só os itens que mudaram (os que é preciso gravar).
+    """
+    to_write = []
+    for item in items:
+        item["content_hash"] = content_hash(item)
+        prev = existing.get(item["id"]) or {}
+        fields = PRESERVED_FIELDS
+        if prev.get("content_hash") != item["content_hash"] and \
+                prev.get("sentiment_key") != sentiment_key(text_for(item)):
+            fields = [f for f in PRESERVED_FIELDS if f not in SCORED_FIELDS]
+        for field in fields:
+            if field in prev and field not in item:
+                item[field] = prev[field]
+        if prev.get("content_hash") == item["content_hash"]:
+            continue
+        to_write.append(item)
+    return to_write
+
+
+def batches(items: list):
+    """Operações de upsert agrupadas no máximo de operações por transactional batch."""
+    for start in range(0, len(items), MAX_BATCH_OPERATIONS):
+        yield [("upsert", (item,)) for item in items[start:start + MAX_BATCH_OPERATIONS]]
+
+
+def write_posts(container, partition_key: str, items: list, existing: dict = None) -> dict:
+    """
+    Grava `items` (todos da mesma partição) em transactional batches, saltando
+    os que não mudaram. Os campos de sentimento já gravados são mantidos nos
+    itens (e devolvidos ao chamador). Devolve contadores {"written", "skipped"}.
+    """
+    if existing is None:
+        existing = load_existing(container, partition_key, [i["id"] for i in items])
+
+    to_write = prepare_writes(items, existing)
+    for operations in batches(to_write):
+        container.execute_item_batch(batch_operations=operations, partition_key=partition_key)
+
+    stats = {"written": len(to_write), "skipped": len(items) - len(to_write)}
+    logger.info(f"Cosmos ({partition_key}): {stats['written']} gravados, "
+                f"{stats['skipped']} inalterados")
+    return stats
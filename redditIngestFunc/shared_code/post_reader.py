@@ -0,0 +1,127 @@
+"""
+Caminho de leitura dos posts já ingeridos.
+
+Todas as queries ficam numa única partição (`partition_key=subreddit`) e são
+lidas página a página com continuation tokens, em vez de uma query
+cross-partition que o Cosmos distribui por todas as partições físicas.
+
+O SearchFunction serve daqui uma pesquisa quando a última ingestão da mesma
+listagem (subreddit + sort) é recente, em vez de voltar a chamar o Reddit,
+o Translator e gravar no Cosmos. Os resultados recentes ficam ainda num
+cache em memória com TTL, partilhado pelas invocações da mesma instância.
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from shared_code.ingest_state import load_listing
+
+logger = logging.getLogger(__name__)
+
+READ_PAGE_SIZE = int(os.environ.get("COSMOS_READ_PAGE_SIZE", "100"))
+# Idade máxima (s) de uma listagem para ser servida sem nova ingestão
+SEARCH_MAX_AGE = int(os.environ.get("SEARCH_MAX_AGE", "300"))
+QUERY_CACHE_TTL = int(os.environ.get("QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+
+RECENT_QUERY = "SELECT * FROM c WHERE c.subreddit = @subreddit ORDER BY c._ts DESC"
+BY_IDS_QUERY = "SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def query_pages(container, subreddit: str, query: str, parameters: list,
+                page_size: int = READ_PAGE_SIZE, continuation: str = None):
+    """Gera (itens, continuation token) página a página, numa só partição."""
+    pages = container.query_items(
+        query=query,
+        parameters=parameters,
+        partition_key=subreddit,
+        max_item_count=page_size
+    ).by_page(continuation)
+    for page in pages:
+        yield list(page), pages.continuation_token
+
+
+def recent_posts(container, subreddit: str, max_items: int, continuation: str = None):
+    """
+    Até `max_items` posts de r/<subreddit>, do mais recente para o mais antigo.
+    Devolve (posts, continuation token para continuar a leitura, ou None).
+    """
+    posts, token = [], continuation
+    while len(posts) < max_items:
+        # Cada página pede só o que falta, para o token apontar exatamente para o item seguinte
+        page, token = next(query_pages(container, subreddit, RECENT_QUERY,
+                                       [{"name": "@subreddit", "value": subreddit}],
+                                       page_size=min(READ_PAGE_SIZE, max_items - len(posts)),
+                                       continuation=token), ([], None))
+        posts.extend(page)
+        if not token:
+            break
+    return posts, token
+
+
+def posts_by_ids(container, subreddit: str, ids: list) -> list:
+    """Documentos com os `ids` indicados, pela mesma ordem (os que não existirem são omitidos)."""
+    if not ids:
+        return []
+    found = {}
+    for page, _ in query_pages(container, subreddit, BY_IDS_QUERY, [{"name": "@ids", "value": ids}]):
+        found.update((item["id"], item) for item in page)
+    return [found[i] for i in ids if i in found]
+
+
+def _cache_get(key: tuple, max_age: float):
+    now = time.time()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        ingested_at, cached_at, posts = entry
+        if now - cached_at > QUERY_CACHE_TTL or now - ingested_at > max_age:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return posts
+
+
+def _cache_put(key: tuple, posts: list, ingested_at: float):
+    _cache[key] = (ingested_at, time.time(), posts)
+    _cache.move_to_end(key)
+    while len(_cache) > QUERY_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def remember(subreddit: str, sort: str, limit: int, posts: list):
+    """Guarda o resultado de uma ingestão no cache (e descarta outros limites da mesma listagem)."""
+    with _cache_lock:
+        for key in [k for k in _cache if k[:2] == (subreddit, sort)]:
+            del _cache[key]
+        _cache_put((subreddit, sort, limit), posts, time.time())
+
+
+def fresh_listing(container, subreddit: str, sort: str, limit: int, max_age: float = SEARCH_MAX_AGE):
+    """
+    Posts da última ingestão de r/<subreddit>/<sort>, pela ordem do Reddit, se
+    essa ingestão tiver menos de `max_age` segundos e cobrir `limit` posts.
+    Caso contrário devolve None e é preciso ingerir.
+    """
+    key = (subreddit, sort, limit)
+    posts = _cache_get(key, max_age)
+    if posts is not None:
+        return posts
+    listing = load_listing(subreddit, sort)
+    if not listing or time.time() - listing.get("ingested_at", 0) > max_age:
+        return None
+    ids = listing.get("ids", [])[:limit]
+    if len(ids) < limit:
+        return None
+    posts = posts_by_ids(container, subreddit, ids)
+    if len(posts) < len(ids):
+        return None
+    with _cache_lock:
+        _cache_put(key, posts, listing["ingested_at"])
+    return posts
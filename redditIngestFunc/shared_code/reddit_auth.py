@@ -0,0 +1,117 @@
+"""
+Fornecedor partilhado do token OAuth do Reddit.
+
+O token é guardado a nível de módulo, pelo que invocações "quentes" da
+Function (e chamadas sucessivas do reddit_api.py) reutilizam-no durante o
+`expires_in` devolvido pelo Reddit. É renovado um pouco antes de expirar e,
+se a API responder 401, é invalidado e o pedido repetido uma única vez.
+"""
+import os
+import time
+import logging
+import threading
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+logger = logging.getLogger(__name__)
+
+# Configuráveis para se poder apontar para um Reddit falso local
+REDDIT_AUTH_URL = os.environ.get("REDDIT_AUTH_URL", "https://www.reddit.com/api/v1/access_token")
+REDDIT_API_BASE = os.environ.get("REDDIT_API_BASE", "https://oauth.reddit.com")
+# Segundos antes do fim de validade em que o token já é renovado
+REFRESH_MARGIN = int(os.environ.get("REDDIT_TOKEN_REFRESH_MARGIN", "60"))
+# Timeout (s) de cada pedido: o do token é feito com o lock, e bloquearia todas as invocações
+REDDIT_TIMEOUT = float(os.environ.get("REDDIT_TIMEOUT", "10"))
+
+# Sessão HTTP partilhada (keep-alive entre pedidos)
+http = requests.Session()
+
+
+class RedditTokenProvider:
+    """Obtém e guarda o bearer token do Reddit (grant_type=password)."""
+
+    def __init__(self, client_id: str, client_secret: str, username: str, password: str,
+                 refresh_margin: int = REFRESH_MARGIN):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.username = username
+        self.password = password
+        self.refresh_margin = refresh_margin
+        self.user_agent = f"{username}/0.1"
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_margin
+
+    def get_token(self) -> str:
+        if self._valid():
+            return self._token
+        with self._lock:
+            # Outra thread pode ter renovado enquanto esperávamos pelo lock
+            if self._valid():
+                return self._token
+            res = http.post(
+                REDDIT_AUTH_URL,
+                auth=HTTPBasicAuth(self.client_id, self.client_secret),
+                data={"grant_type": "password", "username": self.username, "password": self.password},
+                headers={"User-Agent": self.user_agent},
+                timeout=REDDIT_TIMEOUT,
+            )
+            res.raise_for_status()
+            payload = res.json()
+            token = payload.get("access_token")
+            if not token:
+                raise RuntimeError("Não obteve access_token do Reddit.")
+            self._token = token
+            self._expires_at = time.monotonic() + float(payload.get("expires_in", 3600))
+            logger.info(f"Token do Reddit renovado (expira em {payload.get('expires_in', 3600)}s)")
+            return token
+
+    def invalidate(self, token: str = None):
+        """Descarta o token em cache (só se ainda for `token`, quando indicado)."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def get(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        """GET autenticado à API do Reddit; repete uma vez com token novo em caso de 401."""
+        if not url.startswith("http"):
+            url = REDDIT_API_BASE + url
+        kwargs.setdefault("timeout", REDDIT_TIMEOUT)
+        for attempt in range(2):
+            token = self.get_token()
+            res = http.get(
+                url,
+                headers={"Authorization": f"bearer {token}", "User-Agent": self.user_agent},
+                params=params,
+                **kwargs,
+            )
+            if res.status_code != 401 or attempt == 1:
+                return res
+            logger.warning("Reddit respondeu 401; a renovar o token e a repetir o pedido")
+            self.invalidate(token)
+        return res
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_token_provider() -> RedditTokenProvider:
+    """Fornecedor único por processo, construído a partir das app settings."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                client_id = os.environ.get("CLIENT_ID") or os.environ.get("REDDIT_CLIENT_ID")
+                client_secret = os.environ.get("SECRET") or os.environ.get("REDDIT_CLIENT_SECRET")
+                username = os.environ.get("REDDIT_USER")
+                password = os.environ.get("REDDIT_PASSWORD")
+                if not all([client_id, client_secret, username, password]):
+                    raise RuntimeError("Defina CLIENT_ID, SECRET, REDDIT_USER e REDDIT_PASSWORD")
+                _provider = RedditTokenProvider(client_id, client_secret, username, password)
+    return _provider
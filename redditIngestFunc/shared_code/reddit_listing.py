@@ -0,0 +1,103 @@
+"""
+Paginação das listagens do Reddit para além do limite de 100 itens.
+
+`iter_pages` segue o cursor `after` e devolve uma página de cada vez, como
+gerador: quem consome pode traduzir/gravar a primeira página antes de a
+seguinte ser pedida, e parar a qualquer momento (p.ex. com sort=new, ao
+chegar a posts já ingeridos) sem pedir mais páginas. Os cabeçalhos
+X-Ratelimit-Remaining/Reset do Reddit são respeitados com espera/backoff.
+"""
+import os
+import time
+import logging
+
+from shared_code.reddit_auth import get_token_provider
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+MAX_RETRIES = int(os.environ.get("REDDIT_MAX_RETRIES", "3"))
+# Espera máxima por pedido, para não esgotar o timeout da Function
+MAX_BACKOFF = float(os.environ.get("REDDIT_MAX_BACKOFF", "30"))
+
+
+def rate_limit_delay(headers) -> float:
+    """Segundos a aguardar quando a quota do Reddit está esgotada (0 se não estiver)."""
+    try:
+        remaining = float(headers.get("X-Ratelimit-Remaining", "1"))
+        reset = float(headers.get("X-Ratelimit-Reset", "0"))
+    except ValueError:
+        return 0.0
+    if remaining < 1 and reset > 0:
+        return min(reset, MAX_BACKOFF)
+    return 0.0
+
+
+def retry_delay(headers, attempt: int) -> float:
+    """Espera antes de repetir um pedido que recebeu 429."""
+    retry_after = headers.get("Retry-After") or headers.get("X-Ratelimit-Reset")
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = 2 ** attempt
+    return min(delay, MAX_BACKOFF)
+
+
+def _get_page(provider, path: str, params: dict) -> dict:
+    for attempt in range(MAX_RETRIES + 1):
+        res = provider.get(path, params=params)
+        if res.status_code == 429 and attempt < MAX_RETRIES:
+            delay = retry_delay(res.headers, attempt)
+            logger.warning(f"Reddit respondeu 429; nova tentativa em {delay:.0f}s")
+            time.sleep(delay)
+            continue
+        res.raise_for_status()
+        delay = rate_limit_delay(res.headers)
+        if delay:
+            logger.warning(f"Quota do Reddit esgotada; a aguardar {delay:.0f}s")
+            time.sleep(delay)
+        return res.json().get("data", {})
+
+
+def iter_pages(subreddit: str, sort: str = "hot", limit: int = 10, params: dict = None, provider=None,
+               before: str = None):
+    """
+    Gera listas com os `data` dos posts de r/<subreddit>/<sort>, página a
+    página, até `limit` posts no total ou ao fim da listagem.
+
+    Com `before=<fullname>` só são devolvidos posts mais recentes do que esse,
+    seguindo o cursor `before` (do mais antigo para o mais recente).
+    """
+    provider = provider or get_token_provider()
+    path = f"/r/{subreddit}/{sort}"
+    direction = "before" if before else "after"
+    cursor = before
+    fetched = 0
+    while fetched < limit:
+        page_params = dict(params or {})
+        page_params["limit"] = min(PAGE_SIZE, limit - fetched)
+        if cursor:
+            page_params[direction] = cursor
+            page_params["count"] = fetched
+
+        data = _get_page(provider, path, page_params)
+        children = data.get("children", [])
+        if not isinstance(children, list):
+            raise RuntimeError("Resposta inesperada da API do Reddit.")
+
+        page = [c.get("data", {}) for c in children]
+        page = [d for d in page if d.get("id")][:limit - fetched]
+        if page:
+            fetched += len(page)
+            yield page
+
+        cursor = data.get(direction)
+        if not cursor or not children:
+            return
+
+
+def iter_posts(subreddit: str, sort: str = "hot", limit: int = 10, params: dict = None, provider=None,
+               before: str = None):
+    """Igual a `iter_pages`, mas post a post."""
+    for page in iter_pages(subreddit, sort, limit, params=params, provider=provider, before=before):
+        yield from page
@@ -0,0 +1,111 @@
+"""
+Pontuação de sentimento zero-shot usada pelo processador do change feed.
+
+O modelo é carregado uma única vez por processo (invocações "quentes" da
+Function reutilizam-no) e os textos são classificados em batches.
+A chave `sentiment_key` é calculada da mesma forma que em
+web-app/sentiment_cache.py, e o texto classificado é escolhido como em
+web-app/analysis.py, para que ambos reconheçam o trabalho já feito.
+"""
+import os
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = os.environ.get("SENTIMENT_MODEL", "facebook/bart-large-mnli")
+CANDIDATE_LABELS = ["negative", "neutral", "positive"]
+BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "8"))
+# Orçamento de tokens do texto classificado: o BART aceita 1024, mas um texto
+# longo obriga todo o batch a esse comprimento
+SENTIMENT_MAX_TOKENS = int(os.environ.get("SENTIMENT_MAX_TOKENS", "256"))
+# Margem para a hipótese ("This example is positive.") e os tokens especiais do par
+HYPOTHESIS_TOKENS = 16
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def sentiment_key(text: str, model_name: str = MODEL_NAME, candidate_labels=CANDIDATE_LABELS) -> str:
+    """Hash de (modelo, labels, texto); igual ao usado pela web-app."""
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update("|".join(candidate_labels).encode("utf-8"))
+    h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def truncate_to_budget(text: str, max_tokens: int = SENTIMENT_MAX_TOKENS) -> str:
+    """
+    Corta `text` ao orçamento de tokens, estimado sem tokenizer (~4 tokens
+    BPE por cada 3 palavras em inglês). Textos dentro do orçamento ficam iguais.
+
+    É só uma estimativa (palavras longas, números ou URLs dão mais tokens):
+    o limite efetivo é a truncagem do próprio pipeline (ver `limit_input_length`).
+    """
+    words = text.split()
+    max_words = max(1, max_tokens * 3 // 4)
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words])
+
+
+def text_for(doc: dict) -> str:
+    """
+    Texto a classificar: o título e o corpo (selftext), cada um na versão em
+    inglês se existir, cortados ao orçamento de tokens do modelo.
+    """
+    title = (doc.get("title_eng") or doc.get("title") or "").strip()
+    body = (doc.get("selftext_eng") or doc.get("selftext") or "").strip()
+    text = f"{title}\n\n{body}" if title and body else title or body
+    return truncate_to_budget(text)
+
+
+def limit_input_length(classifier):
+    """
+    Faz o pipeline zero-shot truncar o texto (só o texto, nunca a hipótese) a
+    SENTIMENT_MAX_TOKENS tokens reais, em vez do máximo do modelo (1024 no
+    BART): o pipeline já trunca o par com `only_first` até
+    `tokenizer.model_max_length`, e não aceita `truncation=` na chamada.
+    """
+    tokenizer = classifier.tokenizer
+    tokenizer.model_max_length = min(tokenizer.model_max_length, SENTIMENT_MAX_TOKENS + HYPOTHESIS_TOKENS)
+    return classifier
+
+
+def _get_classifier():
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from transformers import pipeline
+                logger.info(f"A carregar modelo {MODEL_NAME}")
+                _classifier = limit_input_length(pipeline("zero-shot-classification", model=MODEL_NAME))
+    return _classifier
+
+
+def score_texts(texts: list) -> list:
+    """
+    Classifica os textos em batches ordenados por comprimento.
+    Devolve, pela ordem original, tuplos (label, {label: score}).
+    """
+    if not texts:
+        return []
+    import torch
+
+    classifier = _get_classifier()
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    results = [None] * len(texts)
+    with torch.inference_mode():
+        for start in range(0, len(order), BATCH_SIZE):
+            idx = order[start:start + BATCH_SIZE]
+            outputs = classifier([texts[i] for i in idx], CANDIDATE_LABELS,
+                                 batch_size=BATCH_SIZE * len(CANDIDATE_LABELS))
+            if isinstance(outputs, dict):
+                outputs = [outputs]
+            for i, out in zip(idx, outputs):
+                results[i] = (out["labels"][0], dict(zip(out["labels"], out["scores"])))
+    return results
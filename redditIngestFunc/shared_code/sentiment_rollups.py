@@ -0,0 +1,165 @@
+"""
+Agregados de sentimento por subreddit, por hora e por dia.
+
+Cada post pontuado contribui para um documento por (granularidade, bucket)
+no container de metadados, com as contagens por sentimento e as somas da
+confiança e do score do Reddit (as médias são calculadas na leitura). Um
+gráfico de tendência lê assim um documento por bucket, em vez de voltar a
+percorrer os posts.
+
+O documento do bucket guarda também a contribuição de cada post, por id
+(`contributions`), e as somas são recalculadas a partir delas em cada
+escrita. Gravar a contribuição de um post é por isso idempotente: um lote
+repetido pelo change feed, ou um post cujo campo `rollup` se perdeu numa
+escrita da ingestão, nunca conta duas vezes. O campo `rollup` do post só
+serve para saber em que buckets estava (para o retirar de lá quando muda de
+hora) e para evitar escritas quando nada mudou. As escritas concorrentes
+usam concorrência otimista pelo _etag.
+
+Cada contribuição ocupa ~100 bytes, pelo que um bucket diário aguenta
+dezenas de milhares de posts dentro do limite de 2 MB por documento.
+"""
+import time
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+
+from shared_code.cosmos import get_container
+from shared_code.ingest_state import COSMOS_METADATA_CONTAINER
+from shared_code.sentiment import CANDIDATE_LABELS
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+MAX_CONFLICT_RETRIES = 5
+
+
+def _rollup_id(subreddit: str, granularity: str, bucket: str) -> str:
+    return f"rollup_{granularity}_{subreddit}_{bucket}"
+
+
+def contribution(doc: dict) -> dict:
+    """
+    Contribuição do post (já com `sentiment`/`scores`/`sentiment_key`) para os
+    agregados. O bucket vem do `created_utc` do post; sem ele, mantém-se o da
+    contribuição anterior ou, na primeira vez, a hora em que foi pontuado.
+    """
+    if doc.get("created_utc"):
+        hour = datetime.fromtimestamp(doc["created_utc"], tz=timezone.utc).strftime(GRANULARITIES["hour"])
+    else:
+        hour = (doc.get("rollup") or {}).get("hour") or \
+            datetime.fromtimestamp(time.time(), tz=timezone.utc).strftime(GRANULARITIES["hour"])
+    label = doc["sentiment"]
+    return {
+        "key": doc["sentiment_key"],
+        "hour": hour,
+        "sentiment": label,
+        "confidence": float((doc.get("scores") or {}).get(label, 0.0)),
+        "score": doc.get("score") or 0,
+    }
+
+
+def is_current(doc: dict) -> bool:
+    """True se o campo `rollup` do post já corresponde ao seu sentimento e score atuais."""
+    old = doc.get("rollup")
+    return bool(old) and old == contribution(doc)
+
+
+def _buckets(c: dict) -> dict:
+    """{granularidade: bucket} de uma contribuição."""
+    hour = datetime.strptime(c["hour"], GRANULARITIES["hour"])
+    return {g: hour.strftime(fmt) for g, fmt in GRANULARITIES.items()}
+
+
+def rollup_delta(docs: list) -> dict:
+    """
+    Alterações aos agregados provocadas por `docs`, que passam a ter o campo
+    `rollup` atualizado. Devolve {(subreddit, granularidade, bucket): {id do
+    post: contribuição}}, com None para retirar o post de um bucket onde
+    estava antes (p.ex. se o `created_utc` mudou).
+    """
+    deltas = defaultdict(dict)
+    for doc in docs:
+        if not doc.get("sentiment_key") or not doc.get("subreddit") or is_current(doc):
+            continue
+        subreddit = doc["subreddit"]
+        new = contribution(doc)
+        new_buckets = _buckets(new)
+        old = doc.get("rollup")
+        if old and old.get("hour"):
+            for granularity, bucket in _buckets(old).items():
+                if new_buckets[granularity] != bucket:
+                    deltas[(subreddit, granularity, bucket)][doc["id"]] = None
+        entry = {"sentiment": new["sentiment"], "confidence": new["confidence"], "score": new["score"]}
+        for granularity, bucket in new_buckets.items():
+            deltas[(subreddit, granularity, bucket)][doc["id"]] = entry
+        doc["rollup"] = new
+    return dict(deltas)
+
+
+def _totals(contributions: dict) -> dict:
+    counts = {label: 0 for label in CANDIDATE_LABELS}
+    for c in contributions.values():
+        counts[c["sentiment"]] = counts.get(c["sentiment"], 0) + 1
+    return {
+        "counts": counts,
+        "posts": len(contributions),
+        "sum_confidence": sum(c["confidence"] for c in contributions.values()),
+        "sum_score": sum(c["score"] for c in contributions.values()),
+    }
+
+
+def apply_delta(subreddit: str, granularity: str, bucket: str, delta: dict):
+    """Grava/retira as contribuições de `delta` no agregado (read-modify-write com _etag)."""
+    container = get_container(COSMOS_METADATA_CONTAINER)
+    rollup_id = _rollup_id(subreddit, granularity, bucket)
+    for _ in range(MAX_CONFLICT_RETRIES):
+        try:
+            doc = container.read_item(item=rollup_id, partition_key=subreddit)
+        except exceptions.CosmosResourceNotFoundError:
+            doc = None
+        contributions = dict(doc.get("contributions") or {}) if doc else {}
+        for post_id, entry in delta.items():
+            if entry is None:
+                contributions.pop(post_id, None)
+            else:
+                contributions[post_id] = entry
+        body = {
+            "id": rollup_id,
+            "subreddit": subreddit,
+            "doc_type": "sentiment_rollup",
+            "granularity": granularity,
+            "bucket": bucket,
+            **_totals(contributions),
+            "contributions": contributions,
+            "updated_at": time.time(),
+        }
+        try:
+            if doc is None:
+                container.create_item(body)
+            else:
+                container.replace_item(item=rollup_id, body=body, etag=doc["_etag"],
+                                       match_condition=MatchConditions.IfNotModified)
+            return
+        except (exceptions.CosmosResourceExistsError, exceptions.CosmosAccessConditionFailedError):
+            # Outra invocação gravou entretanto: relê e volta a aplicar
+            continue
+    logger.warning(f"r/{subreddit}: agregado {rollup_id} não atualizado após {MAX_CONFLICT_RETRIES} conflitos")
+
+
+def update_rollups(docs: list) -> int:
+    """
+    Aplica aos agregados a contribuição de `docs` (e grava-a no campo
+    `rollup` de cada um). As falhas são só registadas. Devolve o nº de
+    agregados atualizados.
+    """
+    deltas = rollup_delta(docs)
+    for (subreddit, granularity, bucket), delta in deltas.items():
+        try:
+            apply_delta(subreddit, granularity, bucket, delta)
+        except Exception as e:
+            logger.warning(f"r/{subreddit}: falha ao atualizar o agregado {granularity} {bucket}: {e}")
+    return len(deltas)
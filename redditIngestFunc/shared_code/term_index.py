@@ -0,0 +1,116 @@
+"""
+Índice de frequência de termos por subreddit, para a nuvem de palavras.
+
+Os termos de cada post vêm do mesmo texto que é classificado
+(`sentiment.text_for`: título e selftext, na versão em inglês quando existe).
+Cada ingestão soma ao índice os termos dos posts novos e, nos posts cujo
+texto mudou (título, selftext ou as suas traduções), troca os termos do
+texto antigo pelos do novo; posts inalterados não contam duas vezes. O índice fica num documento por
+subreddit no container de metadados (fora do change feed) e a web-app
+desenha a nuvem com `generate_from_frequencies` sobre estas contagens, sem
+voltar a tokenizar os textos. As escritas concorrentes (várias ingestões do
+mesmo subreddit) usam concorrência otimista pelo _etag.
+"""
+import os
+import re
+import time
+import logging
+from collections import Counter
+
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+
+from shared_code.cosmos import get_container
+from shared_code.ingest_state import COSMOS_METADATA_CONTAINER
+from shared_code.sentiment import text_for
+
+logger = logging.getLogger(__name__)
+
+# Termos guardados por subreddit (os mais frequentes), para o documento não crescer sem limite
+TERM_INDEX_MAX_TERMS = int(os.environ.get("TERM_INDEX_MAX_TERMS", "5000"))
+MAX_CONFLICT_RETRIES = 5
+
+# Igual ao tokenizador de web-app/term_frequencies.py (ver tests/test_tokenizer_parity.py)
+_TOKEN_RE = re.compile(r"[a-z][a-z']+")
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for t in _TOKEN_RE.findall(text.lower()):
+        t = t[:-2] if t.endswith("'s") else t.rstrip("'")
+        if len(t) > 1:
+            tokens.append(t)
+    return tokens
+
+
+def term_delta(items: list, existing: dict):
+    """
+    Variação das contagens provocada por gravar `items` sobre `existing`
+    (id -> documento anterior). Devolve (Counter de termos, nº de posts novos).
+    """
+    delta = Counter()
+    new_posts = 0
+    for item in items:
+        prev = existing.get(item["id"])
+        old_text = text_for(prev) if prev else ""
+        new_text = text_for(item)
+        if prev is None:
+            new_posts += 1
+        if new_text == old_text:
+            continue
+        delta.update(tokenize(new_text))
+        delta.subtract(tokenize(old_text))
+    return Counter({t: c for t, c in delta.items() if c}), new_posts
+
+
+def _index_id(subreddit: str) -> str:
+    return f"terms_{subreddit}"
+
+
+def load_index(subreddit: str) -> dict:
+    """Documento com `terms` ({termo: contagem}) e `posts`, ou None se ainda não existir."""
+    try:
+        return get_container(COSMOS_METADATA_CONTAINER).read_item(
+            item=_index_id(subreddit), partition_key=subreddit
+        )
+    except exceptions.CosmosResourceNotFoundError:
+        return None
+
+
+def apply_delta(subreddit: str, delta: Counter, new_posts: int = 0):
+    """Soma `delta` ao índice do subreddit (read-modify-write com _etag)."""
+    if not delta and not new_posts:
+        return
+    container = get_container(COSMOS_METADATA_CONTAINER)
+    for _ in range(MAX_CONFLICT_RETRIES):
+        doc = load_index(subreddit)
+        terms = Counter(doc["terms"]) if doc else Counter()
+        terms.update(delta)
+        body = {
+            "id": _index_id(subreddit),
+            "subreddit": subreddit,
+            "doc_type": "term_index",
+            "terms": {t: c for t, c in terms.most_common(TERM_INDEX_MAX_TERMS) if c > 0},
+            "posts": (doc.get("posts", 0) if doc else 0) + new_posts,
+            "updated_at": time.time(),
+        }
+        try:
+            if doc is None:
+                container.create_item(body)
+            else:
+                container.replace_item(item=doc["id"], body=body, etag=doc["_etag"],
+                                       match_condition=MatchConditions.IfNotModified)
+            logger.info(f"r/{subreddit}: índice de termos atualizado ({len(delta)} termos alterados)")
+            return
+        except (exceptions.CosmosResourceExistsError, exceptions.CosmosAccessConditionFailedError):
+            # Outra ingestão gravou entretanto: relê e volta a aplicar
+            continue
+    logger.warning(f"r/{subreddit}: índice de termos não atualizado após {MAX_CONFLICT_RETRIES} conflitos")
+
+
+def update_index_delta(subreddit: str, delta: Counter, new_posts: int = 0):
+    """Como `apply_delta`, mas as falhas são só registadas: o índice não interrompe a ingestão."""
+    try:
+        apply_delta(subreddit, delta, new_posts)
+    except Exception as e:
+        logger.warning(f"r/{subreddit}: falha ao atualizar o índice de termos: {e}")
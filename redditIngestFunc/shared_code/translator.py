@@ -0,0 +1,201 @@
+"""
+Cliente em lote do Azure Translator.
+
+O serviço aceita arrays de textos por pedido, por isso em vez de 1-2 pedidos
+por título fazemos um /detect para todos os títulos e um /translate só para
+os que não estão em inglês, respeitando os limites de elementos e de
+caracteres por pedido.
+
+Antes de chamar o serviço, cada texto é procurado num cache de traduções
+(chave: hash do texto normalizado + idioma de destino): primeiro nas
+traduções já gravadas no Cosmos, passadas pelo chamador, depois num LRU em
+memória partilhado entre invocações "quentes".
+"""
+import os
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TRANSLATOR_KEY = os.environ.get("TRANSLATOR_KEY")
+TRANSLATOR_ENDPOINT = os.environ.get("TRANSLATOR_ENDPOINT")
+TRANSLATOR_REGION = os.environ.get("TRANSLATOR_REGION", "francecentral")
+
+# Limites por pedido do Translator v3
+MAX_ELEMENTS = 100
+MAX_CHARS = 50000
+
+TRANSLATION_CACHE_SIZE = int(os.environ.get("TRANSLATION_CACHE_SIZE", "10000"))
+# Timeout (s) de cada pedido: uma ligação parada bloquearia o estágio de tradução do pipeline
+TRANSLATOR_TIMEOUT = float(os.environ.get("TRANSLATOR_TIMEOUT", "15"))
+
+http = requests.Session()
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_memo_stats = {"cosmos_hits": 0, "memory_hits": 0, "misses": 0}
+
+
+def _memo_key(text: str, target: str = "en") -> str:
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest() + ":" + target
+
+
+def _memo_get(text: str):
+    key = _memo_key(text)
+    with _memo_lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+        return value
+
+
+def _memo_put(text: str, translated: str):
+    key = _memo_key(text)
+    with _memo_lock:
+        _memo[key] = translated
+        _memo.move_to_end(key)
+        while len(_memo) > TRANSLATION_CACHE_SIZE:
+            _memo.popitem(last=False)
+
+
+def cache_stats() -> dict:
+    """Contadores acumulados do cache de traduções neste processo."""
+    with _memo_lock:
+        s = dict(_memo_stats)
+        s["entries"] = len(_memo)
+    total = s["cosmos_hits"] + s["memory_hits"] + s["misses"]
+    s["hit_ratio"] = (s["cosmos_hits"] + s["memory_hits"]) / total if total else 0.0
+    return s
+
+
+def chunks(texts: list, max_elements: int = MAX_ELEMENTS, max_chars: int = MAX_CHARS):
+    """Divide os índices de `texts` em grupos dentro dos limites do serviço."""
+    chunk, chars = [], 0
+    for i, text in enumerate(texts):
+        size = len(text)
+        if chunk and (len(chunk) >= max_elements or chars + size > max_chars):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(i)
+        chars += size
+    if chunk:
+        yield chunk
+
+
+def request_headers() -> dict:
+    headers = {
+        'Ocp-Apim-Subscription-Key': TRANSLATOR_KEY,
+        'Ocp-Apim-Subscription-Region': TRANSLATOR_REGION,
+        'Content-Type': 'application/json'
+    }
+    # Cabeçalhos sem valor são omitidos (o aiohttp não aceita None)
+    return {k: v for k, v in headers.items() if v}
+
+
+def _post(path: str, params: dict, texts: list) -> list:
+    try:
+        resp = http.post(
+            TRANSLATOR_ENDPOINT + path,
+            params=params,
+            headers=request_headers(),
+            json=[{'text': t} for t in texts],
+            timeout=TRANSLATOR_TIMEOUT,
+        )
+    except requests.Timeout:
+        # Propaga como os erros HTTP: o pipeline regista a falha e termina a ingestão
+        logger.warning(f"Translator sem resposta em {TRANSLATOR_TIMEOUT:.0f}s ({path}, {len(texts)} textos)")
+        raise
+    resp.raise_for_status()
+    return resp.json()
+
+
+def detect_languages(texts: list) -> list:
+    """Código ISO do idioma de cada texto, pela mesma ordem."""
+    langs = [None] * len(texts)
+    for idx in chunks(texts):
+        result = _post('/detect', {'api-version': '3.0'}, [texts[i] for i in idx])
+        for i, r in zip(idx, result):
+            langs[i] = r['language']
+    return langs
+
+
+def translate_to_english(texts: list) -> list:
+    """Traduz todos os textos para inglês (idioma de origem auto-detetado por elemento)."""
+    translated = [None] * len(texts)
+    for idx in chunks(texts):
+        result = _post('/translate', {'api-version': '3.0', 'to': ['en']}, [texts[i] for i in idx])
+        for i, r in zip(idx, result):
+            translated[i] = r['translations'][0]['text']
+    return translated
+
+
+def lookup_cached(texts: list, known: list = None):
+    """
+    Primeira fase de `to_english`: resolve o que já se conhece (Cosmos ou LRU).
+    Devolve (english, candidates, hits), onde `candidates` são os índices que
+    ainda precisam do serviço e `hits` = (cosmos_hits, memory_hits).
+    """
+    english = list(texts)
+    known = known or [None] * len(texts)
+    candidates = []
+    cosmos_hits = memory_hits = 0
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        if known[i]:
+            english[i] = known[i]
+            _memo_put(text, known[i])
+            cosmos_hits += 1
+            continue
+        cached = _memo_get(text)
+        if cached is not None:
+            english[i] = cached
+            memory_hits += 1
+            continue
+        candidates.append(i)
+    return english, candidates, (cosmos_hits, memory_hits)
+
+
+def store_results(texts: list, english: list, candidates: list, num_translated: int, hits: tuple):
+    """Última fase de `to_english`: guarda os novos resultados no LRU e regista o hit ratio."""
+    cosmos_hits, memory_hits = hits
+    for i in candidates:
+        _memo_put(texts[i], english[i])
+
+    with _memo_lock:
+        _memo_stats["cosmos_hits"] += cosmos_hits
+        _memo_stats["memory_hits"] += memory_hits
+        _memo_stats["misses"] += len(candidates)
+    lookups = cosmos_hits + memory_hits + len(candidates)
+    ratio = (cosmos_hits + memory_hits) / lookups if lookups else 0.0
+    logger.info(f"Translator: {lookups} textos, cache {ratio:.0%} "
+                f"(cosmos={cosmos_hits}, memória={memory_hits}), "
+                f"{len(candidates)} detetados, {num_translated} traduzidos; "
+                f"acumulado {cache_stats()['hit_ratio']:.0%}")
+
+
+def to_english(texts: list, known: list = None) -> list:
+    """
+    Versão em inglês de cada texto. `known` (opcional, alinhada com `texts`)
+    traz traduções já gravadas no Cosmos; os restantes textos são procurados
+    no LRU e só os que faltam são detetados de uma vez e traduzidos se não
+    estiverem em inglês, repondo os resultados pelos índices originais.
+    """
+    english, candidates, hits = lookup_cached(texts, known)
+
+    foreign = []
+    if candidates:
+        langs = detect_languages([texts[i] for i in candidates])
+        foreign = [i for i, lang in zip(candidates, langs) if not lang.lower().startswith('en')]
+        if foreign:
+            for i, text in zip(foreign, translate_to_english([texts[i] for i in foreign])):
+                english[i] = text
+
+    store_results(texts, english, candidates, len(foreign), hits)
+    return english
@@ -1,9 +1,18 @@
 import os
+import sys
 import logging
 import requests
 import pandas as pd
-from requests.auth import HTTPBasicAuth
-from azure.cosmos import CosmosClient, exceptions
+from azure.cosmos import exceptions
+
+# Reutiliza o código partilhado da Function App
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "redditIngestFunc"))
+from shared_code.reddit_auth import get_token_provider
+from shared_code.reddit_listing import iter_pages, iter_posts
+from shared_code.ingest_pipeline import IngestPipeline
+from shared_code.ingest_writer import make_post
+from shared_code.cosmos import get_container
+from shared_code.post_reader import recent_posts
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -19,88 +28,36 @@ COSMOS_KEY = os.getenv('COSMOS_KEY')
 DATABASE_NAME = os.getenv('COSMOS_DATABASE')
 CONTAINER_NAME = os.getenv('COSMOS_CONTAINER')
 
-# Estado interno do cliente Cosmos
-_cosmos_client = None
-_cosmos_container = None
-
 def _get_reddit_token():
-    client_id     = os.getenv("CLIENT_ID")
-    client_secret = os.getenv("SECRET")
-    username      = os.getenv("REDDIT_USER")
-    password      = os.getenv("REDDIT_PASSWORD")
-    if not all([client_id, client_secret, username, password]):
-        raise RuntimeError("Defina CLIENT_ID, SECRET, REDDIT_USER e REDDIT_PASSWORD")
-
-    auth = HTTPBasicAuth(client_id, client_secret)
-    data = {"grant_type":"password","username":username,"password":password}
-    headers = {"User-Agent":f"{username}/0.1 by {username}"}
-    res = requests.post("https://www.reddit.com/api/v1/access_token",
-                        auth=auth, data=data, headers=headers)
-    res.raise_for_status()
-    return res.json()["access_token"]
+    """Token OAuth do Reddit, partilhado e em cache até perto de expirar."""
+    return get_token_provider().get_token()
 
 
 def _init_cosmos():
-    endpoint = os.getenv("COSMOS_ENDPOINT")
-    key      = os.getenv("COSMOS_KEY")
-    if not endpoint or not key:
-        raise RuntimeError("COSMOS_ENDPOINT e COSMOS_KEY não definidas")
-    client    = CosmosClient(endpoint, key)
-    db        = client.create_database_if_not_exists(os.getenv("COSMOS_DATABASE", "RedditApp"))
-    container = db.create_container_if_not_exists(
-        id=os.getenv("COSMOS_CONTAINER", "posts"),
-        partition_key={"/path":"/subreddit"}
-    )
-    return container
+    """Container de posts, partilhado pelo processo (criado só na primeira chamada)."""
+    return get_container(os.getenv("COSMOS_CONTAINER", "posts"))
 
 
 
 
 def busca_reddit(subreddit, sort="hot", num=10, save_to_db=True):
-    # 1) Autentica e busca
-    token = _get_reddit_token()
-    url   = f"https://oauth.reddit.com/r/{subreddit}/{sort}"
-    headers = {
-        "Authorization":f"bearer {token}",
-        "User-Agent":f"{os.getenv('REDDIT_USER')}/0.1"
-    }
-    params = {"limit": num}
-    res = requests.get(url, headers=headers, params=params)
-    res.raise_for_status()
-    data = res.json().get("data",{})
-
-    # 2) Valida e monta lista de posts
-    children = data.get("children", [])
-    if not isinstance(children, list):
-        raise ValueError(f"Resposta inesperada para r/{subreddit}")
-
-    posts = []
-    for child in children:
-        d = child.get("data", {})
-        # Garante que haja um id único
-        reddit_id = d.get("id")
-        if not reddit_id:
-            continue
-        posts.append({
-            "id":       f"{subreddit}_{reddit_id}",  # ID requerido pelo Cosmos
-            "subreddit":subreddit,
-            "title":    d.get("title",""),
-            "url":      d.get("url",""),
-            "score":    d.get("score",0)
-        })
-
-    # 3) Persiste no Cosmos
-    if save_to_db and posts:
-        container = _init_cosmos()
-        for p in posts:
-            try:
-                container.upsert_item(p)
-                logger.info(f"Upserted: {p['id']}")
-            except exceptions.CosmosHttpResponseError as e:
-                logger.error(f"Falha ao upsert {p['id']}", exc_info=e)
-                raise
+    """
+    Busca `num` posts de r/<subreddit>/<sort>. Com `save_to_db`, a ingestão é
+    a mesma do SearchFunction (tradução, escrita em lote e índice de termos),
+    para que os documentos gravados pelos dois caminhos tenham a mesma forma
+    e nenhum apague os campos (title_eng, selftext, created_utc) do outro.
+    """
+    if not save_to_db:
+        # Sem gravação não há traduções: os campos *_eng ficam vazios
+        return [make_post(subreddit, d, None) for d in iter_posts(subreddit, sort, num)]
 
-    return posts
+    # Autentica (token em cache), busca página a página e persiste no Cosmos
+    pipeline = IngestPipeline(_init_cosmos(), subreddit)
+    try:
+        return pipeline.run(iter_pages(subreddit, sort, num))
+    except exceptions.CosmosHttpResponseError as e:
+        logger.error(f"Falha ao gravar posts de r/{subreddit}", exc_info=e)
+        raise
 
 
 
@@ -108,6 +65,9 @@ def get_posts_from_cosmos(subreddit: str, max_items: int = 100) -> list:
     """
     Consulta o Cosmos DB e retorna posts do subreddit ordenados por timestamp.
 
+    A query corre só na partição do subreddit e é lida página a página
+    (continuation tokens), sem `enable_cross_partition_query`.
+
     Args:
         subreddit: Nome do subreddit para filtrar.
         max_items: Número máximo de items a retornar.
@@ -115,19 +75,8 @@ def get_posts_from_cosmos(subreddit: str, max_items: int = 100) -> list:
     Returns:
         Lista de documentos do Cosmos DB correspondentes aos posts.
     """
-    container = _init_cosmos()
-    query = (
-        f"SELECT TOP {max_items} * FROM c WHERE c.subreddit = @subreddit ORDER BY c._ts DESC"
-    )
-    parameters = [{"name": "@subreddit", "value": subreddit}]
-    items = list(
-        container.query_items(
-            query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True
-        )
-    )
-    return items
+    posts, _ = recent_posts(_init_cosmos(), subreddit, max_items)
+    return posts
 
 
 if __name__ == '__main__':
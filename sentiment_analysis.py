@@ -1,12 +1,19 @@
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 from scipy.stats import gaussian_kde
-from transformers import pipeline
 from azure.storage.blob import BlobServiceClient
 from wordcloud import WordCloud, STOPWORDS
 
+# Reutiliza o motor em lote e o cache de sentimento da web-app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web-app"))
+from sentiment_engine import BatchedSentimentClassifier, configure_torch_threads
+from sentiment_cache import SentimentCache
+from inference_backends import SENTIMENT_BACKEND, build_classifier, cache_model_id
+from term_frequencies import text_frequencies
+
 # 1. Lista de frases a avaliar
 sentences = [
     "Never thought I'd find myself agreeing so hard with Nancy Pelosi",
@@ -20,30 +27,34 @@ sentences = [
     "Beautiful"
 ]
 
-# 2. Inicializar pipeline zero-shot
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+# 2. Inicializar pipeline zero-shot (com cache de resultados)
+MODEL_NAME = "facebook/bart-large-mnli"
+if SENTIMENT_BACKEND == "transformers":
+    configure_torch_threads()
+classifier = build_classifier(MODEL_NAME, SENTIMENT_BACKEND)
 candidate_labels = ["negative", "neutral", "positive"]
+cache = SentimentCache(cache_model_id(MODEL_NAME, SENTIMENT_BACKEND), candidate_labels)
+engine = BatchedSentimentClassifier(classifier, candidate_labels, cache=cache,
+                                    uses_torch=(SENTIMENT_BACKEND == "transformers"))
 
 # 3. Recolher probabilidades e resultados
 neg_probs, neu_probs, pos_probs = [], [], []
 records = []
 
-for sent in sentences:
-    res = classifier(sent, candidate_labels)
-    # determina top-label e score
-    top_label = res["labels"][0].capitalize()
-    top_score = int(res["scores"][0] * 100)
+for sent, res in zip(sentences, engine.classify(sentences)):
     records.append({
         "Review": sent,
-        "Sentimento": top_label,
-        "Pontuação (%)": top_score
+        "Sentimento": res["sentimento"],
+        "Pontuação (%)": res["probabilidade"]
     })
     # dicionário de scores
-    sd = dict(zip(res["labels"], res["scores"]))
+    sd = res["scores_raw"]
     neg_probs.append(sd["negative"])
     neu_probs.append(sd["neutral"])
     pos_probs.append(sd["positive"])
 
+print(f"Cache de sentimento: {cache.stats()}")
+
 # 4. Gerar DataFrame e guardar como imagem de tabela
 df = pd.DataFrame(records)
 fig, ax = plt.subplots(figsize=(12, len(df)*0.4 + 1))
@@ -73,11 +84,10 @@ plt.savefig(chart_path, dpi=200)
 plt.close()
 
 # 6. Gerar nuvem de palavras
-# junta todos os textos, remove stopwords básicas
-text = " ".join(sentences)
+# contagens de termos (o mesmo tokenizador do índice da ingestão), sem stopwords básicas
 stopwords = set(STOPWORDS)
-wc = WordCloud(width=800, height=400, background_color="white",
-               stopwords=stopwords).generate(text)
+frequencies = {t: c for t, c in text_frequencies(sentences).items() if t not in stopwords}
+wc = WordCloud(width=800, height=400, background_color="white").generate_from_frequencies(frequencies)
 
 plt.figure(figsize=(12, 6))
 plt.imshow(wc, interpolation="bilinear")
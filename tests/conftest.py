@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# As duas unidades de deploy importam os seus módulos pelo nome (shared_code.*, e os da web-app soltos)
+# (e o benchmarks/ pelo FakeContainer do Cosmos em memória)
+for path in (os.path.join(ROOT, "redditIngestFunc"), os.path.join(ROOT, "web-app"),
+             os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def fake_cosmos(monkeypatch):
+    """Containers de posts e de metadados em memória no registo do shared_code.cosmos."""
+    from fake_services import FakeContainer
+    from shared_code import cosmos
+    from shared_code.ingest_state import COSMOS_METADATA_CONTAINER
+
+    containers = {name: FakeContainer() for name in (cosmos.COSMOS_CONTAINER, COSMOS_METADATA_CONTAINER)}
+    monkeypatch.setattr(cosmos, "_containers", containers)
+    return containers
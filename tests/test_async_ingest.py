@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from azure.cosmos import exceptions
+
+import fake_services
+from shared_code import async_ingest, cosmos, reddit_auth, translator
+from shared_code.ingest_state import load_high_water_mark, load_listing, save_high_water_mark
+from shared_code.reddit_auth import RedditTokenProvider
+
+
+class AsyncFakeContainer:
+    """Interface assíncrona sobre o FakeContainer; os primeiros `throttle` batches recebem 429."""
+
+    def __init__(self, container, throttle: int = 0):
+        self.container = container
+        self.throttle = throttle
+
+    def query_items(self, **kwargs):
+        items = list(self.container.query_items(**kwargs))
+
+        async def pages():
+            for item in items:
+                yield item
+        return pages()
+
+    async def execute_item_batch(self, batch_operations, partition_key):
+        if self.throttle:
+            self.throttle -= 1
+            raise exceptions.CosmosHttpResponseError(status_code=429, message="Request rate is large")
+        return self.container.execute_item_batch(batch_operations=batch_operations, partition_key=partition_key)
+
+
+class FakeAsyncClient:
+    created = 0
+    container = None
+
+    def __init__(self, endpoint, key):
+        type(self).created += 1
+
+    def get_database_client(self, name):
+        return self
+
+    def get_container_client(self, name):
+        return self.container
+
+
+@pytest.fixture
+def fan_out(fake_cosmos, monkeypatch):
+    server, base = fake_services.start(listing_size=30)
+    monkeypatch.setattr(reddit_auth, "REDDIT_AUTH_URL", f"{base}/api/v1/access_token")
+    monkeypatch.setattr(async_ingest, "REDDIT_API_BASE", base)
+    monkeypatch.setattr(translator, "TRANSLATOR_ENDPOINT", base)
+    provider = RedditTokenProvider("id", "secret", "user", "password")
+    monkeypatch.setattr(async_ingest, "get_token_provider", lambda: provider)
+    monkeypatch.setattr(async_ingest, "throttle_delay", lambda error, attempt: 0.01)
+
+    FakeAsyncClient.created = 0
+    FakeAsyncClient.container = AsyncFakeContainer(fake_cosmos[cosmos.COSMOS_CONTAINER])
+    monkeypatch.setattr(async_ingest, "AsyncCosmosClient", FakeAsyncClient)
+    for name in ("_session", "_client", "_container"):
+        monkeypatch.setattr(async_ingest, name, None)
+    yield FakeAsyncClient
+    if async_ingest._session is not None:
+        asyncio.run_coroutine_threadsafe(async_ingest._session.close(), async_ingest._event_loop()).result()
+    server.shutdown()
+
+
+def _stored(fake_cosmos, subreddit: str) -> list:
+    return list(fake_cosmos[cosmos.COSMOS_CONTAINER].query_items("SELECT * FROM c", partition_key=subreddit))
+
+
+def test_fan_outs_reuse_one_cosmos_client_and_save_the_listing(fan_out, fake_cosmos):
+    first = async_ingest.run_ingest_many(["python", "rust"], "hot", 5)
+    second = async_ingest.run_ingest_many(["golang"], "hot", 5)
+
+    assert fan_out.created == 1
+    assert [len(first["python"]), len(first["rust"]), len(second["golang"])] == [5, 5, 5]
+    for sub in ("python", "rust", "golang"):
+        assert len(_stored(fake_cosmos, sub)) == 5
+        assert load_listing(sub, "hot")["ids"] == [f"{sub}_{fake_services.fake_post(sub, n)['id']}"
+                                                   for n in range(5)]
+
+
+def test_throttled_batches_are_retried(fan_out, fake_cosmos):
+    fan_out.container.throttle = 2
+
+    results = async_ingest.run_ingest_many(["python"], "hot", 5)
+
+    assert not isinstance(results["python"], Exception)
+    assert len(_stored(fake_cosmos, "python")) == 5
+
+
+def test_new_listing_advances_the_mark_only_when_it_reaches_it(fan_out, fake_cosmos):
+    async_ingest.run_ingest_many(["python"], "new", 5)
+    newest = fake_services.fake_post("python", 0)
+    assert load_high_water_mark("python")["newest_fullname"] == newest["name"]
+
+    # Marca antiga, abaixo dos 5 posts pedidos: avançar deixaria posts por ingerir
+    old = fake_services.fake_post("python", 20)
+    save_high_water_mark("rust", old["name"], old["created_utc"])
+    async_ingest.run_ingest_many(["rust"], "new", 5)
+    assert load_high_water_mark("rust")["newest_fullname"] == old["name"]
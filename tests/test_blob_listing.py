@@ -0,0 +1,54 @@
+import pytest
+
+import blob_listing
+import fake_services
+from blob_listing import add_to_manifest, list_page
+from report_writer import container_client
+
+NAMES = [f"relatorio_2024010{d}_120000.csv" for d in range(1, 8)]
+
+
+@pytest.fixture
+def blobs(monkeypatch):
+    """ContainerClient real contra o Blob Storage falso, com 7 relatórios e sem manifesto."""
+    monkeypatch.setattr(blob_listing, "_cache", {})
+    server, base = fake_services.start()
+    client = container_client(f"{base}/{fake_services.BLOB_CONTAINER}?sv=2021-08-06&sig=dGVzdA%3D%3D")
+    for name in NAMES:
+        client.upload_blob(name, b"id,title\n")
+    yield client
+    server.shutdown()
+
+
+def _all_pages(client, page_size: int):
+    pages, token = [], None
+    while True:
+        names, token = list_page(client, token, page_size=page_size)
+        pages.append(names)
+        if token is None:
+            return pages
+
+
+def test_pages_follow_continuation_tokens_newest_first(blobs):
+    pages = _all_pages(blobs, 3)
+
+    assert pages == [NAMES[6:3:-1], NAMES[3:0:-1], NAMES[:1]]
+    # O manifesto foi reconstruído a partir do list_blobs e não aparece na listagem
+    assert blob_listing.MANIFEST_BLOB not in sum(pages, [])
+
+
+def test_new_uploads_do_not_shift_later_pages(blobs):
+    first, token = list_page(blobs, page_size=3)
+    newest = "relatorio_20240109_120000.csv"
+    blobs.upload_blob(newest, b"id,title\n")
+    add_to_manifest(blobs, [newest])
+
+    second, _ = list_page(blobs, token, page_size=3)
+
+    assert second == NAMES[3:0:-1]
+    assert list_page(blobs, page_size=3)[0] == [newest] + first[:2]
+
+
+def test_invalid_token_is_rejected(blobs):
+    with pytest.raises(ValueError):
+        list_page(blobs, "não-é-um-token")
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import SearchFunction
+from fake_services import fake_post
+from shared_code import ingest_pipeline
+from shared_code.cosmos import COSMOS_CONTAINER
+from shared_code.term_index import load_index
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import reddit_api  # noqa: E402
+
+PAGE = [fake_post("python", n) for n in range(6)]
+
+
+def _listing(subreddit, sort="hot", limit=10, **kwargs):
+    yield [dict(d) for d in PAGE[:limit]]
+
+
+def _english(texts, known=None):
+    known = known or [None] * len(texts)
+    return [k or (f"(en) {t}" if t else t) for t, k in zip(texts, known)]
+
+
+def test_search_function_and_busca_reddit_write_the_same_document(fake_cosmos, monkeypatch):
+    monkeypatch.setattr(SearchFunction, "iter_pages", _listing)
+    monkeypatch.setattr(reddit_api, "iter_pages", _listing)
+    monkeypatch.setattr(ingest_pipeline, "to_english", _english)
+    posts = fake_cosmos[COSMOS_CONTAINER]
+
+    SearchFunction._fetch_and_store("python", "hot", len(PAGE))
+    stored = {d["id"]: d for d in posts.query_items("SELECT * FROM c", partition_key="python")}
+    index = load_index("python")
+
+    reddit_api.busca_reddit("python", "hot", len(PAGE))
+
+    after = {d["id"]: d for d in posts.query_items("SELECT * FROM c", partition_key="python")}
+    assert after.keys() == stored.keys()
+    for post_id, doc in stored.items():
+        # Inalterado: nem regravado nem sem title_eng/selftext/created_utc
+        assert after[post_id] == doc
+        assert doc["title_eng"] and doc["created_utc"]
+    assert load_index("python")["terms"] == index["terms"]
+    assert load_index("python")["posts"] == len(PAGE)
+
+
+def test_busca_reddit_fills_the_fields_read_by_the_search_function(fake_cosmos, monkeypatch):
+    monkeypatch.setattr(reddit_api, "iter_pages", _listing)
+    monkeypatch.setattr(ingest_pipeline, "to_english", _english)
+
+    saved = reddit_api.busca_reddit("python", "hot", 3)
+
+    assert [p["id"] for p in saved] == [f"python_{d['id']}" for d in PAGE[:3]]
+    for post, data in zip(saved, PAGE):
+        assert post["selftext"] == data["selftext"][:1500]
+        assert post["created_utc"] == data["created_utc"]
+        assert post["title_eng"]
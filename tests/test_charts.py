@@ -0,0 +1,25 @@
+import os
+import time
+
+import charts
+
+
+def _png(directory, name: str, age: float) -> str:
+    path = os.path.join(directory, name)
+    open(path, "wb").close()
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_keeps_charts_still_within_the_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(charts, "CHART_DIR", str(tmp_path))
+    monkeypatch.setattr(charts, "CHART_CACHE_SIZE", 1)
+    monkeypatch.setattr(charts, "CHART_KEEP_SECONDS", 3600)
+    expired = _png(tmp_path, "density_old.png", 7200)
+    recent = [_png(tmp_path, f"density_{i}.png", 60 * i) for i in range(3)]
+
+    charts._prune()
+
+    assert not os.path.exists(expired)
+    assert all(os.path.exists(path) for path in recent)
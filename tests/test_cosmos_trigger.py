@@ -0,0 +1,32 @@
+import azure.functions as func
+
+import CosmosTriggerFunction
+from fake_services import FakeContainer
+from shared_code import sentiment
+
+
+def _setup(monkeypatch):
+    container = FakeContainer()
+    monkeypatch.setattr(CosmosTriggerFunction, "get_container", lambda name: container)
+    monkeypatch.setattr(CosmosTriggerFunction, "update_rollups", lambda docs: 0)
+    monkeypatch.setattr(sentiment, "score_texts",
+                        lambda texts: [("positive", {"positive": 0.9, "neutral": 0.05, "negative": 0.05})
+                                       for _ in texts])
+    return container
+
+
+def test_only_sentiment_fields_are_patched(monkeypatch):
+    container = _setup(monkeypatch)
+    snapshot = container.create_item({"id": "python_1", "subreddit": "python", "title": "old",
+                                      "title_eng": "old", "score": 1})
+    # A ingestão grava uma versão mais recente depois do evento do change feed...
+    newer = container.upsert_item(dict(snapshot, score=42, title_eng="new"))
+    # ...e o evento seguinte (com o _etag atual) é o que grava o sentimento
+    CosmosTriggerFunction.main(func.DocumentList([func.Document.from_dict(snapshot)]))
+    stored = container.read_item("python_1", partition_key="python")
+    assert "sentiment" not in stored and stored["score"] == 42
+
+    CosmosTriggerFunction.main(func.DocumentList([func.Document.from_dict(newer)]))
+    stored = container.read_item("python_1", partition_key="python")
+    assert stored["sentiment"] == "positive"
+    assert stored["score"] == 42 and stored["title_eng"] == "new"
@@ -0,0 +1,71 @@
+import pytest
+
+import SearchFunction
+
+
+def _post(post_id: str, created_utc: float) -> dict:
+    return {"id": post_id, "name": f"t3_{post_id}", "title": post_id, "created_utc": created_utc}
+
+
+class FakePipeline:
+    def __init__(self, container, subreddit):
+        pass
+
+    def run(self, pages):
+        return [d for page in pages for d in page]
+
+    def report(self):
+        return {}
+
+
+@pytest.fixture
+def reddit(monkeypatch):
+    """Listagem /new falsa (do mais recente para o mais antigo) e marca guardada em memória."""
+    state = {"listing": [], "mark": None, "calls": []}
+
+    def iter_pages(subreddit, sort, limit, before=None):
+        state["calls"].append(before)
+        names = [d["name"] for d in state["listing"]]
+        if before is None:
+            yield state["listing"][:limit]
+        elif before in names:
+            newer = state["listing"][:names.index(before)]
+            if newer:
+                yield list(reversed(newer))[:limit]
+
+    def save(subreddit, fullname, created_utc):
+        state["mark"] = {"newest_fullname": fullname, "newest_created_utc": created_utc}
+
+    monkeypatch.setattr(SearchFunction, "get_container", lambda name: None)
+    monkeypatch.setattr(SearchFunction, "IngestPipeline", FakePipeline)
+    monkeypatch.setattr(SearchFunction, "iter_pages", iter_pages)
+    monkeypatch.setattr(SearchFunction, "load_high_water_mark", lambda subreddit: state["mark"])
+    monkeypatch.setattr(SearchFunction, "save_high_water_mark", save)
+    return state
+
+
+def test_posts_created_in_the_same_second_as_the_mark_are_kept(reddit):
+    reddit["listing"] = [_post("b", 100), _post("a", 100)]
+    reddit["mark"] = {"newest_fullname": "t3_a", "newest_created_utc": 100}
+
+    posts, _ = SearchFunction._fetch_incremental("python", 10)
+
+    assert [p["id"] for p in posts] == ["b"]
+    assert reddit["mark"]["newest_fullname"] == "t3_b"
+
+
+def test_deleted_mark_post_falls_back_to_the_plain_listing(reddit):
+    # O post t3_c da marca foi apagado: `before=t3_c` deixa de devolver posts
+    reddit["listing"] = [_post("e", 300), _post("d", 200), _post("b", 50)]
+    reddit["mark"] = {"newest_fullname": "t3_c", "newest_created_utc": 150}
+
+    posts, _ = SearchFunction._fetch_incremental("python", 10)
+
+    assert sorted(p["id"] for p in posts) == ["d", "e"]
+    assert reddit["mark"]["newest_fullname"] == "t3_e"
+    assert reddit["calls"] == ["t3_c", None]
+
+    # E a marca volta a avançar pelo cursor `before` nas ingestões seguintes
+    reddit["listing"].insert(0, _post("f", 400))
+    posts, _ = SearchFunction._fetch_incremental("python", 10)
+    assert [p["id"] for p in posts] == ["f"]
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from shared_code import ingest_pipeline
+from shared_code.ingest_pipeline import IngestPipeline
+
+
+def _pages(count: int, size: int = 3):
+    for p in range(count):
+        yield [{"id": f"{p}_{i}", "title": f"post {p} {i}"} for i in range(size)]
+
+
+def test_translation_failure_does_not_hang_with_more_pages_than_the_queue(monkeypatch):
+    def failing_to_english(texts, known=None):
+        raise RuntimeError("Translator 503")
+
+    monkeypatch.setattr(ingest_pipeline, "load_existing", lambda container, subreddit, ids: {})
+    monkeypatch.setattr(ingest_pipeline, "to_english", failing_to_english)
+    monkeypatch.setattr(ingest_pipeline, "update_index_delta", lambda *args: None)
+
+    pipeline = IngestPipeline(container=None, subreddit="python")
+    outcome = {}
+
+    def run():
+        try:
+            pipeline.run(_pages(ingest_pipeline.QUEUE_SIZE * 5))
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+
+    assert not worker.is_alive(), "run() ficou bloqueado após a falha da tradução"
+    assert isinstance(outcome.get("error"), RuntimeError)
+
+
+def test_pages_are_translated_and_written_in_order(monkeypatch):
+    written = []
+    monkeypatch.setattr(ingest_pipeline, "load_existing", lambda container, subreddit, ids: {})
+    monkeypatch.setattr(ingest_pipeline, "to_english", lambda texts, known=None: list(texts))
+    monkeypatch.setattr(ingest_pipeline, "update_index_delta", lambda *args: None)
+    monkeypatch.setattr(IngestPipeline, "_write", lambda self, posts, existing: written.extend(posts))
+
+    posts = IngestPipeline(container=None, subreddit="python").run(_pages(7))
+
+    assert [p["id"] for p in posts] == [p["id"] for p in written]
+    assert len(posts) == 21
+    assert posts[0]["id"] == "python_0_0"
@@ -0,0 +1,29 @@
+from fake_services import FakeContainer, fake_post
+from shared_code.ingest_writer import MAX_BATCH_OPERATIONS, batches, make_post, write_posts
+
+
+def _posts(n: int) -> list:
+    return [make_post("python", fake_post("python", i), None) for i in range(n)]
+
+
+def test_batches_respect_the_operation_limit():
+    sizes = [len(ops) for ops in batches(_posts(2 * MAX_BATCH_OPERATIONS + 50))]
+    assert sizes == [MAX_BATCH_OPERATIONS, MAX_BATCH_OPERATIONS, 50]
+    assert {op for ops in batches(_posts(3)) for op, _ in ops} == {"upsert"}
+
+
+def test_unchanged_posts_are_not_rewritten():
+    container = FakeContainer()
+    total = MAX_BATCH_OPERATIONS + 20
+
+    assert write_posts(container, "python", _posts(total)) == {"written": total, "skipped": 0}
+    assert container.stats["writes"] == 2
+
+    assert write_posts(container, "python", _posts(total)) == {"written": 0, "skipped": total}
+    assert container.stats["writes"] == 2
+
+    changed = _posts(total)
+    changed[7]["score"] += 1
+    assert write_posts(container, "python", changed) == {"written": 1, "skipped": total - 1}
+    assert container.stats["writes"] == 3
+    assert container.read_item("python_" + fake_post("python", 7)["id"], "python")["score"] == changed[7]["score"]
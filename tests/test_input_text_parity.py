@@ -0,0 +1,46 @@
+"""
+A web-app e a Function escolhem e cortam o texto a classificar de forma
+independente; como o texto entra na sentiment_key, o resultado tem de ser
+byte a byte igual (senão os scores do change feed nunca são reutilizados).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import analysis
+import inference_backends
+from shared_code import sentiment
+
+LONG_BODY = " ".join(f"word{i}" for i in range(400))
+
+POSTS = [
+    {},
+    {"title": "Só o título em português"},
+    {"title": "Título", "title_eng": "Title"},
+    {"title": "  espaços  ", "selftext": "  corpo com espaços  "},
+    {"title": "", "selftext": "Only a body"},
+    {"title": "Title", "title_eng": "", "selftext": "body", "selftext_eng": "English body"},
+    {"title": "Long post", "selftext": LONG_BODY},
+    {"title": "Tabs\tand\nnewlines", "selftext_eng": "multi\n\nparagraph\r\nbody " * 100},
+    {"title": "Ünïcödé 🚀 title", "selftext": "naïve café — " * 300},
+]
+
+
+@pytest.mark.parametrize("post", POSTS)
+def test_web_app_and_function_pick_the_same_input_text(post):
+    web = analysis.input_text(post)
+    function = sentiment.text_for(post)
+    assert web.encode("utf-8") == function.encode("utf-8")
+    assert sentiment.sentiment_key(web) == sentiment.sentiment_key(function)
+
+
+def test_budget_defaults_are_identical():
+    assert inference_backends.SENTIMENT_MAX_TOKENS == sentiment.SENTIMENT_MAX_TOKENS
+    assert inference_backends.HYPOTHESIS_TOKENS == sentiment.HYPOTHESIS_TOKENS
+
+
+@pytest.mark.parametrize("limit", [inference_backends.limit_input_length, sentiment.limit_input_length])
+def test_pipeline_truncates_at_the_token_budget(limit):
+    classifier = SimpleNamespace(tokenizer=SimpleNamespace(model_max_length=1024))
+    limit(classifier)
+    assert classifier.tokenizer.model_max_length == sentiment.SENTIMENT_MAX_TOKENS + sentiment.HYPOTHESIS_TOKENS
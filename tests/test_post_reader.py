@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+import pytest
+
+from shared_code import cosmos, post_reader
+from shared_code.ingest_state import save_listing
+from shared_code.post_reader import fresh_listing, recent_posts, remember
+
+
+@pytest.fixture
+def posts(fake_cosmos, monkeypatch):
+    """Container de posts com 5 posts de r/python e cache de leitura vazio."""
+    monkeypatch.setattr(post_reader, "_cache", OrderedDict())
+    container = fake_cosmos[cosmos.COSMOS_CONTAINER]
+    for n in range(5):
+        container.upsert_item({"id": f"python_p{n}", "subreddit": "python", "title": f"post {n}"})
+    container.upsert_item({"id": "rust_p0", "subreddit": "rust", "title": "outro subreddit"})
+    return container
+
+
+def test_recent_listing_is_served_from_cosmos_in_reddit_order(posts):
+    save_listing("python", "hot", ["python_p3", "python_p0", "python_p4"])
+
+    served = fresh_listing(posts, "python", "hot", 2)
+
+    assert [p["id"] for p in served] == ["python_p3", "python_p0"]
+    # Pedidos seguintes vêm do cache em memória, sem queries ao Cosmos
+    queries = posts.stats["queries"]
+    assert fresh_listing(posts, "python", "hot", 2) is served
+    assert posts.stats["queries"] == queries
+
+
+def test_stale_short_or_incomplete_listings_are_reingested(posts):
+    save_listing("python", "hot", ["python_p3", "python_p0", "python_gone"])
+
+    assert fresh_listing(posts, "python", "hot", 2, max_age=-1) is None
+    assert fresh_listing(posts, "python", "hot", 4) is None
+    assert fresh_listing(posts, "python", "hot", 3) is None
+    assert fresh_listing(posts, "python", "new", 1) is None
+
+
+def test_remember_replaces_other_limits_of_the_same_listing(posts):
+    remember("python", "hot", 10, [{"id": "python_p0"}])
+    remember("python", "hot", 20, [{"id": "python_p1"}])
+
+    assert list(post_reader._cache) == [("python", "hot", 20)]
+    assert fresh_listing(posts, "python", "hot", 20) == [{"id": "python_p1"}]
+
+
+def test_recent_posts_page_with_continuation_tokens(posts, monkeypatch):
+    monkeypatch.setattr(post_reader, "READ_PAGE_SIZE", 2)
+
+    first, token = recent_posts(posts, "python", 3)
+    rest, end = recent_posts(posts, "python", 10, continuation=token)
+
+    assert [p["id"] for p in first + rest] == [f"python_p{n}" for n in reversed(range(5))]
+    assert token and end is None
@@ -0,0 +1,73 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared_code import reddit_auth
+from shared_code.reddit_auth import RedditTokenProvider
+
+
+class FakeReddit(BaseHTTPRequestHandler):
+    """Conta os pedidos de token; as listagens devolvem uma página vazia."""
+
+    token_requests = 0
+    lock = threading.Lock()
+
+    def _json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/api/v1/access_token":
+            with self.lock:
+                type(self).token_requests += 1
+            self._json({"access_token": "abc", "token_type": "bearer", "expires_in": 3600})
+
+    def do_GET(self):
+        assert self.headers["Authorization"] == "bearer abc"
+        self._json({"kind": "Listing", "data": {"children": [], "after": None}})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_reddit(monkeypatch):
+    FakeReddit.token_requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeReddit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(reddit_auth, "REDDIT_AUTH_URL", f"{base}/api/v1/access_token")
+    monkeypatch.setattr(reddit_auth, "REDDIT_API_BASE", base)
+    yield
+    server.shutdown()
+
+
+def test_burst_of_searches_requests_the_token_once(fake_reddit):
+    provider = RedditTokenProvider("id", "secret", "user", "password")
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(lambda _: provider.get("/r/python/hot", params={"limit": 1}).status_code,
+                                 range(50)))
+
+    assert statuses == [200] * 50
+    assert FakeReddit.token_requests == 1
+
+
+def test_requests_use_a_timeout(fake_reddit, monkeypatch):
+    calls = []
+    original_post, original_get = reddit_auth.http.post, reddit_auth.http.get
+    monkeypatch.setattr(reddit_auth.http, "post", lambda *a, **kw: calls.append(kw) or original_post(*a, **kw))
+    monkeypatch.setattr(reddit_auth.http, "get", lambda *a, **kw: calls.append(kw) or original_get(*a, **kw))
+
+    RedditTokenProvider("id", "secret", "user", "password").get("/r/python/hot")
+
+    assert len(calls) == 2
+    assert all(kw.get("timeout") == reddit_auth.REDDIT_TIMEOUT for kw in calls)
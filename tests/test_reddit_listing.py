@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from shared_code.reddit_listing import PAGE_SIZE, iter_pages
+
+
+class FakeListingProvider:
+    """Listagem /new com `size` posts (do mais recente para o mais antigo) e cursores after/before."""
+
+    def __init__(self, size: int):
+        self.posts = [{"id": f"p{n}", "name": f"t3_p{n}"} for n in range(size)]
+        self.names = [p["name"] for p in self.posts]
+        self.requests = []
+
+    def get(self, path, params=None):
+        self.requests.append(dict(params))
+        limit = int(params["limit"])
+        after = before = None
+        if "before" in params:
+            end = self.names.index(params["before"])
+            start = max(0, end - limit)
+            page = self.posts[start:end]
+            before = page[0]["name"] if page and start > 0 else None
+        else:
+            start = self.names.index(params["after"]) + 1 if "after" in params else 0
+            page = self.posts[start:start + limit]
+            after = page[-1]["name"] if page and start + limit < len(self.posts) else None
+        data = {"children": [{"kind": "t3", "data": p} for p in page], "after": after, "before": before}
+        return SimpleNamespace(status_code=200, headers={}, raise_for_status=lambda: None,
+                               json=lambda: {"data": data})
+
+
+def test_after_cursor_pages_past_the_100_item_cap():
+    provider = FakeListingProvider(500)
+
+    pages = list(iter_pages("python", "new", 250, provider=provider))
+
+    assert [len(p) for p in pages] == [PAGE_SIZE, PAGE_SIZE, 50]
+    assert [d["id"] for p in pages for d in p] == [f"p{n}" for n in range(250)]
+    assert provider.requests == [
+        {"limit": 100},
+        {"limit": 100, "after": "t3_p99", "count": 100},
+        {"limit": 50, "after": "t3_p199", "count": 200},
+    ]
+
+
+def test_paging_stops_at_the_end_of_the_listing():
+    provider = FakeListingProvider(150)
+
+    pages = list(iter_pages("python", "new", 1000, provider=provider))
+
+    assert [len(p) for p in pages] == [PAGE_SIZE, 50]
+    assert len(provider.requests) == 2
+
+
+def test_before_cursor_returns_only_newer_posts():
+    provider = FakeListingProvider(500)
+
+    pages = list(iter_pages("python", "new", 1000, provider=provider, before="t3_p150"))
+
+    assert [d["id"] for d in pages[0]] == [f"p{n}" for n in range(50, 150)]
+    assert [d["id"] for d in pages[1]] == [f"p{n}" for n in range(50)]
+    assert provider.requests[1] == {"limit": 100, "before": "t3_p50", "count": 100}
+    assert len(pages) == 2
@@ -0,0 +1,40 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+import report_writer
+
+ROWS = [{"id": f"p{i}", "title": f"post {i}", "score": i,
+         "scores": {"positive": 0.5, "neutral": 0.3, "negative": 0.2}} for i in range(25)]
+# Coluna só preenchida depois do primeiro bloco
+ROWS[-1]["note"] = "late column"
+
+
+def _csv(data: bytes) -> list:
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+
+
+def test_csv_and_gzip_payloads_have_every_row(monkeypatch):
+    monkeypatch.setattr(report_writer, "REPORT_CHUNK_ROWS", 10)
+    plain = b"".join(report_writer.report_payload(ROWS, "csv"))
+    zipped = gzip.decompress(b"".join(report_writer.report_payload(ROWS, "csv.gz")))
+
+    assert plain == zipped
+    rows = _csv(plain)
+    assert [r["id"] for r in rows] == [r["id"] for r in ROWS]
+    assert rows[-1]["note"] == "late column"
+
+
+def test_parquet_is_written_in_row_groups_to_a_spooled_file(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(report_writer, "REPORT_SPOOL_BYTES", 1024)
+    sink = report_writer.parquet_file(ROWS, report_writer.report_columns(ROWS), chunk_rows=10)
+
+    with sink:
+        parquet = pq.ParquetFile(sink)
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+    assert table.column("id").to_pylist() == [r["id"] for r in ROWS]
+    assert table.column("note").to_pylist()[-1] == "late column"
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import result_store
+from result_store import ResultStore, SqliteBackend
+
+
+def test_least_recently_used_result_is_evicted():
+    store = ResultStore(max_entries=2)
+    a, b = store.put(["a"]), store.put(["b"])
+    assert store.get(a) == ["a"]
+
+    c = store.put(["c"])
+
+    assert store.get(b) is None
+    assert store.get(a) == ["a"]
+    assert store.get(c) == ["c"]
+    assert store.get(None) is None
+
+
+def test_expired_results_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_store, "time", SimpleNamespace(time=lambda: now[0]))
+    store = ResultStore(ttl=60)
+    key = store.put(["a"])
+
+    now[0] += 59
+    assert store.get(key) == ["a"]
+    now[0] += 2
+    assert store.get(key) is None
+    assert len(store._lru) == 0
+
+
+def test_evicted_results_are_read_back_from_the_shared_backend(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "results.sqlite3"))
+    store = ResultStore(backend, max_entries=1)
+    first = store.put([{"id": "a", "title": "Olá"}])
+    store.put([{"id": "b"}])
+
+    assert store.get(first) == [{"id": "a", "title": "Olá"}]
+    # Outro worker, com o LRU vazio, vê o mesmo resultado
+    assert ResultStore(backend).get(first) == [{"id": "a", "title": "Olá"}]
+
+    store.delete(first)
+    assert ResultStore(backend).get(first) is None
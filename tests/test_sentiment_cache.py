@@ -0,0 +1,44 @@
+from sentiment_cache import SentimentCache, sentiment_key
+
+LABELS = ["negative", "neutral", "positive"]
+RESULT = {"sentimento": "Positive", "probabilidade": 80,
+          "scores_raw": {"negative": 0.1, "neutral": 0.1, "positive": 0.8}}
+
+
+def test_key_depends_on_model_labels_and_text():
+    key = sentiment_key("texto", "modelo", LABELS)
+    assert key == sentiment_key("texto", "modelo", list(LABELS))
+    assert key != sentiment_key("texto", "modelo+stub", LABELS)
+    assert key != sentiment_key("texto", "modelo", ["negative", "positive"])
+    assert key != sentiment_key("texto ", "modelo", LABELS)
+
+
+def test_memory_and_disk_hits_are_counted(tmp_path):
+    path = str(tmp_path / "sentiment.sqlite3")
+    cache = SentimentCache("modelo", LABELS, path=path)
+
+    assert cache.get_many(["a", "b"]) == [None, None]
+    cache.put_many(["a"], [RESULT])
+    cache.record_inference(1, 0.5)
+    assert cache.get_many(["a", "b"]) == [RESULT, None]
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 3)
+    assert stats["estimated_seconds_saved"] == 0.5
+
+    # Um novo processo (cache vazio em memória) encontra o resultado no SQLite
+    reopened = SentimentCache("modelo", LABELS, path=path)
+    assert reopened.get_many(["a"]) == [RESULT]
+    assert reopened.get_many(["a"]) == [RESULT]
+    stats = reopened.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 0)
+
+    # Outro modelo não partilha os resultados
+    assert SentimentCache("outro", LABELS, path=path).get_many(["a"]) == [None]
+
+
+def test_lru_is_bounded():
+    cache = SentimentCache("modelo", LABELS, path=None, max_entries=2)
+    cache.put_many(["a", "b", "c"], [RESULT] * 3)
+    assert cache.get_many(["a", "b", "c"]) == [None, RESULT, RESULT]
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+
+WEB_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web-app")
+
+
+def test_stub_backend_never_imports_torch():
+    # Processo novo: outros testes podem já ter importado o torch neste
+    code = ("import sys; from model_manager import ModelManager; "
+            "m = ModelManager('x', ['negative', 'neutral', 'positive'], backend='stub'); "
+            "m.load().classify(['a', 'bb']); print('torch' in sys.modules)")
+    env = dict(os.environ, PYTHONPATH=WEB_APP, STUB_LATENCY_MS="0")
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+class RecordingClassifier:
+    """Imita o pipeline zero-shot e regista os textos de cada chamada."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, candidate_labels, batch_size=1):
+        self.calls.append((list(texts), batch_size))
+        # A confiança depende do comprimento, para se verificar a ordem dos resultados
+        return [{"labels": list(candidate_labels), "scores": [len(t) / 10, 0.0, 1 - len(t) / 10]}
+                for t in texts]
+
+
+def test_texts_are_batched_by_length_and_returned_in_original_order():
+    from sentiment_engine import BatchedSentimentClassifier
+
+    texts = ["ccc", "a", "eeeee", "bb", "dddd"]
+    classifier = RecordingClassifier()
+    progress = []
+    engine = BatchedSentimentClassifier(classifier, batch_size=2)
+
+    results = engine.classify(texts, progress=lambda done, total: progress.append((done, total)))
+
+    assert [batch for batch, _ in classifier.calls] == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    # Um par (texto, hipótese) por label no batch interno do pipeline
+    assert {size for _, size in classifier.calls} == {6}
+    assert [r["probabilidade"] for r in results] == [30, 10, 50, 20, 40]
+    assert results[0]["scores_raw"] == {"negative": 0.3, "neutral": 0.0, "positive": 0.7}
+    assert progress == [(2, 5), (4, 5), (5, 5)]
@@ -0,0 +1,101 @@
+import pytest
+
+from fake_services import FakeContainer
+from shared_code import sentiment_rollups
+from shared_code.sentiment_rollups import apply_delta, rollup_delta, update_rollups
+
+# 2023-11-14T22:13:20Z
+CREATED = 1_700_000_000
+SCORES = {"positive": 0.8, "neutral": 0.15, "negative": 0.05}
+
+
+@pytest.fixture
+def container(monkeypatch):
+    container = FakeContainer()
+    monkeypatch.setattr(sentiment_rollups, "get_container", lambda name: container)
+    return container
+
+
+def _post(post_id: str, sentiment: str = "positive", key: str = "k1", score: int = 10, **extra) -> dict:
+    return dict({"id": post_id, "subreddit": "python", "created_utc": CREATED, "score": score,
+                 "sentiment": sentiment, "scores": SCORES, "sentiment_key": key}, **extra)
+
+
+def _rollup(container, granularity: str = "hour", bucket: str = "2023-11-14T22") -> dict:
+    return container.read_item(f"rollup_{granularity}_python_{bucket}", partition_key="python")
+
+
+def test_rollup_delta_sets_the_contribution_in_each_bucket():
+    doc = _post("a")
+    deltas = rollup_delta([doc])
+
+    entry = {"sentiment": "positive", "confidence": 0.8, "score": 10}
+    assert deltas == {("python", "hour", "2023-11-14T22"): {"a": entry},
+                      ("python", "day", "2023-11-14"): {"a": entry}}
+    assert doc["rollup"]["key"] == "k1"
+    # Já agregado com o mesmo sentimento e score: nada a fazer
+    assert rollup_delta([doc]) == {}
+
+
+def test_rescoring_replaces_the_previous_contribution(container):
+    doc = _post("a")
+    update_rollups([doc])
+    doc.update(sentiment="negative", sentiment_key="k2")
+    update_rollups([doc])
+
+    rollup = _rollup(container)
+    assert rollup["posts"] == 1
+    assert rollup["counts"] == {"positive": 0, "neutral": 0, "negative": 1}
+    assert rollup["sum_confidence"] == pytest.approx(0.05)
+
+
+def test_score_change_reaches_sum_score(container):
+    doc = _post("a", score=10)
+    update_rollups([doc])
+    doc["score"] = 250
+    update_rollups([doc])
+
+    assert _rollup(container, "day", "2023-11-14")["sum_score"] == 250
+
+
+def test_replayed_batch_and_lost_rollup_field_do_not_count_twice(container):
+    update_rollups([_post("a"), _post("b", sentiment="neutral")])
+    # Lote repetido pelo change feed, com os documentos ainda sem o campo `rollup`
+    update_rollups([_post("a"), _post("b", sentiment="neutral")])
+
+    rollup = _rollup(container)
+    assert rollup["posts"] == 2
+    assert rollup["counts"] == {"positive": 1, "neutral": 1, "negative": 0}
+
+
+def test_post_moves_out_of_its_previous_bucket(container):
+    doc = _post("a")
+    update_rollups([doc])
+    doc["created_utc"] = CREATED + 3600
+    update_rollups([doc])
+
+    assert _rollup(container)["posts"] == 0
+    assert _rollup(container, "hour", "2023-11-14T23")["posts"] == 1
+
+
+def test_conflicting_write_is_retried_on_top_of_the_other(container):
+    update_rollups([_post("a")])
+    replace = container.replace_item
+    calls = []
+
+    def concurrent_replace(*args, **kwargs):
+        # Na primeira tentativa, outra invocação grava o post "b" antes de nós
+        if not calls:
+            calls.append(1)
+            apply_delta("python", "hour", "2023-11-14T22",
+                        {"b": {"sentiment": "negative", "confidence": 0.9, "score": 3}})
+        calls.append(1)
+        return replace(*args, **kwargs)
+
+    container.replace_item = concurrent_replace
+    apply_delta("python", "hour", "2023-11-14T22", {"c": {"sentiment": "neutral", "confidence": 0.5, "score": 1}})
+
+    rollup = _rollup(container)
+    assert sorted(rollup["contributions"]) == ["a", "b", "c"]
+    assert rollup["posts"] == 3 and rollup["sum_score"] == 14
+    assert len(calls) == 4
@@ -0,0 +1,49 @@
+from sentiment_cache import sentiment_key as web_sentiment_key
+from sentiment_engine import precomputed_sentiment
+from shared_code import sentiment
+from shared_code.ingest_writer import content_hash, prepare_writes
+
+LABELS = ["negative", "neutral", "positive"]
+SCORES = {"negative": 0.1, "neutral": 0.2, "positive": 0.7}
+
+
+def _stored(title: str, score: int = 5) -> dict:
+    doc = {"id": "python_1", "subreddit": "python", "title": title, "title_eng": title,
+           "selftext": "", "selftext_eng": "", "url": "u", "score": score}
+    key = sentiment.sentiment_key(sentiment.text_for(doc))
+    doc.update(content_hash=content_hash(doc), sentiment="positive", scores=SCORES, sentiment_key=key,
+               rollup={"key": key, "hour": "2023-11-14T22"})
+    return doc
+
+
+def test_precomputed_sentiment_requires_the_current_key():
+    text = "Great release"
+    post = {"scores": SCORES, "sentiment_key": web_sentiment_key(text, sentiment.MODEL_NAME, LABELS)}
+
+    current = precomputed_sentiment(post, web_sentiment_key(text, sentiment.MODEL_NAME, LABELS), LABELS)
+    assert current["sentimento"] == "Positive"
+    # Texto alterado ou outro backend (p.ex. int8, com chave própria)
+    assert precomputed_sentiment(post, web_sentiment_key("Edited title", sentiment.MODEL_NAME, LABELS)) is None
+    assert precomputed_sentiment(post, web_sentiment_key(text, sentiment.MODEL_NAME + "+onnx-int8",
+                                                         LABELS)) is None
+
+
+def test_rewritten_text_drops_the_old_sentiment_but_keeps_the_rollup():
+    prev = _stored("Great release")
+    item = {k: prev[k] for k in ("id", "subreddit", "title_eng", "selftext", "selftext_eng", "url", "score")}
+    item["title"] = item["title_eng"] = "Terrible release"
+
+    [written] = prepare_writes([item], {prev["id"]: prev})
+
+    assert "sentiment" not in written and "scores" not in written and "sentiment_key" not in written
+    assert written["rollup"] == prev["rollup"]
+
+
+def test_score_only_change_keeps_the_sentiment():
+    prev = _stored("Great release", score=5)
+    item = {k: prev[k] for k in ("id", "subreddit", "title", "title_eng", "selftext", "selftext_eng", "url")}
+    item["score"] = 80
+
+    [written] = prepare_writes([item], {prev["id"]: prev})
+
+    assert written["sentiment_key"] == prev["sentiment_key"] and written["scores"] == SCORES
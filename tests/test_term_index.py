@@ -0,0 +1,65 @@
+from collections import Counter
+
+import pytest
+
+from fake_services import FakeContainer
+from shared_code import term_index
+from shared_code.ingest_state import COSMOS_METADATA_CONTAINER
+from shared_code.term_index import apply_delta, load_index
+
+
+class RacingContainer(FakeContainer):
+    """Antes das primeiras `races` escritas do índice, outra ingestão grava o seu delta."""
+
+    def __init__(self, races: int):
+        super().__init__()
+        self.races = races
+        self.attempts = 0
+
+    def _race(self):
+        self.attempts += 1
+        if self.races:
+            self.races -= 1
+            doc = self._items.get(("python", "terms_python"))
+            terms = Counter(doc["terms"] if doc else {})
+            terms.update({"rival": 1})
+            self.upsert_item({"id": "terms_python", "subreddit": "python", "terms": dict(terms),
+                              "posts": (doc["posts"] if doc else 0) + 1})
+
+    def create_item(self, body, **kwargs):
+        self._race()
+        return super().create_item(body, **kwargs)
+
+    def replace_item(self, item, body, **kwargs):
+        self._race()
+        return super().replace_item(item, body, **kwargs)
+
+
+@pytest.fixture
+def racing(fake_cosmos):
+    def install(races: int) -> RacingContainer:
+        container = RacingContainer(races)
+        fake_cosmos[COSMOS_METADATA_CONTAINER] = container
+        return container
+    return install
+
+
+def test_concurrent_create_and_replace_are_retried_without_losing_counts(racing):
+    container = racing(races=2)
+
+    apply_delta("python", Counter({"python": 2, "rust": 1}), new_posts=3)
+
+    # 1ª tentativa: create perde para a outra ingestão; 2ª: replace com _etag desatualizado
+    assert container.attempts == 3
+    index = load_index("python")
+    assert index["terms"] == {"python": 2, "rust": 1, "rival": 2}
+    assert index["posts"] == 5
+
+
+def test_gives_up_after_the_retry_limit(racing):
+    container = racing(races=term_index.MAX_CONFLICT_RETRIES)
+
+    apply_delta("python", Counter({"python": 1}))
+
+    assert container.attempts == term_index.MAX_CONFLICT_RETRIES
+    assert load_index("python")["terms"] == {"rival": term_index.MAX_CONFLICT_RETRIES}
@@ -0,0 +1,29 @@
+"""
+A web-app e a Function são publicadas em separado, pelo que o tokenizador
+da nuvem de palavras está duplicado: o índice gravado pela ingestão e as
+contagens feitas na web-app têm de produzir os mesmos termos.
+"""
+import pytest
+
+import term_frequencies
+from shared_code import term_index
+
+TEXTS = [
+    "",
+    "Python's GIL isn't going anywhere",
+    "I LOVE how Rust turned out!!! 10/10 would recommend",
+    "rock'n'roll 'quoted' words'' and a b c",
+    "Opinião sobre Kubernetes: vale a pena?",
+    "don't won't can't users' repos' it's x's",
+    "tabs\tand\nnewlines, commas;semicolons.dots-dashes_underscores",
+    "Ünïcödé ß straße naïve café — émoji 🚀 rocket",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_web_app_and_function_tokenize_identically(text):
+    assert term_frequencies.tokenize(text) == term_index.tokenize(text)
+
+
+def test_token_patterns_are_identical():
+    assert term_frequencies._TOKEN_RE.pattern == term_index._TOKEN_RE.pattern
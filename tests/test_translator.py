@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from shared_code import translator
+
+
+class SlowTranslator(BaseHTTPRequestHandler):
+    """Responde ao /detect só depois de `delay` segundos."""
+
+    delay = 0.0
+
+    def do_POST(self):
+        texts = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        time.sleep(self.delay)
+        body = json.dumps([{"language": "en", "score": 1.0} for _ in texts]).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_translator(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowTranslator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(translator, "TRANSLATOR_ENDPOINT", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(translator, "TRANSLATOR_TIMEOUT", 0.2)
+    yield SlowTranslator
+    server.shutdown()
+
+
+def test_stalled_translator_times_out(slow_translator):
+    slow_translator.delay = 2
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        translator.detect_languages(["olá"])
+    assert time.perf_counter() - start < 1.5
+
+
+def test_responsive_translator_is_unaffected(slow_translator):
+    slow_translator.delay = 0
+    assert translator.detect_languages(["hello", "world"]) == ["en", "en"]
+
+
+@pytest.fixture
+def memo(monkeypatch):
+    """Cache de traduções vazio e chamadas ao serviço registadas em vez de enviadas."""
+    calls = {"detect": [], "translate": []}
+
+    def detect(texts):
+        calls["detect"].append(list(texts))
+        return ["en" if t.startswith("hello") else "pt" for t in texts]
+
+    def translate(texts):
+        calls["translate"].append(list(texts))
+        return [f"(en) {t}" for t in texts]
+
+    monkeypatch.setattr(translator, "_memo", OrderedDict())
+    monkeypatch.setattr(translator, "_memo_stats", {"cosmos_hits": 0, "memory_hits": 0, "misses": 0})
+    monkeypatch.setattr(translator, "detect_languages", detect)
+    monkeypatch.setattr(translator, "translate_to_english", translate)
+    return calls
+
+
+def test_translations_are_memoized_across_calls(memo):
+    assert translator.to_english(["olá mundo", "hello", ""]) == ["(en) olá mundo", "hello", ""]
+    assert memo == {"detect": [["olá mundo", "hello"]], "translate": [["olá mundo"]]}
+
+    # O texto é normalizado (espaços) antes de procurar no cache
+    assert translator.to_english(["olá  mundo ", "hello"]) == ["(en) olá mundo", "hello"]
+    assert len(memo["detect"]) == 1
+
+    stats = translator.cache_stats()
+    assert (stats["memory_hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+
+def test_translations_from_cosmos_fill_the_memo(memo):
+    assert translator.to_english(["bom dia"], known=["good morning"]) == ["good morning"]
+    assert translator.to_english(["bom dia"]) == ["good morning"]
+    assert memo == {"detect": [], "translate": []}
+    stats = translator.cache_stats()
+    assert (stats["cosmos_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
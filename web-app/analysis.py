@@ -0,0 +1,86 @@
+"""
+Análise de sentimento de uma pesquisa completa (trabalho do /detail_all).
+
+Classifica os posts (reutilizando os scores já calculados pelo change feed),
+grava os resultados novos no cache/Cosmos e gera (via charts.py) o gráfico
+de densidade de confiança e a nuvem de palavras. Corre fora do pedido HTTP,
+num job (ver jobs.py), e vai reportando o progresso.
+"""
+import logging
+
+from charts import confidence_chart, wordcloud_chart
+from inference_backends import SENTIMENT_MAX_TOKENS
+from sentiment_engine import precomputed_sentiment
+from term_frequencies import cloud_frequencies
+
+logger = logging.getLogger(__name__)
+
+# truncate_to_budget e input_text são iguais a truncate_to_budget/text_for de
+# redditIngestFunc/shared_code/sentiment.py (ver tests/test_input_text_parity.py)
+
+
+def truncate_to_budget(text: str, max_tokens: int = SENTIMENT_MAX_TOKENS) -> str:
+    """
+    Corta `text` ao orçamento de tokens (estimativa de ~4 tokens por cada 3
+    palavras). A estimativa pode passar dos SENTIMENT_MAX_TOKENS reais; o
+    limite efetivo é a truncagem do pipeline (inference_backends.limit_input_length).
+    """
+    words = text.split()
+    max_words = max(1, max_tokens * 3 // 4)
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words])
+
+
+def input_text(post: dict) -> str:
+    """
+    Texto a classificar: título e selftext, na versão em inglês produzida pela
+    ingestão quando existe, cortados ao orçamento de tokens do modelo.
+    """
+    title = (post.get("title_eng") or post.get("title") or "").strip()
+    body = (post.get("selftext_eng") or post.get("selftext") or "").strip()
+    text = f"{title}\n\n{body}" if title and body else title or body
+    return truncate_to_budget(text)
+
+
+def analyse_posts(posts: list, model_manager, sentiment_cache, candidate_labels, term_index=None,
+                  progress=None) -> dict:
+    """
+    Analisa `posts` e devolve {"posts", "resumo_chart", "wc_chart"}. Os gráficos
+    são nomeados pelo conteúdo (ver charts.py), pelo que análises simultâneas
+    não se sobrepõem. Com `term_index`, a nuvem de palavras cobre todos os posts
+    já ingeridos dos subreddits. `progress(feitos, total)` é chamado durante a
+    classificação.
+    """
+    input_texts = [input_text(post) for post in posts]
+    # Usa os scores pré-calculados pelo change feed e só classifica os restantes
+    sentiments = [precomputed_sentiment(post, sentiment_cache.key(text), candidate_labels)
+                  for post, text in zip(posts, input_texts)]
+    pending = [i for i, s in enumerate(sentiments) if s is None]
+    done_before = len(posts) - len(pending)
+    if progress:
+        progress(done_before, len(posts))
+    if pending:
+        pending_posts = [posts[i] for i in pending]
+        pending_texts = [input_texts[i] for i in pending]
+        computed = model_manager.load().classify(
+            pending_texts, progress and (lambda done, _: progress(done_before + done, len(posts)))
+        )
+        sentiment_cache.write_back(pending_posts, pending_texts, computed)
+        for i, s in zip(pending, computed):
+            sentiments[i] = s
+
+    analysed_posts = []
+    neg_probs, neu_probs, pos_probs = [], [], []
+    for post, sentiment in zip(posts, sentiments):
+        post.update(sentiment)
+        scores = sentiment['scores_raw']
+        analysed_posts.append(post)
+        neg_probs.append(scores.get("negative", 0) * 100)
+        neu_probs.append(scores.get("neutral", 0) * 100)
+        pos_probs.append(scores.get("positive", 0) * 100)
+
+    kde_chart = confidence_chart({"negative": neg_probs, "neutral": neu_probs, "positive": pos_probs})
+    wc_chart = wordcloud_chart(cloud_frequencies(posts, input_texts, term_index))
+    return {"posts": analysed_posts, "resumo_chart": kde_chart, "wc_chart": wc_chart}
+
@@ -1,17 +1,18 @@
 import os
 import requests
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from collections import Counter
-from scipy.stats import gaussian_kde
-from transformers import pipeline
-from wordcloud import WordCloud, STOPWORDS
-from flask import Flask, render_template, request, flash, redirect, url_for, session
-import re
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient, ContentSettings
+from flask import Flask, render_template, request, flash, redirect, url_for, session, jsonify
 from datetime import datetime
-from urllib.parse import urlparse
+from sentiment_cache import SentimentCache, cosmos_container_from_env
+from model_manager import ModelManager, MODEL_WARMUP
+from inference_backends import SENTIMENT_BACKEND, cache_model_id
+from analysis import analyse_posts
+from jobs import JobManager, DONE, FAILED
+from result_store import ResultStore, backend_from_env
+from term_frequencies import term_index_from_env
+from report_writer import REPORT_FORMAT, REPORT_FORMATS, container_client, upload_report
+from blob_listing import list_page, rebuild_manifest
+from trends import GRANULARITIES, trends_from_env
+from charts import trend_chart
 
 
 app = Flask(__name__)
@@ -19,9 +20,22 @@ app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev_secret_key")
 FUNCTION_URL = os.getenv("FUNCTION_URL")
 CONTAINER_ENDPOINT_SAS = os.getenv("CONTAINER_ENDPOINT_SAS")
 
-# Inicializar pipeline de análise de sentimento
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+# Pipeline de análise de sentimento: carregado em segundo plano (ou no primeiro uso)
+MODEL_NAME = "facebook/bart-large-mnli"
 candidate_labels = ["negative", "neutral", "positive"]
+sentiment_cache = SentimentCache(cache_model_id(MODEL_NAME, SENTIMENT_BACKEND), candidate_labels,
+                                 cosmos_container=cosmos_container_from_env())
+model_manager = ModelManager(MODEL_NAME, candidate_labels, cache=sentiment_cache)
+if MODEL_WARMUP == "background":
+    model_manager.start_warmup()
+elif MODEL_WARMUP == "preload":
+    # gunicorn com preload_app: carrega já, antes do fork dos workers
+    model_manager.load()
+analysis_jobs = JobManager()
+term_index = term_index_from_env()
+sentiment_trends = trends_from_env()
+# Posts de cada pesquisa ficam no servidor; a sessão só guarda a chave
+search_results = ResultStore(backend_from_env())
 
 def fetch_posts(subreddit, sort, limit):
     """Chama a Azure Function e retorna lista de posts ou None em caso de erro."""
@@ -59,7 +73,8 @@ def search():
     if posts is None:
         return redirect(url_for("home"))
 
-    session["posts"] = posts
+    session["result_key"] = search_results.put(posts)
+    session.pop("analysis_job", None)
     session["search_params"] = {"subreddit": subreddit, "sort": sort, "limit": limit}
 
     return render_template("index.html", posts=posts, subreddit=subreddit, sort=sort, limit=limit)
@@ -67,116 +82,69 @@ def search():
 
 @app.route("/detail_all", methods=["POST"])
 def detail_all():
-    posts = session.get("posts")
+    posts = search_results.get(session.get("result_key"))
     if not posts:
         flash("Nenhum post disponível para análise.", "warning")
         return redirect(url_for("home"))
 
-    analysed_posts = []
-    os.makedirs("static", exist_ok=True)
-    text_accum = []
-    neg_probs, neu_probs, pos_probs = [], [], []
-
-    for post in posts:
-        input_text = post['selftext'] if post['selftext'].strip() else post['title']
-        sentiment = classifier(input_text, candidate_labels)
-        scores = dict(zip(sentiment['labels'], sentiment['scores']))
-        top_sentiment = sentiment['labels'][0].capitalize()
-        post['sentimento'] = top_sentiment
-        post['probabilidade'] = int(sentiment['scores'][0] * 100)
-        post['scores_raw'] = scores
-        analysed_posts.append(post)
-        text_accum.append(input_text)
-        neg_probs.append(scores.get("negative", 0) * 100)
-        neu_probs.append(scores.get("neutral", 0) * 100)
-        pos_probs.append(scores.get("positive", 0) * 100)
-
-    x = np.linspace(0, 100, 500)
-    plt.figure(figsize=(8, 4))
-
-    if any(neg_probs):
-        kde_neg = gaussian_kde(neg_probs)
-        y_neg = kde_neg(x)
-        y_neg = y_neg / y_neg.sum() * 100
-        plt.plot(x, y_neg, label="Negative", color="crimson", linewidth=2)
-        plt.fill_between(x, y_neg, alpha=0.2, color="crimson")
-
-    if any(neu_probs):
-        kde_neu = gaussian_kde(neu_probs)
-        y_neu = kde_neu(x)
-        y_neu = y_neu / y_neu.sum() * 100
-        plt.plot(x, y_neu, label="Neutral", color="orange", linewidth=2)
-        plt.fill_between(x, y_neu, alpha=0.2, color="orange")
-
-    if any(pos_probs):
-        kde_pos = gaussian_kde(pos_probs)
-        y_pos = kde_pos(x)
-        y_pos = y_pos / y_pos.sum() * 100
-        plt.plot(x, y_pos, label="Positive", color="mediumseagreen", linewidth=2)
-        plt.fill_between(x, y_pos, alpha=0.2, color="mediumseagreen")
-
-    plt.xlabel("Confiança da Análise (%)")
-    plt.ylabel("Distribuição Normalizada (%)")
-    plt.title("Distribuição e Densidade de Confiança por Sentimento")
-    plt.legend()
-    plt.tight_layout()
-    kde_chart = "static/distribuicao_confianca.png"
-    plt.savefig(kde_chart, dpi=200)
-    plt.close()
-
-    wordcloud = WordCloud(width=700, height=350, background_color="white",
-                          stopwords=set(STOPWORDS)).generate(" ".join(text_accum))
-    plt.figure(figsize=(7, 3.5))
-    plt.imshow(wordcloud, interpolation="bilinear")
-    plt.axis("off")
-    plt.tight_layout()
-    wc_chart = "static/nuvem_palavras_all.png"
-    plt.savefig(wc_chart, dpi=200)
-    plt.close()
-
-    return render_template("detail_all.html", posts=analysed_posts,
-                           resumo_chart=kde_chart,
-                           wc_chart=wc_chart,
-                           gantt_chart=kde_chart)
+    # O pedido só agenda a análise; o cliente acompanha o progresso em /analise/<id>
+    job_id = analysis_jobs.submit(analyse_posts, [dict(p) for p in posts], model_manager,
+                                  sentiment_cache, candidate_labels, term_index)
+    session["analysis_job"] = job_id
+    return redirect(url_for("analise", job_id=job_id))
+
+@app.route("/analise/<job_id>", methods=["GET"])
+def analise(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        flash("A análise pedida já não está disponível.", "warning")
+        return redirect(url_for("home"))
+    if job.state == FAILED:
+        flash(f"Erro na análise de sentimento: {job.error}", "danger")
+        return redirect(url_for("home"))
+    if job.state != DONE:
+        return render_template("analise_progresso.html", job=job.status())
+
+    result = job.result
+    return render_template("detail_all.html", posts=result["posts"],
+                           resumo_chart=result["resumo_chart"],
+                           wc_chart=result["wc_chart"],
+                           gantt_chart=result["resumo_chart"],
+                           report_formats=REPORT_FORMATS, report_format=REPORT_FORMAT)
+
+@app.route("/analise/<job_id>/estado", methods=["GET"])
+def estado_analise(job_id):
+    """Estado do job de análise (queued/running/done/failed) e contagem de posts processados."""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "job desconhecido"}), 404
+    return jsonify(job.status())
 
 @app.route("/gerar_relatorio", methods=["POST"])
 def gerar_relatorio():
-    posts = session.get("posts")
+    posts = search_results.get(session.get("result_key"))
     if not posts:
         flash("Não há dados disponíveis para gerar relatório.", "warning")
         return redirect(url_for("home"))
 
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    df = pd.DataFrame(posts)
-    local_csv_name = f"relatorio_{timestamp}.csv"
-    df.to_csv(local_csv_name, index=False, encoding="utf-8")
+    # Se a análise desta pesquisa já terminou, o relatório inclui o sentimento e os gráficos
+    job = analysis_jobs.get(session.get("analysis_job", ""))
+    chart_paths = {}
+    if job is not None and job.state == DONE:
+        posts = job.result["posts"]
+        chart_paths = {"distribuicao_confianca": job.result["resumo_chart"],
+                       "nuvem_palavras_all": job.result["wc_chart"]}
+
+    fmt = request.form.get("formato", REPORT_FORMAT)
+    if fmt not in REPORT_FORMATS:
+        flash(f"Formato de relatório inválido: {fmt}", "warning")
+        return redirect(url_for("home"))
 
-    charts = {
-        f"distribuicao_confianca_{timestamp}.png": "static/distribuicao_confianca.png",
-        f"nuvem_palavras_all_{timestamp}.png": "static/nuvem_palavras_all.png"
-    }
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    charts = {f"{name}_{timestamp}.png": path for name, path in chart_paths.items()}
 
     try:
-        sas_url_base = CONTAINER_ENDPOINT_SAS.split('?')[0]
-        sas_token = CONTAINER_ENDPOINT_SAS.split('?')[1]
-
-        blob_url = f"{sas_url_base}/{local_csv_name}?{sas_token}"
-        blob_client = BlobClient.from_blob_url(blob_url)
-        with open(local_csv_name, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True, content_settings=ContentSettings(
-                content_type="text/csv",
-                content_disposition="inline"
-            ))
-
-        for filename, local_path in charts.items():
-            chart_url = f"{sas_url_base}/{filename}?{sas_token}"
-            chart_client = BlobClient.from_blob_url(chart_url)
-            with open(local_path, "rb") as chart_file:
-                chart_client.upload_blob(chart_file, overwrite=True, content_settings=ContentSettings(
-                    content_type="image/png",
-                    content_disposition="inline"
-                ))
-
+        upload_report(CONTAINER_ENDPOINT_SAS, f"relatorio_{timestamp}", posts, fmt=fmt, charts=charts)
         flash("Relatório e gráficos enviados com sucesso com identificador partilhado.", "success")
 
     except Exception as e:
@@ -184,25 +152,68 @@ def gerar_relatorio():
 
     return redirect(url_for("home"))
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness: 200 quando o modelo está carregado, 503 enquanto aquece. Com
+    MODEL_WARMUP=lazy o modelo só carrega na primeira análise, por isso a
+    instância está sempre pronta (senão nunca receberia esse pedido).
+    """
+    ready = model_manager.ready or MODEL_WARMUP == "lazy"
+    return jsonify(model_manager.status()), (200 if ready else 503)
+
+@app.route("/estatisticas_cache", methods=["GET"])
+def estatisticas_cache():
+    """Contadores de hits/misses do cache de sentimento e tempo de modelo poupado."""
+    return jsonify(sentiment_cache.stats())
+
 @app.route("/listar_ficheiros", methods=["GET"])
 def listar_ficheiros():
     try:
         sas_url = CONTAINER_ENDPOINT_SAS
 
-        container_client = ContainerClient.from_container_url(sas_url)
-        blobs = list(container_client.list_blobs())
+        # Lista mantida num manifesto (ver blob_listing.py), paginada por continuation token
+        client = container_client(sas_url)
+        if request.args.get("reindexar") == "1":
+            rebuild_manifest(client)
+        ficheiros, seguinte = list_page(client, request.args.get("pagina"))
 
-        ficheiros = sorted(
-            [blob.name for blob in blobs],
-            key=lambda name: re.search(r'_(\d{8}_\d{6})', name).group(1) if re.search(r'_(\d{8}_\d{6})', name) else '',
-            reverse=True
-        )
-
-        return render_template("ficheiros.html", ficheiros=ficheiros, sas_base=sas_url.split('?')[0], sas_token=sas_url.split('?')[1])
+        return render_template("ficheiros.html", ficheiros=ficheiros, seguinte=seguinte,
+                               sas_base=sas_url.split('?')[0], sas_token=sas_url.split('?')[1])
 
     except Exception as e:
         flash(f"Erro ao listar ficheiros: {str(e)}", "danger")
         return redirect(url_for("home"))
 
+@app.route("/tendencias", methods=["GET"])
+def tendencias():
+    """Evolução do sentimento de um subreddit, a partir dos agregados por hora/dia."""
+    subreddit = request.args.get("subreddit", "").strip()
+    granularidade = request.args.get("granularidade", "dia")
+    try:
+        periodo = int(request.args.get("periodo", "30"))
+    except ValueError:
+        periodo = 30
+    if granularidade not in GRANULARITIES:
+        granularidade = "dia"
+
+    buckets, chart = [], None
+    if subreddit:
+        if sentiment_trends is None:
+            flash("Tendências indisponíveis: COSMOS_ENDPOINT/COSMOS_KEY não definidas.", "warning")
+        else:
+            try:
+                buckets = sentiment_trends.buckets(subreddit, granularidade, periodo)
+                if buckets:
+                    chart = trend_chart(buckets, f"Sentimento em r/{subreddit} (por {granularidade})")
+                else:
+                    flash(f"Ainda não há agregados de sentimento para r/{subreddit}.", "info")
+            except Exception as e:
+                flash(f"Erro ao obter tendências: {e}", "danger")
+
+    return render_template("tendencias.html", subreddit=subreddit, granularidade=granularidade,
+                           periodo=periodo, buckets=buckets, chart=chart)
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
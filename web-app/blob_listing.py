@@ -0,0 +1,142 @@
+"""
+Listagem indexada e paginada dos ficheiros do container de relatórios.
+
+Em vez de enumerar todos os blobs em cada pedido, a lista é mantida num
+blob de manifesto (MANIFEST_BLOB), já ordenada do mais recente para o mais
+antigo, e atualizada pelo gerar_relatorio a cada upload (escrita condicional
+pelo ETag, para não perder entradas de uploads simultâneos). Se o manifesto
+não existir é reconstruído uma vez a partir do list_blobs.
+
+O manifesto lido fica em cache durante LISTING_CACHE_TTL segundos e é
+invalidado quando este processo grava novos ficheiros. As páginas usam um
+continuation token com a chave do último ficheiro mostrado, pelo que novos
+uploads não deslocam as páginas seguintes.
+"""
+import os
+import re
+import json
+import time
+import base64
+import logging
+import threading
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_BLOB = os.getenv("LISTING_MANIFEST_BLOB", "_manifest/ficheiros.json")
+LISTING_CACHE_TTL = int(os.getenv("LISTING_CACHE_TTL", "60"))
+LISTING_PAGE_SIZE = int(os.getenv("LISTING_PAGE_SIZE", "50"))
+MAX_CONFLICT_RETRIES = 5
+
+_TIMESTAMP_RE = re.compile(r'_(\d{8}_\d{6})')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _entry(name: str) -> dict:
+    match = _TIMESTAMP_RE.search(name)
+    return {"name": name, "ts": match.group(1) if match else ""}
+
+
+def _sort_key(entry: dict) -> tuple:
+    return entry["ts"], entry["name"]
+
+
+def _read_manifest(client):
+    """(entradas, etag) do manifesto, ou (None, None) se ainda não existir."""
+    try:
+        downloader = client.get_blob_client(MANIFEST_BLOB).download_blob()
+    except ResourceNotFoundError:
+        return None, None
+    return json.loads(downloader.readall()), downloader.properties.etag
+
+
+def _write_manifest(client, entries: list, etag: str):
+    data = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+    condition = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag \
+        else {"match_condition": MatchConditions.IfMissing}
+    client.upload_blob(MANIFEST_BLOB, data, overwrite=True, **condition)
+
+
+def _invalidate(client):
+    with _cache_lock:
+        _cache.pop(client.url, None)
+
+
+def rebuild_manifest(client) -> list:
+    """Reconstrói o manifesto a partir da lista completa de blobs (usado só quando não existe)."""
+    entries = [_entry(blob.name) for blob in client.list_blobs() if blob.name != MANIFEST_BLOB]
+    entries.sort(key=_sort_key, reverse=True)
+    client.upload_blob(MANIFEST_BLOB, json.dumps(entries, ensure_ascii=False).encode("utf-8"),
+                       overwrite=True)
+    _invalidate(client)
+    logger.info(f"Manifesto de ficheiros reconstruído com {len(entries)} entradas")
+    return entries
+
+
+def load_entries(client) -> list:
+    """Entradas do manifesto (do mais recente para o mais antigo), com cache TTL."""
+    now = time.time()
+    with _cache_lock:
+        cached = _cache.get(client.url)
+        if cached is not None and now - cached[0] <= LISTING_CACHE_TTL:
+            return cached[1]
+    entries, _ = _read_manifest(client)
+    if entries is None:
+        entries = rebuild_manifest(client)
+    with _cache_lock:
+        _cache[client.url] = (now, entries)
+    return entries
+
+
+def add_to_manifest(client, names: list):
+    """Acrescenta `names` ao manifesto (chamado depois de cada upload de relatório)."""
+    for _ in range(MAX_CONFLICT_RETRIES):
+        entries, etag = _read_manifest(client)
+        if entries is None:
+            # Primeiro upload sem manifesto: a reconstrução já inclui os ficheiros acabados de enviar
+            rebuild_manifest(client)
+            return
+        known = {e["name"] for e in entries}
+        entries.extend(_entry(n) for n in names if n not in known)
+        entries.sort(key=_sort_key, reverse=True)
+        try:
+            _write_manifest(client, entries, etag)
+            _invalidate(client)
+            return
+        except (ResourceModifiedError, ResourceExistsError):
+            # Outro upload atualizou o manifesto entretanto: relê e volta a aplicar
+            continue
+    logger.warning(f"Manifesto de ficheiros não atualizado após {MAX_CONFLICT_RETRIES} conflitos")
+    _invalidate(client)
+
+
+def _encode_token(entry: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([entry["ts"], entry["name"]]).encode("utf-8")).decode("ascii")
+
+
+def _decode_token(token: str) -> tuple:
+    try:
+        ts, name = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return ts, name
+    except (ValueError, TypeError):
+        raise ValueError("Continuation token inválido")
+
+
+def list_page(client, token: str = None, page_size: int = LISTING_PAGE_SIZE):
+    """
+    Uma página de nomes de ficheiros, do mais recente para o mais antigo.
+    Devolve (nomes, token da página seguinte ou None).
+    """
+    entries = load_entries(client)
+    start = 0
+    if token:
+        after = _decode_token(token)
+        # Primeira entrada com chave menor do que a última da página anterior
+        start = next((i for i, e in enumerate(entries) if _sort_key(e) < after), len(entries))
+    page = entries[start:start + page_size]
+    more = start + page_size < len(entries)
+    return [e["name"] for e in page], (_encode_token(page[-1]) if more and page else None)
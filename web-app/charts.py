@@ -0,0 +1,230 @@
+"""
+Gráficos da análise de sentimento (densidade de confiança e nuvem de palavras).
+
+- As três densidades (negativo/neutro/positivo) são calculadas numa única
+  passagem vetorizada em numpy; com muitos posts usa-se uma KDE por bins
+  (histograma na grelha + convolução FFT com o kernel gaussiano), cujo custo
+  não cresce com o número de pontos.
+- O desenho usa diretamente o canvas Agg (sem pyplot nem estado global),
+  pelo que vários jobs podem gerar gráficos em paralelo.
+- Os ficheiros são nomeados pelo hash do conteúdo de entrada: o mesmo
+  conjunto de resultados reutiliza o PNG já gerado. Os menos usados são
+  apagados quando há mais de CHART_CACHE_SIZE, exceto os usados nos últimos
+  CHART_KEEP_SECONDS (um job ou resultado ainda válido pode referi-los).
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+CHART_DIR = os.getenv("CHART_DIR", "static/charts")
+CHART_DPI = int(os.getenv("CHART_DPI", "200"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "200"))
+# Por omissão, o maior TTL dos jobs (jobs.py) e dos resultados (result_store.py)
+CHART_KEEP_SECONDS = int(os.getenv("CHART_KEEP_SECONDS") or
+                         max(int(os.getenv("ANALYSIS_JOB_TTL", "3600")), int(os.getenv("RESULT_TTL", "3600"))))
+# Acima deste número de pontos por série a KDE passa a ser por bins + FFT
+KDE_EXACT_MAX_POINTS = int(os.getenv("KDE_EXACT_MAX_POINTS", "200"))
+GRID_POINTS = 500
+CLOUD_MAX_WORDS = int(os.getenv("CLOUD_MAX_WORDS", "200"))
+# Incrementar quando o aspeto dos gráficos mudar, para não reutilizar PNGs antigos
+CHART_VERSION = 1
+
+SERIES = (("negative", "Negative", "crimson"),
+          ("neutral", "Neutral", "orange"),
+          ("positive", "Positive", "mediumseagreen"))
+
+_prune_lock = threading.Lock()
+
+
+def _chart_path(kind: str, payload) -> str:
+    digest = hashlib.sha256(
+        json.dumps([kind, CHART_VERSION, CHART_DPI, payload], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:20]
+    return os.path.join(CHART_DIR, f"{kind}_{digest}.png")
+
+
+def _cached(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    os.utime(path)  # marca como usado recentemente, para o prune
+    return True
+
+
+def _save_atomic(path: str, write):
+    """Escreve para um ficheiro temporário e renomeia, para nunca servir um PNG a meio."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+    _prune()
+
+
+def _prune():
+    with _prune_lock:
+        try:
+            files = [e for e in os.scandir(CHART_DIR) if e.name.endswith(".png")]
+        except OSError:
+            return
+        if len(files) <= CHART_CACHE_SIZE:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        keep_after = time.time() - CHART_KEEP_SECONDS
+        for entry in files[:len(files) - CHART_CACHE_SIZE]:
+            if entry.stat().st_mtime >= keep_after:
+                break
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _bandwidths(data, counts):
+    """Largura de banda por série pela regra de Scott (a mesma do scipy.stats.gaussian_kde)."""
+    import numpy as np
+
+    std = np.array([np.std(d, ddof=1) if len(d) > 1 else 0.0 for d in data])
+    bw = std * np.power(np.maximum(counts, 1), -1 / 5)
+    # Séries com todos os valores iguais: kernel estreito em vez de uma matriz singular
+    return np.where(bw > 0, bw, 1.0)
+
+
+def densities(series: list, grid):
+    """
+    Densidades normalizadas (soma = 100 na grelha) de cada lista de `series`,
+    avaliadas em `grid`. Devolve um array (n_series, len(grid)); as séries
+    vazias ou só com zeros ficam a None.
+    """
+    import numpy as np
+
+    active = [i for i, s in enumerate(series) if any(s)]
+    out = [None] * len(series)
+    if not active:
+        return out
+    data = [np.asarray(series[i], dtype=float) for i in active]
+    counts = np.array([len(d) for d in data])
+    bw = _bandwidths(data, counts)
+
+    if counts.max() <= KDE_EXACT_MAX_POINTS:
+        # Todas as séries numa só operação: pontos em falta ficam com peso 0
+        n = counts.max()
+        values = np.zeros((len(data), n))
+        weights = np.zeros((len(data), n))
+        for row, d in enumerate(data):
+            values[row, :len(d)] = d
+            weights[row, :len(d)] = 1.0
+        z = (grid[None, :, None] - values[:, None, :]) / bw[:, None, None]
+        y = (np.exp(-0.5 * z * z) * weights[:, None, :]).sum(axis=2) / bw[:, None]
+    else:
+        # KDE por bins: histograma na grelha convolvido com o kernel via FFT
+        from scipy.signal import fftconvolve
+
+        step = grid[1] - grid[0]
+        edges = np.append(grid - step / 2, grid[-1] + step / 2)
+        y = np.empty((len(data), len(grid)))
+        for row, d in enumerate(data):
+            hist, _ = np.histogram(d, bins=edges)
+            half = int(np.ceil(4 * bw[row] / step))
+            offsets = np.arange(-half, half + 1) * step
+            kernel = np.exp(-0.5 * (offsets / bw[row]) ** 2)
+            y[row] = fftconvolve(hist, kernel, mode="same")
+
+    totals = y.sum(axis=1, keepdims=True)
+    y = np.divide(y, totals, out=np.zeros_like(y), where=totals > 0) * 100
+    for row, i in enumerate(active):
+        out[i] = y[row]
+    return out
+
+
+def confidence_chart(probs: dict) -> str:
+    """
+    Gráfico de densidade da confiança por sentimento. `probs` é
+    {"negative": [...], "neutral": [...], "positive": [...]} em percentagem.
+    Devolve o caminho do PNG (reutilizado se já existir).
+    """
+    payload = {key: [round(v, 4) for v in probs.get(key, [])] for key, _, _ in SERIES}
+    path = _chart_path("distribuicao_confianca", payload)
+    if _cached(path):
+        return path
+
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    x = np.linspace(0, 100, GRID_POINTS)
+    curves = densities([payload[key] for key, _, _ in SERIES], x)
+
+    fig = Figure(figsize=(8, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for (_, label, color), y in zip(SERIES, curves):
+        if y is None:
+            continue
+        ax.plot(x, y, label=label, color=color, linewidth=2)
+        ax.fill_between(x, y, alpha=0.2, color=color)
+    ax.set_xlabel("Confiança da Análise (%)")
+    ax.set_ylabel("Distribuição Normalizada (%)")
+    ax.set_title("Distribuição e Densidade de Confiança por Sentimento")
+    if any(y is not None for y in curves):
+        ax.legend()
+    fig.tight_layout()
+    _save_atomic(path, lambda tmp: fig.savefig(tmp, dpi=CHART_DPI, format="png"))
+    return path
+
+
+def wordcloud_chart(frequencies: dict) -> str:
+    """
+    Nuvem de palavras a partir de {termo: contagem} (ver term_frequencies.py);
+    devolve o caminho do PNG. O custo não depende do número de textos.
+    """
+    from wordcloud import WordCloud, STOPWORDS
+
+    top = Counter({t: c for t, c in frequencies.items() if t not in STOPWORDS and c > 0}) \
+        .most_common(CLOUD_MAX_WORDS)
+    path = _chart_path("nuvem_palavras_all", top)
+    if _cached(path):
+        return path
+
+    # A nuvem é gravada diretamente como imagem, sem passar por uma figura matplotlib
+    wordcloud = WordCloud(width=700, height=350, background_color="white",
+                          max_words=CLOUD_MAX_WORDS).generate_from_frequencies(dict(top))
+    _save_atomic(path, lambda tmp: wordcloud.to_image().save(tmp, format="PNG"))
+    return path
+
+
+def trend_chart(buckets: list, title: str) -> str:
+    """
+    Evolução da percentagem de cada sentimento ao longo dos `buckets`
+    (ver trends.py); devolve o caminho do PNG (reutilizado se já existir).
+    """
+    payload = [[b["bucket"], b["posts"], [b["counts"][key] for key, _, _ in SERIES]] for b in buckets]
+    path = _chart_path("tendencia", [title, payload])
+    if _cached(path):
+        return path
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    x = [b["bucket"] for b in buckets]
+    fig = Figure(figsize=(9, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for key, label, color in SERIES:
+        ax.plot(x, [b["shares"][key] for b in buckets], label=label, color=color, linewidth=2, marker="o",
+                markersize=3)
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("Posts (%)")
+    ax.set_title(title)
+    # Só algumas etiquetas no eixo x, para não se sobreporem
+    ax.set_xticks(x[::max(1, len(x) // 10)])
+    ax.tick_params(axis="x", labelrotation=45)
+    if buckets:
+        ax.legend()
+    fig.tight_layout()
+    _save_atomic(path, lambda tmp: fig.savefig(tmp, dpi=CHART_DPI, format="png"))
+    return path
@@ -0,0 +1,60 @@
+"""
+Configuração do gunicorn para produção (substitui o `flask run`).
+
+- MODEL_WARMUP escolhe quando o modelo é carregado (por omissão "background"):
+    - "background": cada worker arranca logo e aquece o seu modelo numa
+      thread; o /ready responde 503 até terminar. Arranque rápido, mas uma
+      cópia dos pesos (~1.6 GB) por worker;
+    - "preload": o app.py e o modelo são carregados uma vez no mestre, antes
+      do fork (preload_app), e os workers partilham os pesos por
+      copy-on-write. Poupa memória, mas o gunicorn só aceita ligações depois
+      de o modelo carregar (minutos no primeiro arranque, que podem esgotar
+      as probes de arranque do container) e uma falha no carregamento
+      impede o arranque;
+    - "lazy": o modelo só é carregado pela primeira análise de cada worker;
+      o /ready responde 200, porque não há nada a aguardar;
+- workers e threads do torch repartem os CPUs do container: cada worker
+  usa TORCH_NUM_THREADS = CPUs / workers, para que as análises de vários
+  workers em paralelo não disputem os mesmos cores;
+- pools separados: as threads gthread atendem os pedidos HTTP e a inferência
+  corre no pool de jobs (ANALYSIS_WORKERS por worker), por isso as rotas
+  leves (/, /search, /listar_ficheiros) nunca esperam por uma análise.
+
+Variáveis: MODEL_WARMUP, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, PORT.
+"""
+import os
+import gc
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sentiment_engine import container_cpu_count
+
+cpus = container_cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = "gthread"
+# Cada worker com 2 threads de inferência aproveita melhor o CPU do que um só com todos os cores
+workers = int(os.getenv("WEB_WORKERS", str(max(1, cpus // 2))))
+threads = int(os.getenv("WEB_THREADS", "8"))
+# O /search espera até 30s pela Azure Function
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+
+# Lidas pelo app.py no import
+os.environ.setdefault("MODEL_WARMUP", "background")
+# Só com o modelo carregado no import compensa carregar a app no mestre; a
+# thread de aquecimento do modo "background" não sobreviveria ao fork
+preload_app = os.environ["MODEL_WARMUP"] == "preload"
+os.environ.setdefault("TORCH_NUM_THREADS", str(max(1, cpus // workers)))
+# Os pedidos de estado de um job e os resultados de uma pesquisa podem chegar a qualquer worker
+os.environ.setdefault("JOB_STORE_PATH", "cache/jobs.sqlite3")
+os.environ.setdefault("RESULT_STORE_PATH", "cache/results.sqlite3")
+
+
+def when_ready(server):
+    if preload_app:
+        # Objetos criados no preload deixam de ser visitados pelo GC nos workers,
+        # o que evita tocar (e copiar) as páginas de memória partilhadas
+        gc.freeze()
+    server.log.info(f"gunicorn: {workers} workers x {threads} threads, "
+                    f"{os.environ['TORCH_NUM_THREADS']} threads torch por worker ({cpus} CPUs)")
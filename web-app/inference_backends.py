@@ -0,0 +1,112 @@
+"""
+Backends de inferência para o classificador zero-shot.
+
+Todos devolvem um objeto com a interface do pipeline "zero-shot-classification"
+do transformers, pelo que o BatchedSentimentClassifier não muda:
+
+  - "transformers": pipeline PyTorch original (fp32);
+  - "onnx":         o mesmo modelo exportado para ONNX Runtime;
+  - "onnx-int8":    export ONNX com quantização dinâmica int8 dos pesos;
+  - "stub":         sem modelo; scores determinísticos e STUB_LATENCY_MS de CPU
+                    por texto, para testes de carga sem descarregar pesos.
+
+O backend escolhe-se com SENTIMENT_BACKEND. As exportações ficam em
+ONNX_CACHE_DIR para só serem feitas uma vez.
+"""
+import os
+import time
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("transformers", "onnx", "onnx-int8", "stub")
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "transformers")
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "cache/onnx")
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "50"))
+# Igual a redditIngestFunc/shared_code/sentiment.py (o texto escolhido entra na sentiment_key)
+SENTIMENT_MAX_TOKENS = int(os.getenv("SENTIMENT_MAX_TOKENS", "256"))
+# Margem para a hipótese ("This example is positive.") e os tokens especiais do par
+HYPOTHESIS_TOKENS = 16
+
+
+def cache_model_id(model_name: str, backend: str) -> str:
+    """
+    Identificador do modelo para o cache de resultados. O export ONNX fp32 dá
+    os mesmos scores do PyTorch; a versão int8 e o stub não, por isso têm chave própria.
+    """
+    return f"{model_name}+{backend}" if backend in ("onnx-int8", "stub") else model_name
+
+
+def _onnx_model(model_name: str, quantized: bool):
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise RuntimeError("Os backends ONNX precisam de 'optimum[onnxruntime]' instalado") from e
+
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        logger.info(f"A exportar {model_name} para ONNX em {export_dir}")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+    if not quantized:
+        return ORTModelForSequenceClassification.from_pretrained(export_dir), export_dir
+
+    quantized_dir = export_dir + "-int8"
+    if not os.path.exists(os.path.join(quantized_dir, "model_quantized.onnx")):
+        logger.info(f"A quantizar (int8 dinâmico) {model_name} em {quantized_dir}")
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+    model = ORTModelForSequenceClassification.from_pretrained(quantized_dir, file_name="model_quantized.onnx")
+    return model, quantized_dir
+
+
+class StubClassifier:
+    """Imita o pipeline zero-shot: ocupa o CPU (com o GIL) como faria a inferência real."""
+
+    def __init__(self, latency_ms: float = STUB_LATENCY_MS):
+        self.latency = latency_ms / 1000
+
+    def _classify(self, text: str, labels) -> dict:
+        deadline = time.perf_counter() + self.latency
+        while time.perf_counter() < deadline:
+            pass
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        weights = [digest[i] + 1 for i in range(len(labels))]
+        ranked = sorted(zip(labels, weights), key=lambda p: p[1], reverse=True)
+        return {"sequence": text, "labels": [l for l, _ in ranked],
+                "scores": [w / sum(weights) for _, w in ranked]}
+
+    def __call__(self, texts, candidate_labels, batch_size: int = 1):
+        if isinstance(texts, str):
+            return self._classify(texts, candidate_labels)
+        return [self._classify(t, candidate_labels) for t in texts]
+
+
+def limit_input_length(classifier):
+    """
+    Faz o pipeline truncar o texto (nunca a hipótese) a SENTIMENT_MAX_TOKENS
+    tokens reais: o zero-shot já trunca com `only_first` até
+    `tokenizer.model_max_length`, e não aceita `truncation=` na chamada.
+    """
+    tokenizer = classifier.tokenizer
+    tokenizer.model_max_length = min(tokenizer.model_max_length, SENTIMENT_MAX_TOKENS + HYPOTHESIS_TOKENS)
+    return classifier
+
+
+def build_classifier(model_name: str, backend: str = SENTIMENT_BACKEND):
+    """Pipeline zero-shot do `backend` indicado."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de inferência desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    if backend == "stub":
+        return StubClassifier()
+
+    from transformers import AutoTokenizer, pipeline
+    if backend == "transformers":
+        return limit_input_length(pipeline("zero-shot-classification", model=model_name))
+
+    model, _ = _onnx_model(model_name, quantized=(backend == "onnx-int8"))
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    return limit_input_length(pipeline("zero-shot-classification", model=model, tokenizer=tokenizer))
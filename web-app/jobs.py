@@ -0,0 +1,190 @@
+"""
+Jobs de análise executados fora do pedido HTTP.
+
+O POST /detail_all só cria o job e responde de imediato; a análise corre num
+pool de workers e o cliente consulta o estado (com contagem de progresso)
+até o resultado estar pronto. Os resultados ficam guardados por id de job,
+para se poderem voltar a mostrar, e são descartados após JOB_TTL segundos
+ou quando há mais de MAX_JOBS terminados.
+
+O executor é qualquer objeto com `submit(fn, *args)` (p.ex. um
+ThreadPoolExecutor); por omissão é um pool de threads no próprio processo,
+que partilha o modelo já carregado pelo ModelManager. O estado dos jobs fica
+em memória ou, com JOB_STORE_PATH definido, numa base SQLite partilhada,
+necessária quando há vários processos (workers do gunicorn) e o pedido de
+consulta pode chegar a um worker diferente do que corre o job.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "1"))
+MAX_JOBS = int(os.getenv("ANALYSIS_MAX_JOBS", "100"))
+JOB_TTL = int(os.getenv("ANALYSIS_JOB_TTL", "3600"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.state = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def status(self) -> dict:
+        return {"id": self.id, "state": self.state, "done": self.done, "total": self.total,
+                "error": self.error}
+
+
+class MemoryJobStore:
+    """Jobs no próprio processo (um único worker)."""
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def evict(self, ttl: int, max_jobs: int) -> list:
+        now = time.time()
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.finished is not None]
+            expired = [j for j in finished if now - j.finished > ttl]
+            # Para além do TTL, mantém no máximo `max_jobs` terminados (os mais antigos saem primeiro)
+            excess = max(0, len(finished) - len(expired) - max_jobs)
+            expired += [j for j in finished if now - j.finished <= ttl][:excess]
+            for job in expired:
+                del self._jobs[job.id]
+        return expired
+
+
+class SqliteJobStore:
+    """Jobs numa base SQLite, visíveis para todos os processos da mesma máquina."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, state TEXT NOT NULL, "
+                "done INTEGER, total INTEGER, error TEXT, result TEXT, created REAL, finished REAL)"
+            )
+
+    def _connect(self):
+        # Uma ligação por operação: é usada por várias threads e processos
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, job: Job):
+        result = json.dumps(job.result) if job.result is not None else None
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs (id, state, done, total, error, result, created, finished) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.state, job.done, job.total, job.error, result, job.created, job.finished)
+            )
+
+    def get(self, job_id: str):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT state, done, total, error, result, created, finished FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = Job(job_id)
+        job.state, job.done, job.total, job.error, result, job.created, job.finished = row
+        job.result = json.loads(result) if result else None
+        return job
+
+    def evict(self, ttl: int, max_jobs: int) -> list:
+        now = time.time()
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, result FROM jobs WHERE finished IS NOT NULL AND "
+                "(finished < ? OR id NOT IN (SELECT id FROM jobs WHERE finished IS NOT NULL "
+                "ORDER BY finished DESC LIMIT ?))",
+                (now - ttl, max_jobs)
+            ).fetchall()
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(r[0],) for r in rows])
+        expired = []
+        for job_id, result in rows:
+            job = Job(job_id)
+            job.result = json.loads(result) if result else None
+            expired.append(job)
+        return expired
+
+
+class JobManager:
+    """Fila de jobs com estado e resultados consultáveis por id."""
+
+    def __init__(self, executor=None, store=None, max_jobs: int = MAX_JOBS, ttl: int = JOB_TTL,
+                 on_evict=None):
+        self.executor = executor or ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS,
+                                                       thread_name_prefix="analysis")
+        self.store = store or (SqliteJobStore(JOB_STORE_PATH) if JOB_STORE_PATH else MemoryJobStore())
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        # Chamado com o resultado de cada job descartado (p.ex. para apagar ficheiros)
+        self.on_evict = on_evict
+
+    def submit(self, fn, *args) -> str:
+        """
+        Agenda `fn(*args, progress=...)` e devolve o id do job. `progress(feitos,
+        total)` atualiza a contagem visível no estado do job.
+        """
+        job = Job(uuid.uuid4().hex)
+        self._evict()
+        self.store.save(job)
+        self.executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    def _run(self, job: Job, fn, args):
+        job.state = RUNNING
+        self.store.save(job)
+
+        def progress(done, total):
+            job.done, job.total = done, total
+            self.store.save(job)
+
+        try:
+            job.result = fn(*args, progress=progress)
+            job.state = DONE
+        except Exception as e:
+            logger.exception(f"Job de análise {job.id} falhou")
+            job.error = str(e)
+            job.state = FAILED
+        finally:
+            job.finished = time.time()
+            self.store.save(job)
+
+    def _evict(self):
+        for job in self.store.evict(self.ttl, self.max_jobs):
+            if self.on_evict and job.result is not None:
+                try:
+                    self.on_evict(job.result)
+                except Exception as e:
+                    logger.warning(f"Falha ao libertar o resultado do job {job.id}: {e}")
@@ -0,0 +1,82 @@
+"""
+Carregamento diferido do modelo de sentimento.
+
+O pipeline zero-shot (~1.6 GB de pesos) deixa de ser construído no import
+do app.py: é carregado na primeira utilização ou, por omissão, aquecido
+numa thread em segundo plano enquanto a aplicação já responde às rotas que
+não precisam dele. Os imports pesados (transformers/torch/onnxruntime) só
+acontecem aqui, através do backend escolhido em inference_backends.py.
+"""
+import os
+import time
+import logging
+import threading
+
+from sentiment_engine import BatchedSentimentClassifier, configure_torch_threads
+from inference_backends import SENTIMENT_BACKEND, build_classifier
+
+logger = logging.getLogger(__name__)
+
+# "background" (aquece ao arrancar), "lazy" (só no primeiro pedido que precisa do modelo)
+# ou "preload" (carrega de forma síncrona no import, antes do fork do gunicorn);
+# ver o compromisso entre os três em gunicorn.conf.py
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background")
+
+
+class ModelManager:
+    """Constrói o classificador uma única vez por processo, de forma thread-safe."""
+
+    def __init__(self, model_name: str, candidate_labels, cache=None, backend: str = SENTIMENT_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self.candidate_labels = list(candidate_labels)
+        self.cache = cache
+        self.state = "cold"
+        self.error = None
+        self.load_seconds = None
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._engine is not None
+
+    def start_warmup(self):
+        """Começa a carregar o modelo numa thread daemon, sem bloquear o arranque."""
+        if self.state != "cold":
+            return
+        threading.Thread(target=self._warmup, name="model-warmup", daemon=True).start()
+
+    def _warmup(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Falha ao aquecer o modelo de sentimento")
+
+    def load(self) -> BatchedSentimentClassifier:
+        """Devolve o motor de inferência, carregando o modelo se ainda não estiver carregado."""
+        if self._engine is not None:
+            return self._engine
+        with self._lock:
+            if self._engine is None:
+                self.state = "loading"
+                start = time.perf_counter()
+                uses_torch = self.backend == "transformers"
+                try:
+                    # Os backends ONNX usam as threads do ONNX Runtime e o stub nenhumas
+                    if uses_torch:
+                        configure_torch_threads()
+                    classifier = build_classifier(self.model_name, self.backend)
+                except Exception as e:
+                    self.state, self.error = "failed", str(e)
+                    raise
+                self._engine = BatchedSentimentClassifier(classifier, self.candidate_labels, cache=self.cache,
+                                                          uses_torch=uses_torch)
+                self.load_seconds = round(time.perf_counter() - start, 2)
+                self.state, self.error = "ready", None
+                logger.info(f"Modelo {self.model_name} ({self.backend}) carregado em {self.load_seconds}s")
+        return self._engine
+
+    def status(self) -> dict:
+        return {"model": self.model_name, "backend": self.backend, "state": self.state,
+                "load_seconds": self.load_seconds, "error": self.error}
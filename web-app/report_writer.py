@@ -0,0 +1,175 @@
+"""
+Geração e envio dos relatórios para o Azure Blob Storage.
+
+O relatório já não passa por um DataFrame nem por um ficheiro local: as
+linhas são serializadas em blocos e entregues diretamente ao upload do
+blob (upload em blocos, sem tamanho conhecido à partida): não é escrito
+nada no disco do container e a memória extra fica limitada a um bloco de
+linhas. Formatos:
+
+  - "csv":     CSV em UTF-8;
+  - "csv.gz":  o mesmo CSV comprimido com gzip à medida que é gerado;
+  - "parquet": colunar e comprimido (precisa do pacote opcional pyarrow).
+               É escrito row group a row group num ficheiro temporário que
+               fica em memória até REPORT_SPOOL_BYTES e passa depois para o
+               disco, porque o rodapé do Parquet só é conhecido no fim.
+
+O CSV e os gráficos são enviados em paralelo pelo mesmo ContainerClient,
+que é criado uma vez por processo e reutiliza as ligações HTTP; no fim, os
+novos ficheiros são acrescentados ao manifesto da listagem (blob_listing.py).
+"""
+import io
+import os
+import csv
+import json
+import zlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.storage.blob import ContainerClient, ContentSettings
+
+from blob_listing import add_to_manifest
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ("csv", "csv.gz", "parquet")
+REPORT_FORMAT = os.getenv("REPORT_FORMAT", "csv")
+# Linhas serializadas por bloco enviado para o upload
+REPORT_CHUNK_ROWS = int(os.getenv("REPORT_CHUNK_ROWS", "1000"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+# Tamanho a partir do qual o Parquet em construção passa da memória para o disco
+REPORT_SPOOL_BYTES = int(os.getenv("REPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def container_client(container_url: str) -> ContainerClient:
+    """ContainerClient (com pool de ligações) partilhado por todos os uploads para `container_url`."""
+    with _clients_lock:
+        client = _clients.get(container_url)
+        if client is None:
+            client = _clients[container_url] = ContainerClient.from_container_url(container_url)
+        return client
+
+
+def report_columns(rows: list) -> list:
+    """Colunas pela ordem em que aparecem (como as de um DataFrame construído com as linhas)."""
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    return list(columns)
+
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def iter_csv(rows: list, columns: list, chunk_rows: int = REPORT_CHUNK_ROWS):
+    """Gera o CSV em blocos de bytes, `chunk_rows` linhas de cada vez."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_cell(row.get(c)) for c in columns])
+        if i % chunk_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    """Comprime uma sequência de blocos num único stream gzip, bloco a bloco."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parquet_file(rows: list, columns: list, chunk_rows: int = REPORT_CHUNK_ROWS):
+    """
+    Escreve o Parquet, um row group de `chunk_rows` linhas de cada vez, num
+    SpooledTemporaryFile (posicionado no início; quem o recebe fecha-o). O
+    esquema é inferido coluna a coluna sobre todas as linhas, para que os
+    row groups sejam compatíveis mesmo com colunas vazias no primeiro bloco.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("O formato Parquet precisa do pacote 'pyarrow' instalado") from e
+
+    schema = pa.schema([(c, pa.infer_type([row.get(c) for row in rows])) for c in columns])
+    sink = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+    try:
+        with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+            for start in range(0, len(rows), chunk_rows):
+                chunk = [{c: row.get(c) for c in columns} for row in rows[start:start + chunk_rows]]
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+    except Exception:
+        sink.close()
+        raise
+    sink.seek(0)
+    return sink
+
+
+def report_payload(rows: list, fmt: str):
+    """Corpo do blob no formato `fmt`: um gerador de blocos (CSV) ou um ficheiro (Parquet)."""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Formato de relatório desconhecido: {fmt} (opções: {', '.join(REPORT_FORMATS)})")
+    columns = report_columns(rows)
+    if fmt == "parquet":
+        return parquet_file(rows, columns)
+    chunks = iter_csv(rows, columns)
+    return gzip_chunks(chunks) if fmt == "csv.gz" else chunks
+
+
+def upload_report(container_url: str, report_name: str, rows: list, fmt: str = REPORT_FORMAT,
+                  charts: dict = None) -> list:
+    """
+    Envia o relatório (`report_name` + extensão do formato) e os gráficos
+    ({nome do blob: caminho local}) em paralelo. Devolve os nomes dos blobs.
+    """
+    client = container_client(container_url)
+    uploads = [(f"{report_name}.{fmt}", report_payload(rows, fmt), CONTENT_TYPES[fmt])]
+    for blob_name, path in (charts or {}).items():
+        uploads.append((blob_name, path, "image/png"))
+
+    def upload(blob_name, data, content_type):
+        settings = ContentSettings(content_type=content_type, content_disposition="inline")
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                client.upload_blob(blob_name, f, overwrite=True, content_settings=settings)
+        else:
+            try:
+                client.upload_blob(blob_name, data, overwrite=True, content_settings=settings,
+                                   max_concurrency=UPLOAD_CONCURRENCY)
+            finally:
+                if hasattr(data, "close"):
+                    data.close()
+        return blob_name
+
+    with ThreadPoolExecutor(max_workers=len(uploads)) as pool:
+        futures = [pool.submit(upload, *u) for u in uploads]
+        names = [f.result() for f in futures]
+    logger.info(f"Relatório enviado: {', '.join(names)} ({len(rows)} linhas, formato {fmt})")
+    try:
+        add_to_manifest(client, names)
+    except Exception as e:
+        logger.warning(f"Falha ao atualizar o manifesto de ficheiros: {e}")
+    return names
@@ -0,0 +1,147 @@
+"""
+Armazenamento no servidor dos resultados de pesquisa.
+
+A lista de posts de uma pesquisa deixa de ir no cookie de sessão do Flask
+(assinado, limitado a ~4 KB e reenviado em todos os pedidos): fica aqui,
+com uma chave aleatória, e a sessão guarda só essa chave. Camadas:
+  1. LRU em memória com TTL (sempre);
+  2. opcionalmente, um backend partilhado entre processos/réplicas:
+     Redis (ou compatível) com REDIS_URL, ou SQLite local com
+     RESULT_STORE_PATH (vários workers do gunicorn na mesma máquina).
+
+Os valores devolvidos são partilhados com o LRU: quem os quiser alterar
+deve trabalhar sobre uma cópia.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_SIZE = int(os.getenv("RESULT_STORE_SIZE", "200"))
+RESULT_TTL = int(os.getenv("RESULT_TTL", "3600"))
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "")
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+
+class RedisBackend:
+    def __init__(self, url: str, prefix: str = "resultados:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("REDIS_URL definido mas o pacote 'redis' não está instalado") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def put(self, key: str, payload: str, ttl: int):
+        self.client.setex(self.prefix + key, ttl, payload)
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class SqliteBackend:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+            )
+
+    def _connect(self):
+        # Uma ligação por operação: é usada por várias threads e processos
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, key: str, payload: str, ttl: int):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM results WHERE expires < ?", (now,))
+            db.execute("INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                       (key, payload, now + ttl))
+
+    def get(self, key: str):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM results WHERE key = ? AND expires >= ?",
+                             (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def delete(self, key: str):
+        with self._connect() as db:
+            db.execute("DELETE FROM results WHERE key = ?", (key,))
+
+
+def backend_from_env():
+    if REDIS_URL:
+        return RedisBackend(REDIS_URL)
+    if RESULT_STORE_PATH:
+        return SqliteBackend(RESULT_STORE_PATH)
+    return None
+
+
+class ResultStore:
+    """LRU com TTL em memória, opcionalmente à frente de um backend partilhado."""
+
+    def __init__(self, backend=None, max_entries: int = RESULT_STORE_SIZE, ttl: int = RESULT_TTL):
+        self.backend = backend
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, value):
+        self._lru[key] = (time.time() + self.ttl, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def put(self, value) -> str:
+        """Guarda `value` (serializável em JSON) e devolve a chave para a sessão."""
+        key = uuid.uuid4().hex
+        with self._lock:
+            self._remember(key, value)
+        if self.backend is not None:
+            self.backend.put(key, json.dumps(value, ensure_ascii=False), self.ttl)
+        return key
+
+    def get(self, key: str):
+        """Valor guardado com `key`, ou None se não existir ou tiver expirado."""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= time.time():
+                    self._lru.move_to_end(key)
+                    return value
+                del self._lru[key]
+        if self.backend is None:
+            return None
+        try:
+            payload = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Falha ao ler o resultado {key} do backend: {e}")
+            return None
+        if payload is None:
+            return None
+        value = json.loads(payload)
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._lru.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
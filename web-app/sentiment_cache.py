@@ -0,0 +1,175 @@
+"""
+Cache de resultados de sentimento endereçado pelo conteúdo.
+
+A chave é o hash de (modelo, labels candidatas, texto), pelo que o mesmo post
+devolvido em pesquisas diferentes (ou por utilizadores diferentes) só passa
+pelo modelo uma vez. Camadas:
+  1. LRU em memória com tamanho limitado;
+  2. SQLite em disco local (sobrevive a reinícios do processo);
+  3. opcionalmente, escrita do resultado de volta no item do Cosmos DB.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "cache/sentiment.sqlite3")
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "5000"))
+
+
+def sentiment_key(text: str, model_name: str, candidate_labels) -> str:
+    """Hash estável de (modelo, labels, texto) usado como chave do cache."""
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update("|".join(candidate_labels).encode("utf-8"))
+    h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class SentimentCache:
+    """LRU em memória + SQLite, com contadores de hits/misses."""
+
+    def __init__(self, model_name: str, candidate_labels, path: str = SENTIMENT_CACHE_PATH,
+                 max_entries: int = SENTIMENT_CACHE_SIZE, cosmos_container=None):
+        self.model_name = model_name
+        self.candidate_labels = list(candidate_labels)
+        self.max_entries = max(1, max_entries)
+        self.cosmos_container = cosmos_container
+
+        self._lru = OrderedDict()
+        self._written_back = set()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "inference_texts": 0, "inference_seconds": 0.0}
+
+        self.path = path
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._open()
+            # Com o gunicorn em preload o cache é criado antes do fork; uma ligação
+            # SQLite não pode ser partilhada entre processos, cada worker abre a sua
+            os.register_at_fork(after_in_child=self._open)
+
+    def _open(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def key(self, text: str) -> str:
+        return sentiment_key(text, self.model_name, self.candidate_labels)
+
+    def _remember(self, key: str, value: dict):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts: list) -> list:
+        """Devolve uma lista alinhada com `texts`, com o resultado em cache ou None."""
+        found = [None] * len(texts)
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.key(text)
+                value = self._lru.get(key)
+                if value is not None:
+                    self._lru.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                elif self._db is not None:
+                    row = self._db.execute(
+                        "SELECT value FROM sentiment WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row:
+                        value = json.loads(row[0])
+                        self._remember(key, value)
+                        self._stats["disk_hits"] += 1
+                if value is None:
+                    self._stats["misses"] += 1
+                else:
+                    found[i] = dict(value)
+        return found
+
+    def put_many(self, texts: list, results: list):
+        with self._lock:
+            rows = []
+            for text, result in zip(texts, results):
+                key = self.key(text)
+                self._remember(key, dict(result))
+                rows.append((key, json.dumps(result)))
+            if self._db is not None and rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sentiment (key, value) VALUES (?, ?)", rows
+                )
+                self._db.commit()
+
+    def record_inference(self, num_texts: int, seconds: float):
+        """Regista o tempo gasto no modelo, para estimar o tempo poupado pelos hits."""
+        with self._lock:
+            self._stats["inference_texts"] += num_texts
+            self._stats["inference_seconds"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._lru)
+        hits = s["memory_hits"] + s["disk_hits"]
+        total = hits + s["misses"]
+        per_text = s["inference_seconds"] / s["inference_texts"] if s["inference_texts"] else 0.0
+        s["hits"] = hits
+        s["hit_ratio"] = hits / total if total else 0.0
+        s["estimated_seconds_saved"] = round(hits * per_text, 3)
+        return s
+
+    def write_back(self, posts: list, texts: list, results: list):
+        """
+        Grava o sentimento no item do Cosmos de cada post (campos sentiment/scores),
+        se houver container configurado. Cada chave só é escrita uma vez por processo.
+        """
+        if self.cosmos_container is None:
+            return
+        for post, text, result in zip(posts, texts, results):
+            key = self.key(text)
+            if key in self._written_back or not post.get("id") or not post.get("subreddit"):
+                continue
+            if post.get("sentiment_key") == key:
+                self._written_back.add(key)
+                continue
+            try:
+                self.cosmos_container.patch_item(
+                    item=post["id"],
+                    partition_key=post["subreddit"],
+                    patch_operations=[
+                        {"op": "set", "path": "/sentiment", "value": result["sentimento"].lower()},
+                        {"op": "set", "path": "/scores", "value": result["scores_raw"]},
+                        {"op": "set", "path": "/sentiment_key", "value": key},
+                    ],
+                )
+                self._written_back.add(key)
+            except Exception as e:
+                logger.warning(f"Falha ao gravar sentimento no Cosmos para {post['id']}: {e}")
+
+
+def cosmos_container_from_env():
+    """Container do Cosmos para a escrita de volta, se SENTIMENT_CACHE_COSMOS=1 e houver credenciais."""
+    if os.getenv("SENTIMENT_CACHE_COSMOS", "0") != "1":
+        return None
+    endpoint = os.getenv("COSMOS_ENDPOINT")
+    key = os.getenv("COSMOS_KEY")
+    if not endpoint or not key:
+        logger.warning("SENTIMENT_CACHE_COSMOS=1 mas COSMOS_ENDPOINT/COSMOS_KEY não definidas")
+        return None
+    from azure.cosmos import CosmosClient
+    client = CosmosClient(endpoint, key)
+    return client.get_database_client(os.getenv("COSMOS_DATABASE", "RedditApp")) \
+                 .get_container_client(os.getenv("COSMOS_CONTAINER", "posts"))
@@ -0,0 +1,147 @@
+"""
+Motor de inferência em lote para a análise de sentimento zero-shot.
+
+Em vez de chamar o pipeline uma vez por post (3 passagens NLI com batch 1),
+os textos são ordenados por comprimento e classificados em mini-batches, o
+que reduz o padding dentro de cada batch e aproveita melhor o CPU.
+"""
+import os
+import time
+import logging
+import contextlib
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_LABELS = ["negative", "neutral", "positive"]
+DEFAULT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "8"))
+
+
+def container_cpu_count() -> int:
+    """Número de CPUs efetivamente disponíveis para o container (quota cgroup ou afinidade)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2: "max 100000" ou "<quota> <periodo>"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def configure_torch_threads(num_threads: int = None) -> int:
+    """Ajusta o número de threads do torch aos cores do container (ou a TORCH_NUM_THREADS)."""
+    import torch
+
+    n = num_threads or int(os.getenv("TORCH_NUM_THREADS", "0")) or container_cpu_count()
+    torch.set_num_threads(n)
+    logger.info(f"torch configurado com {n} threads")
+    return n
+
+
+def _to_sentiment(result: dict) -> dict:
+    """Converte a saída do pipeline nos campos usados pelas páginas de análise."""
+    return {
+        "sentimento": result["labels"][0].capitalize(),
+        "probabilidade": int(result["scores"][0] * 100),
+        "scores_raw": dict(zip(result["labels"], result["scores"])),
+    }
+
+
+def precomputed_sentiment(post: dict, key: str, candidate_labels=None):
+    """
+    Sentimento já calculado pelo change feed (campos 'sentiment'/'scores' do
+    documento no Cosmos), no formato da página de análise. `key` é a
+    sentiment_key do texto atual do post para o modelo/backend ativo: se o
+    documento tiver sido pontuado com outro texto ou outro modelo, devolve
+    None (tal como quando não há scores).
+    """
+    if post.get("sentiment_key") != key:
+        return None
+    scores = post.get("scores")
+    labels = list(candidate_labels or CANDIDATE_LABELS)
+    if not isinstance(scores, dict) or not all(label in scores for label in labels):
+        return None
+    ranked = sorted(labels, key=lambda label: scores[label], reverse=True)
+    return _to_sentiment({"labels": ranked, "scores": [scores[label] for label in ranked]})
+
+
+class BatchedSentimentClassifier:
+    """
+    Classifica listas de textos em mini-batches ordenados por comprimento.
+    `uses_torch` só deve ser True para o pipeline PyTorch: os backends stub e
+    ONNX não importam o torch.
+    """
+
+    def __init__(self, classifier, candidate_labels=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache=None, uses_torch: bool = False):
+        self.classifier = classifier
+        self.candidate_labels = list(candidate_labels or CANDIDATE_LABELS)
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self.uses_torch = uses_torch
+
+    def classify(self, texts: list, progress=None) -> list:
+        """
+        Classifica todos os textos e devolve, pela ordem original, um dicionário
+        por texto com 'sentimento', 'probabilidade' e 'scores_raw'.
+        Se houver cache, só os textos em falta passam pelo modelo.
+        `progress(feitos, total)`, se indicado, é chamado após cada mini-batch.
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._classify_uncached(texts, progress)
+
+        results = self.cache.get_many(texts)
+        missing = [i for i, r in enumerate(results) if r is None]
+        hits = len(texts) - len(missing)
+        if progress:
+            progress(hits, len(texts))
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            start = time.perf_counter()
+            computed = self._classify_uncached(
+                miss_texts, progress and (lambda done, _: progress(hits + done, len(texts)))
+            )
+            self.cache.record_inference(len(miss_texts), time.perf_counter() - start)
+            self.cache.put_many(miss_texts, computed)
+            for i, r in zip(missing, computed):
+                results[i] = r
+        return results
+
+    def _inference_mode(self):
+        if not self.uses_torch:
+            return contextlib.nullcontext()
+        import torch
+        return torch.inference_mode()
+
+    def _classify_uncached(self, texts: list, progress=None) -> list:
+        # Textos de comprimento semelhante no mesmo batch => menos padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        # O pipeline zero-shot gera um par (texto, hipótese) por label,
+        # por isso o batch interno é batch_size * nº de labels
+        pipeline_batch = self.batch_size * len(self.candidate_labels)
+
+        with self._inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                outputs = self.classifier(
+                    [texts[i] for i in idx],
+                    self.candidate_labels,
+                    batch_size=pipeline_batch,
+                )
+                if isinstance(outputs, dict):
+                    outputs = [outputs]
+                for i, out in zip(idx, outputs):
+                    results[i] = _to_sentiment(out)
+                if progress:
+                    progress(start + len(idx), len(texts))
+
+        return results
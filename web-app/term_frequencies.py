@@ -0,0 +1,101 @@
+"""
+Frequências de termos para a nuvem de palavras.
+
+Com TERM_INDEX_COSMOS=1 a nuvem usa o índice por subreddit mantido pela
+ingestão (redditIngestFunc/shared_code/term_index.py) no container de
+metadados, que cobre todos os posts já ingeridos e não só a página atual.
+Os índices lidos ficam em cache durante TERM_INDEX_TTL segundos. Sem
+índice (ou para subreddits ainda sem documento), as frequências são
+contadas a partir dos textos analisados, com o mesmo tokenizador.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+TERM_INDEX_TTL = int(os.getenv("TERM_INDEX_TTL", "300"))
+
+# Igual ao tokenizador de redditIngestFunc/shared_code/term_index.py (são unidades de deploy
+# separadas; tests/test_tokenizer_parity.py garante que dão o mesmo resultado)
+_TOKEN_RE = re.compile(r"[a-z][a-z']+")
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for t in _TOKEN_RE.findall(text.lower()):
+        t = t[:-2] if t.endswith("'s") else t.rstrip("'")
+        if len(t) > 1:
+            tokens.append(t)
+    return tokens
+
+
+def text_frequencies(texts: list) -> Counter:
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text))
+    return counts
+
+
+class TermIndex:
+    """Leitura (com cache TTL) dos índices de termos do container de metadados."""
+
+    def __init__(self, container, ttl: int = TERM_INDEX_TTL):
+        self.container = container
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, subreddit: str) -> dict:
+        """{termo: contagem} do subreddit, ou None se não houver índice."""
+        with self._lock:
+            entry = self._cache.get(subreddit)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                return entry[1]
+        from azure.cosmos import exceptions
+        try:
+            doc = self.container.read_item(item=f"terms_{subreddit}", partition_key=subreddit)
+            terms = doc.get("terms") or None
+        except exceptions.CosmosResourceNotFoundError:
+            terms = None
+        except Exception as e:
+            logger.warning(f"Falha ao ler o índice de termos de r/{subreddit}: {e}")
+            return None
+        with self._lock:
+            self._cache[subreddit] = (time.time(), terms)
+        return terms
+
+    def frequencies(self, subreddits) -> Counter:
+        """Contagens somadas dos índices de `subreddits` (vazio se nenhum tiver índice)."""
+        merged = Counter()
+        for subreddit in subreddits:
+            merged.update(self.get(subreddit) or {})
+        return merged
+
+
+def term_index_from_env():
+    """TermIndex sobre o container de metadados, se TERM_INDEX_COSMOS=1 e houver credenciais."""
+    if os.getenv("TERM_INDEX_COSMOS", "0") != "1":
+        return None
+    endpoint = os.getenv("COSMOS_ENDPOINT")
+    key = os.getenv("COSMOS_KEY")
+    if not endpoint or not key:
+        logger.warning("TERM_INDEX_COSMOS=1 mas COSMOS_ENDPOINT/COSMOS_KEY não definidas")
+        return None
+    from azure.cosmos import CosmosClient
+    client = CosmosClient(endpoint, key)
+    return TermIndex(client.get_database_client(os.getenv("COSMOS_DATABASE", "RedditApp"))
+                           .get_container_client(os.getenv("COSMOS_METADATA_CONTAINER", "metadata")))
+
+
+def cloud_frequencies(posts: list, texts: list, term_index=None) -> Counter:
+    """Frequências para a nuvem: do índice dos subreddits dos posts, ou dos próprios textos."""
+    if term_index is not None:
+        subreddits = sorted({p.get("subreddit") for p in posts if p.get("subreddit")})
+        counts = term_index.frequencies(subreddits)
+        if counts:
+            return counts
+    return text_frequencies(texts)
@@ -0,0 +1,97 @@
+"""
+Tendências de sentimento por subreddit, a partir dos agregados por hora/dia
+mantidos pelo change feed (redditIngestFunc/shared_code/sentiment_rollups.py).
+
+Cada pedido lê um documento por bucket do período pedido (uma query dentro
+da partição do subreddit), sem voltar a percorrer os posts. As leituras
+ficam em cache durante TRENDS_CACHE_TTL segundos.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+TRENDS_CACHE_TTL = int(os.getenv("TRENDS_CACHE_TTL", "60"))
+# Nº máximo de buckets por pedido (p.ex. 90 dias ou 720 horas)
+TRENDS_MAX_BUCKETS = int(os.getenv("TRENDS_MAX_BUCKETS", "720"))
+
+GRANULARITIES = {
+    "hora": ("hour", "%Y-%m-%dT%H", timedelta(hours=1)),
+    "dia": ("day", "%Y-%m-%d", timedelta(days=1)),
+}
+LABELS = ("negative", "neutral", "positive")
+
+ROLLUP_QUERY = (
+    "SELECT c.bucket, c.counts, c.posts, c.sum_confidence, c.sum_score FROM c "
+    "WHERE c.doc_type = 'sentiment_rollup' AND c.granularity = @granularity "
+    "AND c.bucket >= @since ORDER BY c.bucket"
+)
+
+
+def _summary(doc: dict) -> dict:
+    posts = doc.get("posts") or 0
+    counts = {label: (doc.get("counts") or {}).get(label, 0) for label in LABELS}
+    return {
+        "bucket": doc["bucket"],
+        "posts": posts,
+        "counts": counts,
+        "shares": {label: (100 * n / posts if posts else 0.0) for label, n in counts.items()},
+        "mean_confidence": 100 * doc.get("sum_confidence", 0.0) / posts if posts else 0.0,
+        "mean_score": doc.get("sum_score", 0) / posts if posts else 0.0,
+    }
+
+
+class SentimentTrends:
+    """Leitura (com cache TTL) dos agregados de sentimento do container de metadados."""
+
+    def __init__(self, container, ttl: int = TRENDS_CACHE_TTL):
+        self.container = container
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def buckets(self, subreddit: str, granularity: str = "dia", periods: int = 30) -> list:
+        """
+        Buckets dos últimos `periods` períodos de `granularity` ("hora" ou
+        "dia"), do mais antigo para o mais recente. Cada um tem as contagens,
+        a percentagem por sentimento, a confiança média e o score médio.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularidade desconhecida: {granularity} (opções: {', '.join(GRANULARITIES)})")
+        name, fmt, step = GRANULARITIES[granularity]
+        periods = max(1, min(periods, TRENDS_MAX_BUCKETS))
+        since = (datetime.now(timezone.utc) - step * (periods - 1)).strftime(fmt)
+
+        cache_key = (subreddit, name, since)
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                return entry[1]
+
+        docs = self.container.query_items(
+            query=ROLLUP_QUERY,
+            parameters=[{"name": "@granularity", "value": name}, {"name": "@since", "value": since}],
+            partition_key=subreddit,
+        )
+        result = [_summary(doc) for doc in docs]
+        with self._lock:
+            # Só o período mais recente de cada subreddit interessa: as chaves antigas são descartadas
+            for key in [k for k in self._cache if k[:2] == cache_key[:2]]:
+                del self._cache[key]
+            self._cache[cache_key] = (time.time(), result)
+        return result
+
+
+def trends_from_env():
+    """SentimentTrends sobre o container de metadados, se houver credenciais do Cosmos."""
+    endpoint = os.getenv("COSMOS_ENDPOINT")
+    key = os.getenv("COSMOS_KEY")
+    if not endpoint or not key:
+        return None
+    from azure.cosmos import CosmosClient
+    client = CosmosClient(endpoint, key)
+    return SentimentTrends(client.get_database_client(os.getenv("COSMOS_DATABASE", "RedditApp"))
+                                 .get_container_client(os.getenv("COSMOS_METADATA_CONTAINER", "metadata")))